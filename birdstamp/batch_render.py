@@ -0,0 +1,927 @@
+"""Batch render engine used by ``birdstamp render``.
+
+One source file goes through decode → crop → overlay → encode in
+``render_source``; ``iter_render_results`` runs that over many files either
+inline or in a process pool, and ``iter_pipeline_results`` overlaps the three
+stages on threads. Both yield results in input order.
+
+Both engines consume ``(source, raw_metadata)`` tasks; ``iter_render_tasks``
+builds them by extracting metadata in chunks, one chunk ahead of rendering.
+"""
+from __future__ import annotations
+
+import io
+import itertools
+import logging
+import queue
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future, ProcessPoolExecutor, ThreadPoolExecutor
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, BinaryIO, Callable, Iterable, Iterator, Sequence
+
+from PIL import Image
+
+from app_common.exif_io import extract_many_with_xmp_priority, extract_metadata_with_xmp_priority
+from birdstamp import profiling
+from birdstamp.bird_box_store import shared_bird_box_store
+from birdstamp.constants import RAW_EXTENSIONS
+from birdstamp.decoders.image_decoder import decode_image
+from birdstamp.gui.editor_core import (
+    CENTER_MODE_BIRD,
+    DEFAULT_BIRD_DETECT_BATCH_SIZE,
+    BirdDetectionBatcher,
+    LazyBirdBox,
+    apply_editor_crop,
+    compute_ratio_crop_box,
+    crop_box_has_effect,
+    fit_size,
+    normalized_box_to_pixel_box,
+    preload_bird_detector,
+    resize_fit,
+    set_bird_detector_threads,
+    shared_bird_detector_process,
+    stored_bird_box_provider,
+)
+from birdstamp.gui.editor_template import (
+    CompiledTemplate,
+    compile_template,
+    layout_template_overlay,
+    render_template_overlay,
+)
+from birdstamp.gui.editor_utils import build_metadata_context
+from birdstamp.manifest import RenderManifest, build_record, hash_payload, is_up_to_date
+from birdstamp.meta.normalize import normalize_metadata
+from birdstamp.naming import build_output_name
+
+LOGGER = logging.getLogger("birdstamp")
+
+# 每个 worker 进程同时在途的任务数；过大只会增加内存占用，不会更快。
+_PENDING_TASKS_PER_WORKER = 2
+DEFAULT_META_CHUNK_SIZE = 200
+
+RenderTask = tuple[Path, dict[str, Any] | None]
+
+
+@dataclass(slots=True)
+class RenderOptions:
+    """Per-batch render settings shared by every file (and every worker process)."""
+
+    template_payload: dict[str, Any]
+    template_name: str
+    out_dir: Path
+    out_ext: str
+    pil_format: str
+    quality: int
+    max_long_edge: int
+    name_template: str
+    exiftool_mode: str = "auto"
+    skip_existing: bool = True
+    draw_banner: bool = True
+    draw_text: bool = True
+    variant: str = ""    # {variant} naming token when one run renders several templates/sizes
+    # Set by ``attach_manifest``: a snapshot of the manifest entries plus the
+    # hashes every record of this batch shares.
+    manifest_entries: dict[str, dict[str, Any]] | None = None
+    template_hash: str = ""
+    options_hash: str = ""
+    # Persistent bird-box store (``BirdBoxStore``) consulted before detecting; None = detect every run.
+    bird_box_store_path: Path | None = None
+    # Built from ``template_payload`` in ``__post_init__`` (also after ``dataclasses.replace``).
+    compiled_template: CompiledTemplate | None = field(default=None, init=False, repr=False, compare=False)
+
+    def __post_init__(self) -> None:
+        self.compiled_template = compile_template(self.template_payload, fallback_name=self.template_name)
+
+
+@dataclass(slots=True)
+class RenderResult:
+    source: Path
+    status: str          # ok | skipped | failed
+    output: Path | None = None
+    elapsed: float = 0.0
+    error: str | None = None
+    record: dict[str, Any] | None = None   # manifest record for ``output``
+    variant: str = ""
+    timings: dict[str, float] = field(default_factory=dict)   # exclusive seconds per stage
+    megapixels: float = 0.0
+    peak_rss_mb: float | None = None
+
+
+def attach_manifest(options: RenderOptions | Sequence[RenderOptions], manifest: RenderManifest) -> None:
+    """Let ``--skip-existing`` compare against ``manifest`` instead of only checking the file exists.
+
+    All variants share one snapshot of the entries.
+    """
+    entries = manifest.snapshot()
+    for variant in _as_variants(options):
+        variant.manifest_entries = entries
+        variant.template_hash = hash_payload(variant.template_payload)
+        variant.options_hash = hash_payload(
+            {
+                "max_long_edge": variant.max_long_edge,
+                "format": variant.pil_format,
+                "ext": variant.out_ext,
+                "quality": variant.quality,
+                "draw_banner": variant.draw_banner,
+                "draw_text": variant.draw_text,
+            }
+        )
+
+
+def save_image(image: Image.Image, path: Path | BinaryIO, pil_format: str, quality: int) -> None:
+    """Encode ``image`` to a file path (parent folders are created) or a binary stream."""
+    if isinstance(path, Path):
+        # Encode in memory first so encode (CPU) and write (I/O) are timed separately.
+        buffer = io.BytesIO()
+        save_image(image, buffer, pil_format, quality)
+        with profiling.span(profiling.STAGE_WRITE):
+            path.parent.mkdir(parents=True, exist_ok=True)
+            path.write_bytes(buffer.getbuffer())
+        return
+    with profiling.span(profiling.STAGE_ENCODE):
+        if pil_format == "JPEG":
+            image.save(path, format="JPEG", quality=max(1, min(100, quality)), optimize=True, progressive=True)
+        else:
+            image.save(path, format="PNG", optimize=True)
+
+
+@dataclass(slots=True)
+class PipelineSettings:
+    """Thread counts and bounded queue depths for the staged (decode → render → encode) mode."""
+
+    decode_threads: int = 2
+    render_threads: int = 2
+    encode_threads: int = 2
+    decode_queue_depth: int = 4
+    encode_queue_depth: int = 4
+    # Bird-mode crops of concurrent render threads share one batched model call.
+    detect_batch_size: int = DEFAULT_BIRD_DETECT_BATCH_SIZE
+
+
+@dataclass(slots=True)
+class _VariantJob:
+    """One output (template/size variant) of a source file."""
+
+    options: RenderOptions
+    output_file: Path | None = None
+    record: dict[str, Any] | None = None
+    image: Image.Image | None = None
+    result: RenderResult | None = None
+    timer: profiling.StageTimer = field(default_factory=profiling.StageTimer)
+
+
+@dataclass(slots=True)
+class _StageItem:
+    """A file travelling through the pipeline stages, with one job per variant."""
+
+    source: Path
+    raw_meta: dict[str, Any]
+    started: float
+    jobs: list[_VariantJob]
+    image: Image.Image | None = None
+    megapixels: float = 0.0
+    # Shared stages (metadata, decode) are reported once, on the first result.
+    timer: profiling.StageTimer = field(default_factory=profiling.StageTimer)
+
+    def pending(self) -> list[_VariantJob]:
+        return [job for job in self.jobs if job.result is None]
+
+    def finish(self, job: _VariantJob, status: str, *, error: str | None = None) -> None:
+        timings = dict(self.timer.spans)
+        self.timer.spans.clear()
+        for name, seconds in job.timer.spans.items():
+            timings[name] = timings.get(name, 0.0) + seconds
+        job.result = RenderResult(
+            source=self.source,
+            status=status,
+            output=job.output_file,
+            elapsed=time.perf_counter() - self.started,
+            error=error,
+            record=job.record if status != "failed" else None,
+            variant=job.options.variant,
+            timings=timings,
+            megapixels=self.megapixels,
+            peak_rss_mb=profiling.peak_rss_mb(),
+        )
+
+    def fail(self, job: _VariantJob, error: str) -> None:
+        job.image = None
+        self.finish(job, "failed", error=error)
+
+    def fail_pending(self, error: str) -> None:
+        self.image = None
+        for job in self.pending():
+            self.fail(job, error)
+
+    def results(self) -> list[RenderResult]:
+        return [job.result for job in self.jobs if job.result is not None]
+
+
+def _as_variants(options: RenderOptions | Sequence[RenderOptions]) -> tuple[RenderOptions, ...]:
+    variants = (options,) if isinstance(options, RenderOptions) else tuple(options)
+    if not variants:
+        raise ValueError("at least one RenderOptions is required")
+    return variants
+
+
+def _decode_stage(source: Path, raw_meta: dict[str, Any] | None, variants: Sequence[RenderOptions]) -> _StageItem:
+    """Read metadata, resolve each variant's output name and decode pixels once (I/O heavy)."""
+    item = _StageItem(
+        source=source,
+        raw_meta=raw_meta or {},
+        started=time.perf_counter(),
+        jobs=[_VariantJob(options=options) for options in variants],
+    )
+    with profiling.activate(item.timer):
+        _decode_into(item, raw_meta, variants)
+    return item
+
+
+def _normalize_for_naming(source: Path, raw_meta: dict[str, Any]) -> Any:
+    return normalize_metadata(
+        source,
+        raw_meta,
+        bird_arg=None,
+        bird_priority=["meta", "filename"],
+        bird_regex=r"(?P<bird>[^_]+)_",
+    )
+
+
+def _output_name(source: Path, norm_meta: Any, options: RenderOptions) -> str:
+    return build_output_name(
+        options.name_template,
+        source,
+        norm_meta,
+        extension=options.out_ext,
+        template_name=options.template_name,
+        variant=options.variant,
+    )
+
+
+def _decode_into(item: _StageItem, raw_meta: dict[str, Any] | None, variants: Sequence[RenderOptions]) -> None:
+    source = item.source
+    try:
+        if raw_meta is None:
+            with profiling.span(profiling.STAGE_METADATA):
+                item.raw_meta = extract_metadata_with_xmp_priority(source, mode=variants[0].exiftool_mode)
+        norm_meta = _normalize_for_naming(source, item.raw_meta)
+        for job in item.jobs:
+            options = job.options
+            try:
+                output_name = _output_name(source, norm_meta, options)
+                job.output_file = options.out_dir / output_name
+                if options.manifest_entries is not None:
+                    job.record = build_record(
+                        source,
+                        template_hash=options.template_hash,
+                        options_hash=options.options_hash,
+                        raw_metadata=item.raw_meta,
+                    )
+            except Exception as exc:
+                item.fail(job, str(exc))
+                continue
+            if options.skip_existing:
+                if job.record is None:
+                    up_to_date = job.output_file.exists()
+                else:
+                    up_to_date = is_up_to_date(
+                        options.manifest_entries, options.out_dir, Path(output_name).as_posix(), job.record
+                    )
+                if up_to_date:
+                    item.finish(job, "skipped")
+        if item.pending():
+            with profiling.span(profiling.STAGE_DECODE):
+                item.image = decode_image(source)
+            item.megapixels = round(item.image.width * item.image.height / 1_000_000.0, 3)
+    except Exception as exc:
+        item.fail_pending(str(exc))
+
+
+def render_image(
+    image: Image.Image,
+    source: Path,
+    raw_meta: dict[str, Any],
+    options: RenderOptions,
+    *,
+    metadata_context: dict[str, Any] | None = None,
+    bird_box_provider: Callable[[Image.Image], tuple[float, float, float, float] | None] | None = None,
+) -> Image.Image:
+    """Crop/resize ``image`` per the template and draw the overlay; returns an RGB image.
+
+    ``metadata_context`` and ``bird_box_provider`` let several variants of one
+    source share the metadata context and a single bird detection.
+    """
+    template = options.compiled_template
+    # Effective max_long_edge: CLI arg overrides template; 0 = unlimited
+    effective_max_edge = options.max_long_edge if options.max_long_edge > 0 else template.max_long_edge
+
+    with profiling.span(profiling.STAGE_CROP_PLAN):
+        # Apply ratio crop from template (e.g. 9:16 portrait)
+        if template.ratio is not None:
+            image = apply_editor_crop(
+                image,
+                source_path=source,
+                raw_metadata=raw_meta,
+                ratio=template.ratio,
+                center_mode=template.center_mode,
+                crop_padding_px=0,   # 模板的 crop_padding_* 是鸟检测内缩偏移，不是外边距
+                max_long_edge=effective_max_edge,
+                fill_color=template.crop_padding_fill,
+                bird_box_provider=bird_box_provider,
+            )
+        elif effective_max_edge > 0:
+            image = resize_fit(image, effective_max_edge)
+
+    if metadata_context is None:
+        metadata_context = build_metadata_context(source, raw_meta)
+    rendered = render_template_overlay(
+        image,
+        raw_metadata=raw_meta,
+        metadata_context=metadata_context,
+        template_payload=template,
+        draw_banner=options.draw_banner,
+        draw_text=options.draw_text,
+    )
+    return rendered
+
+
+def _render_stage(
+    item: _StageItem,
+    detector: Callable[[Image.Image], tuple[float, float, float, float] | None] | None = None,
+) -> _StageItem:
+    """Crop/resize and draw the template overlay for every pending variant (CPU heavy).
+
+    ``detector`` replaces ``detect_primary_bird_box``, e.g. a shared ``BirdDetectionBatcher``;
+    with a ``bird_box_store_path`` it only runs for sources missing from the store.
+    """
+    if item.image is None:
+        item.fail_pending("decoded image missing")
+        return item
+    try:
+        metadata_ctx = build_metadata_context(item.source, item.raw_meta)
+    except Exception as exc:
+        item.fail_pending(str(exc))
+        return item
+    # Detected once per source, and only if some variant's crop actually needs it.
+    try:
+        store_path = item.jobs[0].options.bird_box_store_path if item.jobs else None
+        store = shared_bird_box_store(store_path) if store_path is not None else None
+        if store is not None:
+            detector = stored_bird_box_provider(item.source, store, detector)
+    except Exception as exc:
+        item.fail_pending(str(exc))
+        return item
+    bird_box = LazyBirdBox(detector=detector)
+    for job in item.pending():
+        try:
+            with profiling.activate(job.timer):
+                job.image = render_image(
+                    item.image,
+                    item.source,
+                    item.raw_meta,
+                    job.options,
+                    metadata_context=metadata_ctx,
+                    bird_box_provider=bird_box,
+                )
+        except Exception as exc:
+            item.fail(job, str(exc))
+    item.image = None
+    return item
+
+
+def _encode_stage(item: _StageItem) -> _StageItem:
+    """Encode and write each rendered variant (JPEG optimize/progressive is the slow part)."""
+    for job in item.pending():
+        try:
+            if job.image is None or job.output_file is None:
+                raise RuntimeError("rendered image missing")
+            options = job.options
+            with profiling.activate(job.timer):
+                save_image(job.image, job.output_file, pil_format=options.pil_format, quality=options.quality)
+            item.finish(job, "ok")
+        except Exception as exc:
+            item.fail(job, str(exc))
+        finally:
+            job.image = None
+    return item
+
+
+def warm_up(options: RenderOptions) -> None:
+    """Load the bird detector (when the template crops around the bird) and the
+    template fonts once, so a long-running process renders its first real file
+    at full speed."""
+    template = options.compiled_template
+    if template.center_mode == CENTER_MODE_BIRD and template.ratio is not None:
+        t0 = time.perf_counter()
+        preload_bird_detector()
+        LOGGER.info("Bird detector ready (%.2fs)", time.perf_counter() - t0)
+    try:
+        canvas = Image.new("RGB", (1200, 800), (128, 128, 128))
+        render_template_overlay(
+            canvas,
+            raw_metadata={},
+            metadata_context=build_metadata_context(Path("warmup.jpg"), {}),
+            template_payload=template,
+            draw_banner=options.draw_banner,
+            draw_text=options.draw_text,
+        )
+    except Exception as exc:
+        LOGGER.debug("Template warm-up render failed: %s", exc)
+
+
+def render_source(
+    source: Path,
+    raw_meta: dict[str, Any] | None,
+    options: RenderOptions | Sequence[RenderOptions],
+) -> list[RenderResult]:
+    """Render one source file for every variant in ``options``; never raises.
+
+    The source is decoded, its metadata normalized and the bird detected once;
+    only crop/resize/overlay/encode run per variant. One result per variant.
+    """
+    variants = _as_variants(options)
+    item = _decode_stage(source, raw_meta, variants)
+    if item.pending():
+        _encode_stage(_render_stage(item))
+    return item.results()
+
+
+# ---------------------------------------------------------------------------
+# Dry run: output size and overlay layout from file headers, no pixel decode.
+# ---------------------------------------------------------------------------
+
+_ORIENTATION_SWAPS_AXES = {5, 6, 7, 8}
+
+
+def _metadata_lookup(raw_meta: dict[str, Any] | None) -> dict[str, Any]:
+    return {str(key).lower().split(":")[-1]: value for key, value in (raw_meta or {}).items()}
+
+
+def _metadata_image_size(raw_meta: dict[str, Any] | None) -> tuple[int, int] | None:
+    lookup = _metadata_lookup(raw_meta)
+    image_size = str(lookup.get("imagesize") or "")
+    if "x" in image_size:
+        width_text, _, height_text = image_size.partition("x")
+        try:
+            return int(float(width_text)), int(float(height_text))
+        except ValueError:
+            pass
+    for width_key, height_key in (("exifimagewidth", "exifimageheight"), ("imagewidth", "imageheight")):
+        try:
+            return int(lookup[width_key]), int(lookup[height_key])
+        except (KeyError, TypeError, ValueError):
+            continue
+    return None
+
+
+def _metadata_orientation(raw_meta: dict[str, Any] | None) -> int | None:
+    """EXIF Orientation as a number; accepts ExifTool's numeric (``-n``) and text forms."""
+    value = _metadata_lookup(raw_meta).get("orientation")
+    if value is None:
+        return None
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        pass
+    text = str(value).lower()
+    if "rotate 90" in text:
+        return 7 if "mirror" in text else 6
+    if "rotate 270" in text:
+        return 5 if "mirror" in text else 8
+    return 1
+
+
+def source_image_size(source: Path, raw_meta: dict[str, Any] | None = None) -> tuple[int, int]:
+    """Displayed (EXIF-rotated) size of ``source`` without decoding pixels.
+
+    RAW files are sized from metadata: most are TIFF containers whose first
+    image Pillow opens is the embedded thumbnail. Other formats read the file
+    header and fall back to metadata when Pillow cannot open them.
+    """
+    size = None
+    if source.suffix.lower() not in RAW_EXTENSIONS:
+        try:
+            with Image.open(source) as image:
+                size = image.size
+                orientation = image.getexif().get(0x0112)
+        except Exception:
+            size = None
+    if size is None:
+        size = _metadata_image_size(raw_meta)
+        if size is None:
+            raise ValueError(f"cannot determine image size: {source}")
+        orientation = _metadata_orientation(raw_meta)
+    width, height = size
+    if orientation in _ORIENTATION_SWAPS_AXES:
+        return height, width
+    return width, height
+
+
+def planned_output_size(source_size: tuple[int, int], options: RenderOptions) -> tuple[int, int]:
+    """Size ``render_image`` produces for a ``source_size`` image.
+
+    The ratio crop is sized as if centered; bird/focus-centered crops only move
+    the window, so they can differ by at most a rounding pixel.
+    """
+    template = options.compiled_template
+    effective_max_edge = options.max_long_edge if options.max_long_edge > 0 else template.max_long_edge
+    width, height = source_size
+    if template.ratio is not None:
+        crop_box = compute_ratio_crop_box(width=width, height=height, ratio=template.ratio)
+        crop_px = normalized_box_to_pixel_box(crop_box, width, height)
+        if crop_px is not None and crop_box_has_effect(crop_box):
+            width, height = crop_px[2] - crop_px[0], crop_px[3] - crop_px[1]
+    return fit_size(width, height, effective_max_edge)
+
+
+def plan_overlay_layout(
+    source: Path,
+    raw_meta: dict[str, Any],
+    options: RenderOptions,
+    *,
+    source_size: tuple[int, int] | None = None,
+) -> dict[str, Any]:
+    """Output path, size and overlay layout ``render_image`` would produce, without decoding pixels."""
+    size = planned_output_size(source_size or source_image_size(source, raw_meta), options)
+    layout = layout_template_overlay(
+        size,
+        raw_metadata=raw_meta,
+        metadata_context=build_metadata_context(source, raw_meta),
+        template_payload=options.compiled_template,
+        draw_banner=options.draw_banner,
+    )
+    return {
+        "source": str(source),
+        "variant": options.variant,
+        "output": str(options.out_dir / _output_name(source, _normalize_for_naming(source, raw_meta), options)),
+        "size": list(size),
+        "layout": layout.to_dict(),
+    }
+
+
+def iter_layout_plans(
+    tasks: Iterable[RenderTask],
+    options: RenderOptions | Sequence[RenderOptions],
+) -> Iterator[dict[str, Any]]:
+    """``plan_overlay_layout`` for every task and variant (``--dry-run``); errors become ``{"error": ...}``."""
+    variants = _as_variants(options)
+    for source, raw_meta in tasks:
+        try:
+            if raw_meta is None:
+                raw_meta = extract_metadata_with_xmp_priority(source, mode=variants[0].exiftool_mode)
+            source_size = source_image_size(source, raw_meta)
+        except Exception as exc:
+            for variant in variants:
+                yield {"source": str(source), "variant": variant.variant, "error": str(exc)}
+            continue
+        for variant in variants:
+            try:
+                yield plan_overlay_layout(source, raw_meta, variant, source_size=source_size)
+            except Exception as exc:
+                yield {"source": str(source), "variant": variant.variant, "error": str(exc)}
+
+
+# ---------------------------------------------------------------------------
+# Chunked metadata: ExifTool runs over ``chunk_size`` files at a time while the
+# previous chunk renders; each chunk's dicts are dropped once handed out.
+# ---------------------------------------------------------------------------
+
+
+def _extract_chunk(paths: list[Path], mode: str) -> dict[Path, dict[str, Any]]:
+    resolved = [p.resolve(strict=False) for p in paths]
+    try:
+        return extract_many_with_xmp_priority(resolved, mode=mode)
+    except Exception as exc:
+        LOGGER.warning("Batch metadata extraction failed (%s); falling back to per-file reads", exc)
+        return {}
+
+
+def iter_render_tasks(
+    files: Iterable[Path],
+    *,
+    exiftool_mode: str = "auto",
+    chunk_size: int = DEFAULT_META_CHUNK_SIZE,
+    on_chunk: Callable[[int, float], None] | None = None,
+) -> Iterator[RenderTask]:
+    """Pair each file with its raw metadata, extracting metadata chunk by chunk.
+
+    The next chunk (including pulling its paths from ``files``, which may be a
+    lazy directory walk) is prepared on a helper thread while the current one
+    is consumed, so only about two chunks of metadata are alive at a time.
+    Files missing from the batch result get ``None`` and are read per file.
+    ``on_chunk(count, seconds)`` reports the extraction time of each chunk.
+    """
+    chunk_size = max(1, int(chunk_size))
+    source_iter = iter(files)
+
+    def _next_chunk() -> tuple[list[Path], dict[Path, dict[str, Any]]]:
+        paths = list(itertools.islice(source_iter, chunk_size))
+        if not paths:
+            return paths, {}
+        t0 = time.perf_counter()
+        meta_map = _extract_chunk(paths, exiftool_mode)
+        if on_chunk is not None:
+            on_chunk(len(paths), time.perf_counter() - t0)
+        return paths, meta_map
+
+    with ThreadPoolExecutor(max_workers=1, thread_name_prefix="birdstamp-meta") as prefetch:
+        future = prefetch.submit(_next_chunk)
+        while True:
+            paths, meta_map = future.result()
+            if not paths:
+                return
+            future = prefetch.submit(_next_chunk)
+            for source in paths:
+                yield source, meta_map.pop(source.resolve(strict=False), None)
+            del paths, meta_map
+
+
+# ---------------------------------------------------------------------------
+# Process-pool worker state: set once per worker by the pool initializer so
+# the template payload is not re-pickled for every file.
+# ---------------------------------------------------------------------------
+
+_WORKER_VARIANTS: tuple[RenderOptions, ...] = ()
+
+
+def _init_render_worker(variants: tuple[RenderOptions, ...], detector_threads: int = 0) -> None:
+    global _WORKER_VARIANTS
+    _WORKER_VARIANTS = variants
+    if detector_threads > 0:
+        set_bird_detector_threads(detector_threads)
+
+
+def _render_in_worker(source: Path, raw_meta: dict[str, Any] | None) -> list[RenderResult]:
+    if not _WORKER_VARIANTS:
+        return [RenderResult(source=source, status="failed", error="render worker not initialized")]
+    return render_source(source, raw_meta, _WORKER_VARIANTS)
+
+
+def _failed_results(source: Path, variants: Sequence[RenderOptions], error: str) -> list[RenderResult]:
+    return [RenderResult(source=source, status="failed", error=error, variant=v.variant) for v in variants]
+
+
+def _collect_future(future: Future, source: Path, variants: Sequence[RenderOptions]) -> list[RenderResult]:
+    try:
+        return future.result()
+    except Exception as exc:
+        # Worker crashed (e.g. BrokenProcessPool) — report instead of aborting the batch.
+        return _failed_results(source, variants, f"render worker failed: {exc}")
+
+
+def iter_render_results(
+    tasks: Iterable[RenderTask],
+    options: RenderOptions | Sequence[RenderOptions],
+    *,
+    jobs: int = 1,
+    detector_threads: int = 0,
+) -> Iterator[RenderResult]:
+    """Render ``(source, raw_metadata)`` tasks and yield results in input order.
+
+    ``options`` may list several variants (templates/sizes); each source then
+    yields one result per variant, in variant order. ``jobs <= 1`` renders
+    inline; otherwise a process pool of ``jobs`` workers is used and at most
+    ``jobs * 2`` files are in flight at any time. ``detector_threads`` > 0 caps
+    each worker's bird-detector threads (its share of the CPU budget).
+    """
+    variants = _as_variants(options)
+    if jobs <= 1:
+        for source, raw_meta in tasks:
+            yield from render_source(source, raw_meta, variants)
+        return
+
+    max_pending = max(1, jobs * _PENDING_TASKS_PER_WORKER)
+    pending: deque[tuple[Future, Path]] = deque()
+    with ProcessPoolExecutor(
+        max_workers=jobs,
+        initializer=_init_render_worker,
+        initargs=(variants, detector_threads),
+    ) as executor:
+        for source, raw_meta in tasks:
+            pending.append((executor.submit(_render_in_worker, source, raw_meta), source))
+            if len(pending) >= max_pending:
+                future, pending_source = pending.popleft()
+                yield from _collect_future(future, pending_source, variants)
+        while pending:
+            future, pending_source = pending.popleft()
+            yield from _collect_future(future, pending_source, variants)
+
+
+# ---------------------------------------------------------------------------
+# Staged thread pipeline: decode → render → encode connected by bounded queues,
+# so NAS reads and JPEG encoding overlap with overlay rendering.
+# ---------------------------------------------------------------------------
+
+_STAGE_DONE = object()
+_QUEUE_POLL_SECONDS = 0.1
+
+
+def _queue_put(target: queue.Queue, item: Any, cancel: threading.Event) -> bool:
+    while not cancel.is_set():
+        try:
+            target.put(item, timeout=_QUEUE_POLL_SECONDS)
+            return True
+        except queue.Full:
+            continue
+    return False
+
+
+def _queue_get(source: queue.Queue, cancel: threading.Event) -> Any:
+    while not cancel.is_set():
+        try:
+            return source.get(timeout=_QUEUE_POLL_SECONDS)
+        except queue.Empty:
+            continue
+    return _STAGE_DONE
+
+
+class _StageWorkers:
+    """N threads draining one queue; the last thread to finish signals the next stage.
+
+    A handler that raises does not kill its thread: ``on_error(task, exc)`` reports
+    the task instead, so the consumer never waits for a result that cannot come.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        count: int,
+        inbox: queue.Queue,
+        handler: Callable[[Any], None],
+        cancel: threading.Event,
+        on_finished: Callable[[], None],
+        on_error: Callable[[Any, Exception], None],
+    ) -> None:
+        self._inbox = inbox
+        self._handler = handler
+        self._on_error = on_error
+        self._cancel = cancel
+        self._on_finished = on_finished
+        self._remaining = max(1, int(count))
+        self._lock = threading.Lock()
+        self.count = self._remaining
+        self.threads = [
+            threading.Thread(target=self._run, name=f"birdstamp-{name}-{index}", daemon=True)
+            for index in range(self.count)
+        ]
+
+    def start(self) -> None:
+        for thread in self.threads:
+            thread.start()
+
+    def _run(self) -> None:
+        try:
+            while True:
+                item = _queue_get(self._inbox, self._cancel)
+                if item is _STAGE_DONE:
+                    break
+                try:
+                    self._handler(item)
+                except Exception as exc:
+                    LOGGER.debug("pipeline stage failed", exc_info=True)
+                    self._on_error(item, exc)
+        finally:
+            with self._lock:
+                self._remaining -= 1
+                last = self._remaining == 0
+            if last:
+                self._on_finished()
+
+
+def iter_pipeline_results(
+    tasks: Iterable[RenderTask],
+    options: RenderOptions | Sequence[RenderOptions],
+    *,
+    settings: PipelineSettings | None = None,
+) -> Iterator[RenderResult]:
+    """Render tasks through threaded decode/render/encode stages; yield results in input order."""
+    cfg = settings or PipelineSettings()
+    variants = _as_variants(options)
+    cancel = threading.Event()
+    inbox: queue.Queue = queue.Queue(maxsize=max(1, cfg.decode_threads) * _PENDING_TASKS_PER_WORKER)
+    decoded: queue.Queue = queue.Queue(maxsize=max(1, cfg.decode_queue_depth))
+    rendered: queue.Queue = queue.Queue(maxsize=max(1, cfg.encode_queue_depth))
+    results: queue.Queue = queue.Queue()
+    # Only concurrent render threads can fill a batch; a lone thread detects directly.
+    # Batches run in the detector worker process, off the render threads' cores.
+    batcher = (
+        BirdDetectionBatcher(cfg.detect_batch_size, detector=shared_bird_detector_process().detect_many)
+        if cfg.render_threads > 1 and cfg.detect_batch_size > 1
+        else None
+    )
+
+    def _signal_done(target: queue.Queue, workers: _StageWorkers) -> None:
+        for _ in range(workers.count):
+            _queue_put(target, _STAGE_DONE, cancel)
+
+    def _handle_decode(task: tuple[int, Path, dict[str, Any] | None]) -> None:
+        index, source, raw_meta = task
+        item = _decode_stage(source, raw_meta, variants)
+        if item.pending():
+            _queue_put(decoded, (index, item), cancel)
+        else:
+            results.put((index, item.results()))
+
+    def _handle_render(task: tuple[int, _StageItem]) -> None:
+        index, item = task
+        _render_stage(item, batcher)
+        if item.pending():
+            _queue_put(rendered, (index, item), cancel)
+        else:
+            results.put((index, item.results()))
+
+    def _handle_encode(task: tuple[int, _StageItem]) -> None:
+        index, item = task
+        results.put((index, _encode_stage(item).results()))
+
+    def _task_failed(task: tuple[Any, ...], exc: Exception) -> None:
+        # decode tasks carry the source path, later stages the _StageItem
+        index, payload = task[0], task[1]
+        if isinstance(payload, _StageItem):
+            payload.fail_pending(str(exc))
+            results.put((index, payload.results()))
+        else:
+            results.put((index, _failed_results(payload, variants, str(exc))))
+
+    encoders = _StageWorkers(
+        "encode", cfg.encode_threads, rendered, _handle_encode, cancel, lambda: None, _task_failed
+    )
+    renderers = _StageWorkers(
+        "render",
+        cfg.render_threads,
+        decoded,
+        _handle_render,
+        cancel,
+        lambda: _signal_done(rendered, encoders),
+        _task_failed,
+    )
+    decoders = _StageWorkers(
+        "decode",
+        cfg.decode_threads,
+        inbox,
+        _handle_decode,
+        cancel,
+        lambda: _signal_done(decoded, renderers),
+        _task_failed,
+    )
+
+    def _feed() -> None:
+        total = 0
+        try:
+            for source, raw_meta in tasks:
+                if not _queue_put(inbox, (total, source, raw_meta), cancel):
+                    return
+                total += 1
+        except Exception as exc:
+            results.put((None, exc))
+        finally:
+            _signal_done(inbox, decoders)
+            results.put((None, total))
+
+    for stage in (encoders, renderers, decoders):
+        stage.start()
+    feeder = threading.Thread(target=_feed, name="birdstamp-feed", daemon=True)
+    feeder.start()
+
+    total: int | None = None
+    next_index = 0
+    ready: dict[int, list[RenderResult]] = {}
+    try:
+        while total is None or next_index < total:
+            index, payload = results.get()
+            if index is None:
+                if isinstance(payload, Exception):
+                    raise payload
+                total = int(payload)
+                continue
+            ready[index] = payload
+            while next_index in ready:
+                yield from ready.pop(next_index)
+                next_index += 1
+    finally:
+        cancel.set()
+        if batcher is not None:
+            batcher.close()
+
+
+__all__ = [
+    "DEFAULT_META_CHUNK_SIZE",
+    "PipelineSettings",
+    "RenderOptions",
+    "RenderResult",
+    "attach_manifest",
+    "iter_layout_plans",
+    "iter_pipeline_results",
+    "iter_render_results",
+    "iter_render_tasks",
+    "plan_overlay_layout",
+    "planned_output_size",
+    "render_image",
+    "render_source",
+    "save_image",
+    "source_image_size",
+    "warm_up",
+]
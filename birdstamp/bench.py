@@ -0,0 +1,301 @@
+"""Micro-benchmarks for ``birdstamp bench``.
+
+Every render stage is timed in isolation on deterministic synthetic inputs
+(images with a textured background and a "bird" blob, plus fake EXIF/XMP
+metadata), so numbers are comparable between machines and releases without
+sample photos. Detection is replaced by a fixed bird box: the model is not
+part of the render hot path being measured here.
+"""
+from __future__ import annotations
+
+import io
+import os
+import platform
+import random
+import sys
+import tempfile
+import time
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Callable, Iterable
+
+from PIL import Image, ImageDraw, ImageFilter
+
+from birdstamp import __version__, profiling
+
+BENCH_STAGES = (
+    "decode",
+    "normalize_metadata",
+    "build_template_context",
+    "render_template_overlay",
+    "apply_editor_crop",
+    "resize_fit",
+    "encode_jpeg",
+    "encode_png",
+)
+DEFAULT_BENCH_SIZES = ((1600, 1067), (3000, 2000), (6000, 4000))
+DEFAULT_ITERATIONS = 10
+DEFAULT_WARMUP = 2
+
+# Normalised (left, top, right, bottom) of the synthetic bird.
+_BIRD_BOX = (0.38, 0.30, 0.62, 0.66)
+_CROP_RATIO = 16 / 9
+# Resize/crop targets are a fraction of the source long edge so every size does real work.
+_RESIZE_FACTOR = 0.5
+_EXIF_TAGS = {
+    0x010F: "Canon",                   # Make
+    0x0110: "Canon EOS R5",            # Model
+    0x0132: "2024:05:18 07:42:10",     # DateTime
+    0x010E: "Bench Kingfisher",        # ImageDescription
+    0x013B: "BirdStamp Bench",         # Artist
+}
+
+
+@dataclass(slots=True)
+class BenchResult:
+    stage: str
+    size: tuple[int, int]
+    samples: list[float] = field(default_factory=list)
+
+    @property
+    def megapixels(self) -> float:
+        return self.size[0] * self.size[1] / 1_000_000.0
+
+    def summary(self) -> dict[str, Any]:
+        values = sorted(self.samples)
+        total = sum(values)
+        return {
+            "stage": self.stage,
+            "size": f"{self.size[0]}x{self.size[1]}",
+            "megapixels": round(self.megapixels, 2),
+            "iterations": len(values),
+            "ops_per_sec": round(len(values) / total, 3) if total > 0 else None,
+            "mean_ms": round(total / len(values) * 1000.0, 3) if values else None,
+            "p50_ms": round(profiling.percentile(values, 0.50) * 1000.0, 3) if values else None,
+            "p95_ms": round(profiling.percentile(values, 0.95) * 1000.0, 3) if values else None,
+            "min_ms": round(values[0] * 1000.0, 3) if values else None,
+        }
+
+
+def parse_size(text: str) -> tuple[int, int]:
+    """``"3000x2000"`` -> ``(3000, 2000)``."""
+    try:
+        width_text, height_text = str(text).lower().replace("*", "x").split("x", 1)
+        width, height = int(width_text), int(height_text)
+    except ValueError:
+        raise ValueError(f"size must look like 3000x2000, got: {text!r}") from None
+    if width <= 0 or height <= 0:
+        raise ValueError(f"size must be positive, got: {text!r}")
+    return width, height
+
+
+def synthetic_image(width: int, height: int, seed: int = 0) -> Image.Image:
+    """Deterministic RGB test image: sky gradient, noise texture and a bird-like blob.
+
+    The noise keeps JPEG/PNG encoders honest (flat images compress unrealistically well).
+    """
+    rng = random.Random(seed)
+    top = Image.new("RGB", (1, 1), (96, 148, 196))
+    bottom = Image.new("RGB", (1, 1), (58, 92, 54))
+    mask = Image.linear_gradient("L").resize((width, height))
+    image = Image.composite(bottom.resize((width, height)), top.resize((width, height)), mask)
+
+    tile = Image.frombytes("L", (256, 256), rng.randbytes(256 * 256)).filter(ImageFilter.BoxBlur(1))
+    texture = Image.new("L", (width, height))
+    for y in range(0, height, 256):
+        for x in range(0, width, 256):
+            texture.paste(tile, (x, y))
+    image = Image.blend(image, Image.merge("RGB", (texture, texture, texture)), 0.18)
+
+    draw = ImageDraw.Draw(image)
+    left, top_, right, bottom_ = _BIRD_BOX
+    body = (int(left * width), int(top_ * height), int(right * width), int(bottom_ * height))
+    draw.ellipse(body, fill=(176, 92, 38))
+    head_r = max(4, (body[2] - body[0]) // 5)
+    head_c = (body[2] - head_r, body[1] + head_r)
+    draw.ellipse((head_c[0] - head_r, head_c[1] - head_r, head_c[0] + head_r, head_c[1] + head_r), fill=(40, 96, 160))
+    for _ in range(24):
+        x = rng.randrange(width)
+        y = rng.randrange(int(height * 0.7), height)
+        end = (x + rng.randrange(-width // 8, width // 8), y - rng.randrange(height // 6))
+        draw.line((x, y, *end), fill=(70, 52, 30), width=max(2, width // 400))
+    return image
+
+
+def synthetic_metadata(source: Path) -> dict[str, Any]:
+    """Fake exiftool-style metadata (EXIF, XMP and IPTC groups) for ``source``."""
+    return {
+        "SourceFile": str(source),
+        "EXIF:Make": "Canon",
+        "EXIF:Model": "Canon EOS R5",
+        "EXIF:LensModel": "RF100-500mm F4.5-7.1 L IS USM",
+        "EXIF:DateTimeOriginal": "2024:05:18 07:42:10",
+        "EXIF:FNumber": 7.1,
+        "EXIF:ExposureTime": "1/2000",
+        "EXIF:ISO": 1600,
+        "EXIF:FocalLength": "500.0 mm",
+        "EXIF:FocalLengthIn35mmFormat": "500 mm",
+        "EXIF:ImageWidth": 6000,
+        "EXIF:ImageHeight": 4000,
+        "Composite:GPSLatitude": 31.2304,
+        "Composite:GPSLongitude": 121.4737,
+        "XMP:Title": "普通翠鸟 Common Kingfisher",
+        "XMP:Description": "Bench Kingfisher",
+        "XMP:Creator": "BirdStamp Bench",
+        "XMP:Rating": 4,
+        "XMP:Lens": "RF100-500mm F4.5-7.1 L IS USM",
+        "IPTC:City": "上海",
+        "IPTC:Country-PrimaryLocationName": "中国",
+        "IPTC:Sub-location": "世纪公园",
+    }
+
+
+def write_synthetic_jpeg(image: Image.Image, path: Path, quality: int = 92) -> Path:
+    exif = Image.Exif()
+    for tag, value in _EXIF_TAGS.items():
+        exif[tag] = value
+    image.save(path, format="JPEG", quality=quality, exif=exif.tobytes())
+    return path
+
+
+def _time_calls(fn: Callable[[], Any], iterations: int, warmup: int) -> list[float]:
+    for _ in range(max(0, warmup)):
+        fn()
+    samples: list[float] = []
+    for _ in range(max(1, iterations)):
+        t0 = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - t0)
+    return samples
+
+
+def _stage_calls(
+    image: Image.Image,
+    source: Path,
+    raw_meta: dict[str, Any],
+    template_payload: dict[str, Any],
+    quality: int,
+) -> dict[str, Callable[[], Any]]:
+    from birdstamp.batch_render import save_image
+    from birdstamp.decoders.image_decoder import decode_image
+    from birdstamp.gui.editor_core import CENTER_MODE_BIRD, apply_editor_crop, resize_fit
+    from birdstamp.gui.editor_template import compile_template, render_template_overlay
+    from birdstamp.gui.template_context import build_template_context
+    from birdstamp.meta.normalize import normalize_metadata
+
+    context = build_template_context(source, raw_meta)
+    template = compile_template(template_payload)
+    resize_edge = max(1, int(max(image.size) * _RESIZE_FACTOR))
+
+    def _crop() -> Image.Image:
+        return apply_editor_crop(
+            image,
+            source_path=source,
+            raw_metadata=raw_meta,
+            ratio=_CROP_RATIO,
+            center_mode=CENTER_MODE_BIRD,
+            crop_padding_px=0,
+            max_long_edge=resize_edge,
+            bird_box_provider=lambda _img: _BIRD_BOX,
+        )
+
+    def _encode(pil_format: str) -> Callable[[], None]:
+        return lambda: save_image(image, io.BytesIO(), pil_format=pil_format, quality=quality)
+
+    return {
+        "decode": lambda: decode_image(source),
+        "normalize_metadata": lambda: normalize_metadata(
+            source,
+            raw_meta,
+            bird_arg=None,
+            bird_priority=["meta", "filename"],
+            bird_regex=r"(?P<bird>[^_]+)_",
+        ),
+        "build_template_context": lambda: build_template_context(source, raw_meta),
+        "render_template_overlay": lambda: render_template_overlay(
+            image,
+            raw_metadata=raw_meta,
+            metadata_context=context,
+            template_payload=template,
+        ),
+        "apply_editor_crop": _crop,
+        "resize_fit": lambda: resize_fit(image, resize_edge),
+        "encode_jpeg": _encode("JPEG"),
+        "encode_png": _encode("PNG"),
+    }
+
+
+def run_bench(
+    *,
+    sizes: Iterable[tuple[int, int]] = DEFAULT_BENCH_SIZES,
+    stages: Iterable[str] | None = None,
+    iterations: int = DEFAULT_ITERATIONS,
+    warmup: int = DEFAULT_WARMUP,
+    template_payload: dict[str, Any] | None = None,
+    quality: int = 92,
+    on_result: Callable[[BenchResult], None] | None = None,
+) -> list[BenchResult]:
+    """Time each stage at each size; ``on_result`` is called as results complete."""
+    selected = list(stages) if stages else list(BENCH_STAGES)
+    unknown = [name for name in selected if name not in BENCH_STAGES]
+    if unknown:
+        raise ValueError(f"unknown bench stage(s): {', '.join(unknown)} (choose from {', '.join(BENCH_STAGES)})")
+    if template_payload is None:
+        from birdstamp.gui.editor_template import default_template_payload
+
+        template_payload = default_template_payload()
+
+    results: list[BenchResult] = []
+    with tempfile.TemporaryDirectory(prefix="birdstamp-bench-") as tmp:
+        for index, (width, height) in enumerate(sizes):
+            image = synthetic_image(width, height, seed=index)
+            source = write_synthetic_jpeg(image, Path(tmp) / f"翠鸟_bench_{width}x{height}.jpg")
+            raw_meta = synthetic_metadata(source)
+            calls = _stage_calls(image, source, raw_meta, template_payload, quality)
+            for stage in selected:
+                result = BenchResult(stage=stage, size=(width, height))
+                result.samples = _time_calls(calls[stage], iterations, warmup)
+                results.append(result)
+                if on_result is not None:
+                    on_result(result)
+    return results
+
+
+def environment_info() -> dict[str, Any]:
+    """Versions/machine facts stored with ``--json`` output so runs can be compared."""
+    return {
+        "birdstamp": __version__,
+        "python": sys.version.split()[0],
+        "pillow": Image.__version__,
+        "platform": platform.platform(),
+        "machine": platform.machine(),
+        "cpu_count": os.cpu_count(),
+    }
+
+
+def format_result_row(result: BenchResult) -> str:
+    s = result.summary()
+    return (
+        f"{s['stage']:<24} {s['size']:>10} {s['ops_per_sec'] or 0:>10.2f} "
+        f"{s['p50_ms'] or 0:>10.2f} {s['p95_ms'] or 0:>10.2f}"
+    )
+
+
+BENCH_TABLE_HEADER = f"{'stage':<24} {'size':>10} {'ops/s':>10} {'p50 ms':>10} {'p95 ms':>10}"
+
+
+__all__ = [
+    "BENCH_STAGES",
+    "BENCH_TABLE_HEADER",
+    "BenchResult",
+    "DEFAULT_BENCH_SIZES",
+    "DEFAULT_ITERATIONS",
+    "DEFAULT_WARMUP",
+    "environment_info",
+    "format_result_row",
+    "parse_size",
+    "run_bench",
+    "synthetic_image",
+    "synthetic_metadata",
+    "write_synthetic_jpeg",
+]
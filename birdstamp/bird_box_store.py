@@ -0,0 +1,234 @@
+"""Persistent bird-box store shared by the GUI, CLI and video export.
+
+Detection results live in a small SQLite database keyed by the source
+signature (path, size, mtime_ns) and a detector key (model file plus the
+detection parameters), so a photo is detected once per model/settings no
+matter which tool, session or export asks for it. "No bird" is stored too;
+callers must not store results of a detector that failed to run.
+
+Each thread gets its own connection and the database runs in WAL mode with a
+busy timeout, so render threads and worker processes can read and write
+concurrently. Rows are evicted least-recently-used beyond ``max_entries``.
+Database errors never reach the caller: a broken store behaves as a miss.
+"""
+from __future__ import annotations
+
+import logging
+import os
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Any
+
+from birdstamp.config import get_user_data_dir
+from birdstamp.manifest import source_signature
+
+_log = logging.getLogger(__name__)
+
+BirdBox = tuple[float, float, float, float]
+
+BIRD_BOX_STORE_FILENAME = "bird_boxes.sqlite3"
+DEFAULT_BIRD_BOX_STORE_MAX_ENTRIES = 100_000
+_BUSY_TIMEOUT_SECONDS = 10.0
+# A hit refreshes ``last_used`` at most this often, so reads rarely need the write lock.
+_TOUCH_INTERVAL_SECONDS = 24 * 3600.0
+# Prune every N inserts (and once when a process opens the store).
+_PRUNE_EVERY_PUTS = 256
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS bird_boxes (
+    path TEXT NOT NULL,
+    size INTEGER NOT NULL,
+    mtime_ns INTEGER NOT NULL,
+    detector TEXT NOT NULL,
+    has_box INTEGER NOT NULL,
+    x1 REAL, y1 REAL, x2 REAL, y2 REAL,
+    last_used REAL NOT NULL,
+    PRIMARY KEY (path, size, mtime_ns, detector)
+);
+CREATE INDEX IF NOT EXISTS bird_boxes_last_used ON bird_boxes (last_used);
+"""
+
+
+def default_bird_box_store_path() -> Path:
+    return get_user_data_dir() / "Cache" / BIRD_BOX_STORE_FILENAME
+
+
+class BirdBoxStore:
+    """SQLite-backed ``(source signature, detector key) -> bird box or None``."""
+
+    def __init__(self, path: Path, *, max_entries: int = DEFAULT_BIRD_BOX_STORE_MAX_ENTRIES) -> None:
+        self.path = Path(path)
+        self.max_entries = max(1, int(max_entries))
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._puts = 0
+        self.hits = 0
+        self.misses = 0
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        conn = self._connection()
+        with conn:
+            conn.executescript(_SCHEMA)
+        self.prune()
+
+    def _connection(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(str(self.path), timeout=_BUSY_TIMEOUT_SECONDS, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    @staticmethod
+    def _signature(source: Path) -> dict[str, Any] | None:
+        try:
+            return source_signature(Path(source))
+        except OSError:
+            return None
+
+    def get(self, source: Path, detector_key: str) -> tuple[bool, BirdBox | None]:
+        """``(found, box)``; ``(True, None)`` means "detected, no bird"."""
+        signature = self._signature(source)
+        if signature is None:
+            return (False, None)
+        try:
+            conn = self._connection()
+            row = conn.execute(
+                "SELECT has_box, x1, y1, x2, y2, last_used FROM bird_boxes"
+                " WHERE path = ? AND size = ? AND mtime_ns = ? AND detector = ?",
+                (signature["path"], signature["size"], signature["mtime_ns"], detector_key),
+            ).fetchone()
+            if row is not None and time.time() - float(row[5]) > _TOUCH_INTERVAL_SECONDS:
+                conn.execute(
+                    "UPDATE bird_boxes SET last_used = ?"
+                    " WHERE path = ? AND size = ? AND mtime_ns = ? AND detector = ?",
+                    (time.time(), signature["path"], signature["size"], signature["mtime_ns"], detector_key),
+                )
+        except sqlite3.Error as exc:
+            _log.debug("bird box store read failed: %s (%s)", self.path, exc)
+            return (False, None)
+        with self._lock:
+            if row is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+        if row is None:
+            return (False, None)
+        if not row[0]:
+            return (True, None)
+        return (True, (float(row[1]), float(row[2]), float(row[3]), float(row[4])))
+
+    def put(self, source: Path, detector_key: str, box: BirdBox | None) -> None:
+        signature = self._signature(source)
+        if signature is None:
+            return
+        values = tuple(float(v) for v in box) if box is not None else (None, None, None, None)
+        try:
+            conn = self._connection()
+            with conn:
+                conn.execute("BEGIN IMMEDIATE")
+                # 同一路径的旧版本（文件被修改过）不会再命中，顺手删掉。
+                conn.execute(
+                    "DELETE FROM bird_boxes WHERE path = ? AND detector = ? AND (size != ? OR mtime_ns != ?)",
+                    (signature["path"], detector_key, signature["size"], signature["mtime_ns"]),
+                )
+                conn.execute(
+                    "INSERT OR REPLACE INTO bird_boxes"
+                    " (path, size, mtime_ns, detector, has_box, x1, y1, x2, y2, last_used)"
+                    " VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                    (
+                        signature["path"],
+                        signature["size"],
+                        signature["mtime_ns"],
+                        detector_key,
+                        1 if box is not None else 0,
+                        *values,
+                        time.time(),
+                    ),
+                )
+        except sqlite3.Error as exc:
+            _log.debug("bird box store write failed: %s (%s)", self.path, exc)
+            return
+        with self._lock:
+            self._puts += 1
+            due = self._puts % _PRUNE_EVERY_PUTS == 0
+        if due:
+            self.prune()
+
+    def discard(self, source: Path) -> None:
+        """Forget every result recorded for ``source`` (any version, any detector)."""
+        try:
+            path = str(Path(source).resolve(strict=False))
+            self._connection().execute("DELETE FROM bird_boxes WHERE path = ?", (path,))
+        except sqlite3.Error as exc:
+            _log.debug("bird box store delete failed: %s (%s)", self.path, exc)
+
+    def prune(self) -> int:
+        """Drop the least recently used rows beyond ``max_entries``; returns the number removed."""
+        try:
+            conn = self._connection()
+            with conn:
+                conn.execute("BEGIN IMMEDIATE")
+                count = int(conn.execute("SELECT COUNT(*) FROM bird_boxes").fetchone()[0])
+                excess = count - self.max_entries
+                if excess <= 0:
+                    return 0
+                conn.execute(
+                    "DELETE FROM bird_boxes WHERE rowid IN"
+                    " (SELECT rowid FROM bird_boxes ORDER BY last_used ASC LIMIT ?)",
+                    (excess,),
+                )
+                return excess
+        except sqlite3.Error as exc:
+            _log.debug("bird box store prune failed: %s (%s)", self.path, exc)
+            return 0
+
+    def __len__(self) -> int:
+        try:
+            return int(self._connection().execute("SELECT COUNT(*) FROM bird_boxes").fetchone()[0])
+        except sqlite3.Error:
+            return 0
+
+    def stats(self) -> dict[str, Any]:
+        with self._lock:
+            return {"path": str(self.path), "entries": len(self), "hits": self.hits, "misses": self.misses}
+
+    def close(self) -> None:
+        """Close this thread's connection (other threads' connections close with their thread)."""
+        conn = getattr(self._local, "conn", None)
+        if conn is not None:
+            self._local.conn = None
+            conn.close()
+
+
+_SHARED_STORES: dict[tuple[str, int], BirdBoxStore | None] = {}
+_SHARED_LOCK = threading.Lock()
+
+
+def shared_bird_box_store(
+    path: Path | None = None,
+    *,
+    max_entries: int = DEFAULT_BIRD_BOX_STORE_MAX_ENTRIES,
+) -> BirdBoxStore | None:
+    """One store per path and process (default path when ``path`` is None); None if it cannot be opened."""
+    target = Path(path) if path is not None else default_bird_box_store_path()
+    key = (os.path.abspath(target), int(max_entries))
+    with _SHARED_LOCK:
+        if key not in _SHARED_STORES:
+            try:
+                _SHARED_STORES[key] = BirdBoxStore(target, max_entries=max_entries)
+            except (OSError, sqlite3.Error) as exc:
+                _log.warning("bird box store unavailable, detections will not be cached: %s (%s)", target, exc)
+                _SHARED_STORES[key] = None
+        return _SHARED_STORES[key]
+
+
+__all__ = [
+    "BIRD_BOX_STORE_FILENAME",
+    "BirdBoxStore",
+    "DEFAULT_BIRD_BOX_STORE_MAX_ENTRIES",
+    "default_bird_box_store_path",
+    "shared_bird_box_store",
+]
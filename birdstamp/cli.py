@@ -1,25 +1,27 @@
 from __future__ import annotations
 
+import dataclasses
+import itertools
 import json
 import logging
-import time
-from dataclasses import dataclass
+import multiprocessing
+import os
 from pathlib import Path
+from typing import Any
 
 import typer
 
+from birdstamp import profiling
 from birdstamp.config import load_config, write_default_config
+from birdstamp.cpu_budget import CPU_BUDGET_ENV_VAR, CpuBudget, apply_detector_budget, plan_cpu_budget
 from birdstamp.constants import SUPPORTED_EXTENSIONS
-from birdstamp.decoders.image_decoder import decode_image
-from birdstamp.discover import discover_inputs
+from birdstamp.discover import iter_inputs
 from app_common.exif_io import (
-    extract_many_with_xmp_priority,
     extract_metadata_with_xmp_priority,
     get_exiftool_executable_path,
     find_xmp_sidecar,
 )
 from birdstamp.meta.normalize import normalize_metadata
-from birdstamp.naming import build_output_name
 from birdstamp.gui.template_context import (
     AutoProxyTemplateContextProvider,
     PhotoInfo,
@@ -29,15 +31,8 @@ from birdstamp.gui.template_context import (
 
 app = typer.Typer(add_completion=False, no_args_is_help=True, help="极速鸟框 photo banner CLI.")
 LOGGER = logging.getLogger("birdstamp")
-
-
-@dataclass(slots=True)
-class _Result:
-    source: Path
-    status: str          # ok | skipped | failed
-    output: Path | None = None
-    elapsed: float = 0.0
-    error: str | None = None
+# Save the render manifest every N results so an interrupted run keeps its progress.
+_MANIFEST_SAVE_INTERVAL = 100
 
 
 def _setup_logging(level: str) -> None:
@@ -58,6 +53,21 @@ def _parse_multi_values(values: list[str]) -> list[str]:
     return items
 
 
+def _resolve_ignore_patterns(values: list[str] | None, cfg: dict) -> list[str]:
+    """Config ``ignore`` patterns plus ``--ignore`` (comma separated allowed); case is kept."""
+    raw: list[str] = []
+    cfg_value = cfg.get("ignore") or []
+    raw.extend([cfg_value] if isinstance(cfg_value, str) else [str(v) for v in cfg_value])
+    raw.extend(values or [])
+    patterns: list[str] = []
+    for value in raw:
+        for item in str(value).split(","):
+            token = item.strip()
+            if token and token not in patterns:
+                patterns.append(token)
+    return patterns
+
+
 def _resolve_output_format(fmt: str) -> tuple[str, str]:
     f = fmt.lower()
     if f in {"jpeg", "jpg"}:
@@ -67,12 +77,105 @@ def _resolve_output_format(fmt: str) -> tuple[str, str]:
     raise ValueError(f"output format must be jpeg/jpg or png, got: {fmt!r}")
 
 
-def _save_image(image, path: Path, pil_format: str, quality: int) -> None:
-    path.parent.mkdir(parents=True, exist_ok=True)
-    if pil_format == "JPEG":
-        image.save(path, format="JPEG", quality=max(1, min(100, quality)), optimize=True, progressive=True)
+def _configured_count(value: int | None, section: dict, key: str) -> int:
+    """CLI value wins, then ``section[key]``; 0 means not set (sized from the CPU budget)."""
+    if value is not None:
+        return max(0, int(value))
+    try:
+        return max(0, int(section.get(key) or 0))
+    except (TypeError, ValueError):
+        return 0
+
+
+def _warn_over_budget(what: str, count: int, budget: CpuBudget) -> None:
+    if count > budget.total:
+        LOGGER.warning("%s (%d) exceed the CPU budget of %d cores", what, count, budget.total)
+
+
+def _resolve_jobs(jobs: int | None, cfg: dict) -> int:
+    """CLI ``--jobs`` wins, then config ``jobs``; unset / 0 = the render share of the CPU budget."""
+    budget = plan_cpu_budget()
+    count = _configured_count(jobs, cfg, "jobs")
+    if count <= 0:
+        return budget.render_workers
+    _warn_over_budget("Render workers", count, budget)
+    return count
+
+
+def _resolve_pipeline_threads(
+    decode_threads: int | None,
+    render_threads: int | None,
+    encode_threads: int | None,
+    section: dict,
+) -> tuple[int, int, int]:
+    """Pipeline stage threads; unset counts split the render share of the CPU budget
+    (a quarter each to decode and encode, the rest to render, at least one per stage)."""
+    budget = plan_cpu_budget()
+    decode = _configured_count(decode_threads, section, "decode_threads")
+    render = _configured_count(render_threads, section, "render_threads")
+    encode = _configured_count(encode_threads, section, "encode_threads")
+    explicit = bool(decode or render or encode)
+    share = budget.render_workers
+    decode = decode or max(1, share // 4)
+    encode = encode or max(1, share // 4)
+    render = render or max(1, share - decode - encode)
+    if explicit:
+        _warn_over_budget("Pipeline threads", decode + render + encode, budget)
+    return decode, render, encode
+
+
+def _resolve_positive_int(value: int | None, section: dict, key: str, fallback: int) -> int:
+    """CLI value wins; otherwise ``section[key]``; anything invalid falls back."""
+    if value is not None:
+        return max(1, int(value))
+    try:
+        return max(1, int(section.get(key) or fallback))
+    except (TypeError, ValueError):
+        return fallback
+
+
+def _configure_bird_detector(cfg: dict) -> None:
+    """Apply config ``bird_detector`` (auto|onnx|ultralytics) unless the environment already selects one.
+
+    Passed on through the environment so render worker processes use the same backend.
+    """
+    from birdstamp.gui.editor_core import BIRD_DETECTOR_BACKENDS, BIRD_DETECTOR_ENV_VAR
+
+    if os.environ.get(BIRD_DETECTOR_ENV_VAR):
+        return
+    backend = str(cfg.get("bird_detector") or "auto").strip().lower()
+    if backend not in BIRD_DETECTOR_BACKENDS:
+        LOGGER.warning("Unknown bird_detector %r in config, using auto", backend)
+        backend = "auto"
+    os.environ[BIRD_DETECTOR_ENV_VAR] = backend
+
+
+def _configure_cpu_budget(cpu_budget: int | None, cfg: dict) -> None:
+    """``--cpu-budget`` wins, then a budget already set in the environment, then config ``cpu_budget``.
+
+    0 means every available core. Passed on through the environment like ``bird_detector``.
+    """
+    if cpu_budget is None:
+        if os.environ.get(CPU_BUDGET_ENV_VAR):
+            return
+        try:
+            cpu_budget = max(0, int(cfg.get("cpu_budget") or 0))
+        except (TypeError, ValueError):
+            LOGGER.warning("Invalid cpu_budget %r in config, using all cores", cfg.get("cpu_budget"))
+            cpu_budget = 0
+    if cpu_budget > 0:
+        os.environ[CPU_BUDGET_ENV_VAR] = str(cpu_budget)
     else:
-        image.save(path, format="PNG", optimize=True)
+        os.environ.pop(CPU_BUDGET_ENV_VAR, None)
+
+
+def _log_cpu_budget(budget: CpuBudget) -> None:
+    LOGGER.info(
+        "CPU budget: %d cores -> render=%d, detector=%d threads",
+        budget.total,
+        budget.render_workers,
+        budget.detector_threads,
+    )
 
 
 def _find_template_path(template_arg: str | None) -> Path | None:
@@ -98,158 +201,408 @@ def _find_template_path(template_arg: str | None) -> Path | None:
     return None
 
 
+def _load_render_template(template: str | None) -> dict:
+    """Template payload for ``--template`` (name, path or built-in default); exits on errors."""
+    try:
+        from birdstamp.gui.editor_template import (
+            default_template_payload,
+            load_template_payload,
+            normalize_template_payload,
+        )
+    except Exception as exc:
+        typer.secho(f"Render engine unavailable: {exc}", err=True, fg=typer.colors.RED)
+        raise typer.Exit(1)
+
+    tpl_path = _find_template_path(template)
+    if tpl_path is not None:
+        try:
+            raw_payload = load_template_payload(tpl_path)
+            template_payload = normalize_template_payload(raw_payload, fallback_name=tpl_path.stem)
+            LOGGER.info("Template: %s", tpl_path)
+        except Exception as exc:
+            typer.secho(f"Template load failed: {exc}", err=True, fg=typer.colors.RED)
+            raise typer.Exit(1)
+    else:
+        template_payload = default_template_payload(name=template or "default")
+        LOGGER.info("Template: built-in default")
+    return template_payload
+
+
+def _build_render_options(
+    cfg: dict,
+    *,
+    template: str | None,
+    out_dir: Path,
+    output_format: str | None,
+    quality: int | None,
+    max_long_edge: int | None,
+    name_template: str | None,
+    use_exiftool: str | None,
+    skip_existing: bool,
+    draw_banner: bool,
+    draw_text: bool,
+):
+    """Resolve CLI options against the config into ``RenderOptions`` (shared by render/watch)."""
+    from birdstamp.batch_render import RenderOptions
+
+    fmt_str = output_format or str(cfg.get("output_format", "jpeg"))
+    try:
+        out_ext, pil_format = _resolve_output_format(fmt_str)
+    except ValueError as exc:
+        typer.secho(str(exc), err=True, fg=typer.colors.RED)
+        raise typer.Exit(1)
+
+    template_payload = _load_render_template(template)
+    # Resolved template name used in output filename {template} placeholder
+    tpl_name: str = str(template_payload.get("name") or template or "banner")
+
+    return RenderOptions(
+        template_payload=template_payload,
+        template_name=tpl_name,
+        out_dir=out_dir,
+        out_ext=out_ext,
+        pil_format=pil_format,
+        quality=int(quality if quality is not None else cfg.get("quality", 92)),
+        max_long_edge=int(max_long_edge if max_long_edge is not None else cfg.get("max_long_edge", 0)),
+        name_template=name_template or str(cfg.get("name_template", "{stem}__banner.{ext}")),
+        exiftool_mode=(use_exiftool or str(cfg.get("use_exiftool", "auto"))).lower(),
+        skip_existing=skip_existing,
+        draw_banner=draw_banner,
+        draw_text=draw_text,
+    )
+
+
+def _unique_template_labels(bases: list) -> list[str]:
+    """``{variant}`` label per ``(--template argument, RenderOptions)``, unique as a file name token.
+
+    The template's own name is used when unambiguous; templates sharing a name
+    fall back to the argument's file stem, and remaining clashes get ``-2``, ``-3``, ...
+    """
+    from birdstamp.naming import sanitize_token
+
+    def _token(value: str) -> str:
+        return sanitize_token(value, fallback="banner")
+
+    names = [_token(options.template_name) for _tpl, options in bases]
+    labels = [
+        name if names.count(name) == 1 else _token(Path(tpl).stem if tpl else "default")
+        for name, (tpl, _options) in zip(names, bases)
+    ]
+    unique: list[str] = []
+    for label in labels:
+        candidate, index = label, 1
+        while candidate in unique:
+            index += 1
+            candidate = f"{label}-{index}"
+        unique.append(candidate)
+    return unique
+
+
+def _build_render_variants(
+    cfg: dict,
+    *,
+    templates: list[str | None],
+    max_long_edges: list[int | None],
+    name_template: str | None,
+    **kwargs,
+) -> list:
+    """One ``RenderOptions`` per template × size; several variants get a ``{variant}`` name token."""
+    bases = [
+        (tpl, _build_render_options(cfg, template=tpl, max_long_edge=None, name_template=name_template, **kwargs))
+        for tpl in dict.fromkeys(templates)
+    ]
+    labelled = []
+    for (_tpl, base), label in zip(bases, _unique_template_labels(bases)):
+        for edge in dict.fromkeys(max_long_edges):
+            if edge is None:
+                labelled.append((label, dataclasses.replace(base)))
+            else:
+                labelled.append((label, dataclasses.replace(base, max_long_edge=int(edge))))
+    variants = [options for _label, options in labelled]
+    if len(variants) == 1:
+        return variants
+
+    multi_template = len(bases) > 1
+    multi_size = len(set(max_long_edges)) > 1
+    for template_label, options in labelled:
+        size_label = f"{options.max_long_edge}px" if options.max_long_edge > 0 else "full"
+        if multi_template and multi_size:
+            options.variant = f"{template_label}_{size_label}"
+        elif multi_template:
+            options.variant = template_label
+        else:
+            options.variant = size_label
+    name_tmpl = variants[0].name_template
+    if "{variant}" not in name_tmpl:
+        name_tmpl = name_tmpl.replace(".{ext}", "__{variant}.{ext}") if ".{ext}" in name_tmpl else f"{name_tmpl}__{{variant}}"
+        LOGGER.info("Output name template: %s (one file per variant)", name_tmpl)
+        for options in variants:
+            options.name_template = name_tmpl
+    LOGGER.info("Variants: %s", ", ".join(options.variant for options in variants))
+    return variants
+
+
+def _open_manifest(options, use_manifest: bool | None, cfg: dict):
+    if not bool(use_manifest if use_manifest is not None else cfg.get("manifest", True)):
+        return None
+    from birdstamp.batch_render import attach_manifest
+    from birdstamp.manifest import RenderManifest
+
+    out_dir = options[0].out_dir if isinstance(options, list) else options.out_dir
+    manifest = RenderManifest.load(out_dir)
+    attach_manifest(options, manifest)
+    return manifest
+
+
+def _attach_bird_box_store(options: list, use_bird_cache: bool | None, cfg: dict) -> None:
+    if not bool(use_bird_cache if use_bird_cache is not None else cfg.get("bird_box_cache", True)):
+        return
+    from birdstamp.bird_box_store import default_bird_box_store_path
+
+    store_path = default_bird_box_store_path()
+    for variant in options:
+        variant.bird_box_store_path = store_path
+
+
+def _record_result(r, manifest, *, save: bool = False) -> None:
+    """Log one render result and fold its record into the manifest."""
+    if manifest is not None and r.record is not None and r.output is not None and r.status != "failed":
+        manifest.update(manifest.key_for(r.output), r.record)
+        if save:
+            manifest.save()
+    if r.status == "ok":
+        LOGGER.info("OK   %s -> %s  (%.2fs)", r.source.name, r.output.name if r.output else "-", r.elapsed)
+    elif r.status == "skipped":
+        LOGGER.info("SKIP %s (%s)", r.source.name, "up to date" if manifest is not None else "exists")
+    else:
+        LOGGER.error("FAIL %s  %s", r.source.name, r.error)
+
+
+def _result_payload(r) -> dict[str, Any]:
+    """One ``--report`` line for a render result."""
+    return {
+        "source": str(r.source),
+        "output": str(r.output) if r.output else None,
+        "variant": r.variant or None,
+        "status": r.status,
+        "error": r.error,
+        "elapsed": round(r.elapsed, 6),
+        "megapixels": r.megapixels,
+        "peak_rss_mb": r.peak_rss_mb,
+        "timings": {name: round(seconds, 6) for name, seconds in r.timings.items()},
+    }
+
+
 @app.command()
 def render(
     input_path: Path = typer.Argument(..., exists=True, resolve_path=True),
     out: Path | None = typer.Option(None, "--out", help="Output directory."),
     recursive: bool = typer.Option(False, "--recursive", help="Recursively scan input directories."),
-    template: str | None = typer.Option(None, "--template", help="Template name or .json file path (default: built-in default)."),
-    max_long_edge: int | None = typer.Option(None, "--max-long-edge", min=0, help="Resize long edge to this value (0=unlimited)."),
+    ignore: list[str] | None = typer.Option(
+        None, "--ignore", help='Skip files/folders matching this glob (repeatable), e.g. "*_tmp*" or "rejects/*".'
+    ),
+    template: list[str] | None = typer.Option(
+        None, "--template", help="Template name or .json file path (default: built-in default); repeat for several variants."
+    ),
+    max_long_edge: list[int] | None = typer.Option(
+        None, "--max-long-edge", min=0, help="Resize long edge to this value (0=unlimited); repeat for several sizes."
+    ),
     output_format: str | None = typer.Option(None, "--format", help="Output format: jpeg|png"),
     quality: int | None = typer.Option(None, "--quality", min=1, max=100),
     name_template: str | None = typer.Option(None, "--name", help='Output filename template, e.g. "{stem}__banner.{ext}"'),
     use_exiftool: str | None = typer.Option(None, "--use-exiftool", help="auto|on|off"),
     skip_existing: bool = typer.Option(True, "--skip-existing/--no-skip-existing"),
+    use_manifest: bool | None = typer.Option(
+        None,
+        "--manifest/--no-manifest",
+        help="Skip only outputs whose source, template, options and metadata are unchanged (default: config 'manifest').",
+    ),
+    use_bird_cache: bool | None = typer.Option(
+        None,
+        "--bird-cache/--no-bird-cache",
+        help="Reuse bird boxes detected in earlier runs, GUI sessions and video exports (default: config 'bird_box_cache').",
+    ),
     draw_banner: bool = typer.Option(True, "--draw-banner/--no-draw-banner", help="Draw banner background."),
     draw_text: bool = typer.Option(True, "--draw-text/--no-draw-text", help="Draw text fields."),
+    meta_chunk: int | None = typer.Option(
+        None, "--meta-chunk", min=1, help="Files per metadata extraction batch (default: config 'meta_chunk_size')."
+    ),
+    jobs: int | None = typer.Option(None, "--jobs", "-j", min=1, help="Render worker processes (default: config 'jobs', else the CPU budget's render share)."),
+    pipeline: bool | None = typer.Option(
+        None,
+        "--pipeline/--no-pipeline",
+        help="Overlap decode/render/encode on threads instead of worker processes (default: config 'pipeline.enabled').",
+    ),
+    decode_threads: int | None = typer.Option(None, "--decode-threads", min=1, help="Pipeline reader/decoder threads (default: from the CPU budget)."),
+    render_threads: int | None = typer.Option(None, "--render-threads", min=1, help="Pipeline overlay render threads (default: from the CPU budget)."),
+    encode_threads: int | None = typer.Option(None, "--encode-threads", min=1, help="Pipeline encoder/writer threads (default: from the CPU budget)."),
+    decode_queue: int | None = typer.Option(None, "--decode-queue", min=1, help="Decoded images buffered before render."),
+    encode_queue: int | None = typer.Option(None, "--encode-queue", min=1, help="Rendered images buffered before encode."),
+    detect_batch: int | None = typer.Option(
+        None, "--detect-batch", min=1, help="Pipeline: max images per batched bird-detection call (1 = no batching)."
+    ),
+    cpu_budget: int | None = typer.Option(
+        None,
+        "--cpu-budget",
+        min=0,
+        help="Cores shared by render workers and the bird detector (0 = all; default: config 'cpu_budget').",
+    ),
+    report: Path | None = typer.Option(
+        None, "--report", help="Write per-file stage timings and a run summary as JSON lines (e.g. run.jsonl)."
+    ),
+    dry_run: bool = typer.Option(
+        False, "--dry-run", help="Print output size and overlay layout per file as JSON lines; no pixels are decoded or written."
+    ),
     log_level: str = typer.Option("info", "--log-level"),
 ) -> None:
     """Render BirdStamp banner overlay onto images using a JSON template."""
+    if dry_run and report is not None:
+        raise typer.BadParameter("cannot be combined with --dry-run (nothing is rendered to report)", param_hint="--report")
     _setup_logging(log_level)
     cfg = load_config()
+    _configure_bird_detector(cfg)
+    _configure_cpu_budget(cpu_budget, cfg)
 
-    fmt_str = output_format or str(cfg.get("output_format", "jpeg"))
-    try:
-        out_ext, pil_format = _resolve_output_format(fmt_str)
-    except ValueError as exc:
-        typer.secho(str(exc), err=True, fg=typer.colors.RED)
-        raise typer.Exit(1)
-
-    quality_val = int(quality if quality is not None else cfg.get("quality", 92))
-    max_edge_val = int(max_long_edge if max_long_edge is not None else cfg.get("max_long_edge", 0))
-    name_tmpl = name_template or str(cfg.get("name_template", "{stem}__banner.{ext}"))
     exiftool_mode = (use_exiftool or str(cfg.get("use_exiftool", "auto"))).lower()
+    pipeline_cfg = cfg.get("pipeline") if isinstance(cfg.get("pipeline"), dict) else {}
+    use_pipeline = bool(pipeline if pipeline is not None else pipeline_cfg.get("enabled", False))
+    jobs_val = 1 if use_pipeline else _resolve_jobs(jobs, cfg)
 
     # Lazy-import GUI rendering modules (PIL-only, no display required)
     try:
-        from birdstamp.gui.editor_template import (
-            default_template_payload,
-            load_template_payload,
-            normalize_template_payload,
-            render_template_overlay,
-        )
-        from birdstamp.gui.editor_utils import build_metadata_context
-        from birdstamp.gui.editor_core import (
-            apply_editor_crop,
-            parse_bool_value as _parse_bool,
-            parse_ratio_value as _parse_ratio,
-            resize_fit,
+        from birdstamp.batch_render import (
+            PipelineSettings,
+            RenderResult,
+            iter_layout_plans,
+            iter_pipeline_results,
+            iter_render_results,
+            iter_render_tasks,
         )
     except Exception as exc:
         typer.secho(f"Render engine unavailable: {exc}", err=True, fg=typer.colors.RED)
         raise typer.Exit(1)
 
-    # Load template payload
-    tpl_path = _find_template_path(template)
-    if tpl_path is not None:
-        try:
-            raw_payload = load_template_payload(tpl_path)
-            template_payload = normalize_template_payload(raw_payload, fallback_name=tpl_path.stem)
-            LOGGER.info("Template: %s", tpl_path)
-        except Exception as exc:
-            typer.secho(f"Template load failed: {exc}", err=True, fg=typer.colors.RED)
-            raise typer.Exit(1)
-    else:
-        template_payload = default_template_payload(name=template or "default")
-        LOGGER.info("Template: built-in default")
+    out_dir = out
+    if out_dir is None:
+        out_dir = (input_path / "output") if input_path.is_dir() else (input_path.parent / "output")
 
-    # Resolved template name used in output filename {template} placeholder
-    tpl_name: str = str(template_payload.get("name") or template or "banner")
+    options = _build_render_variants(
+        cfg,
+        templates=template or [None],
+        max_long_edges=max_long_edge or [None],
+        out_dir=out_dir,
+        output_format=output_format,
+        quality=quality,
+        name_template=name_template,
+        use_exiftool=exiftool_mode,
+        skip_existing=skip_existing,
+        draw_banner=draw_banner,
+        draw_text=draw_text,
+    )
+
+    run_report = profiling.RunReport(report) if report is not None else None
 
-    # Discover files
-    files = discover_inputs(input_path, recursive=recursive)
-    if not files:
+    # Discover files lazily so rendering starts before the tree walk finishes.
+    file_iter = iter_inputs(
+        input_path,
+        recursive=recursive,
+        ignore=_resolve_ignore_patterns(ignore, cfg),
+        exclude_dirs=[out_dir],
+    )
+    if run_report is not None:
+        file_iter = profiling.timed_iter(
+            file_iter, lambda seconds: run_report.add_stage(profiling.STAGE_DISCOVER, seconds)
+        )
+    first_file = next(file_iter, None)
+    if first_file is None:
         typer.echo("No supported image files found.")
         raise typer.Exit(0)
+    files = itertools.chain([first_file], file_iter)
+
+    # Metadata is extracted in chunks, one chunk ahead of rendering.
+    meta_chunk_val = _resolve_positive_int(meta_chunk, cfg, "meta_chunk_size", 200)
+    tasks = iter_render_tasks(
+        files,
+        exiftool_mode=exiftool_mode,
+        chunk_size=meta_chunk_val,
+        on_chunk=(lambda _count, seconds: run_report.add_stage(profiling.STAGE_METADATA, seconds))
+        if run_report is not None
+        else None,
+    )
+
+    if dry_run:
+        failed_plans = 0
+        for plan in iter_layout_plans(tasks, options):
+            failed_plans += 1 if "error" in plan else 0
+            typer.echo(json.dumps(plan, ensure_ascii=False))
+        raise typer.Exit(1 if failed_plans else 0)
 
-    out_dir = out
-    if out_dir is None:
-        out_dir = (input_path / "output") if input_path.is_dir() else (input_path.parent / "output")
     out_dir.mkdir(parents=True, exist_ok=True)
 
-    # Batch metadata extraction
-    resolved_files = [p.resolve(strict=False) for p in files]
-    try:
-        raw_meta_map = extract_many_with_xmp_priority(resolved_files, mode=exiftool_mode)
-    except Exception as exc:
-        typer.secho(f"Metadata extraction setup failed: {exc}", err=True, fg=typer.colors.RED)
-        raise typer.Exit(1)
+    manifest = _open_manifest(options, use_manifest, cfg)
+    _attach_bird_box_store(options, use_bird_cache, cfg)
 
-    def process_one(source: Path) -> _Result:
-        t0 = time.perf_counter()
-        try:
-            resolved = source.resolve(strict=False)
-            raw_meta = raw_meta_map.get(resolved) or extract_metadata_with_xmp_priority(source, mode=exiftool_mode)
-            norm_meta = normalize_metadata(
-                source,
-                raw_meta,
-                bird_arg=None,
-                bird_priority=["meta", "filename"],
-                bird_regex=r"(?P<bird>[^_]+)_",
-            )
-            output_name = build_output_name(name_tmpl, source, norm_meta, extension=out_ext, template_name=tpl_name)
-            output_file = out_dir / output_name
-            if skip_existing and output_file.exists():
-                return _Result(source=source, status="skipped", output=output_file, elapsed=time.perf_counter() - t0)
-            image = decode_image(source)
-
-            # Apply ratio crop from template (e.g. 9:16 portrait)
-            tpl_ratio = _parse_ratio(template_payload.get("ratio"))
-            tpl_center = str(template_payload.get("center_mode") or "image")
-            tpl_fill = str(template_payload.get("crop_padding_fill") or "#FFFFFF")
-            # Effective max_long_edge: CLI arg overrides template; 0 = unlimited
-            tpl_max_edge = max(0, int(template_payload.get("max_long_edge") or 0))
-            effective_max_edge = max_edge_val if max_edge_val > 0 else tpl_max_edge
-
-            if tpl_ratio is not None:
-                image = apply_editor_crop(
-                    image,
-                    source_path=source,
-                    raw_metadata=raw_meta,
-                    ratio=tpl_ratio,
-                    center_mode=tpl_center,
-                    crop_padding_px=0,   # 模板的 crop_padding_* 是鸟检测内缩偏移，不是外边距
-                    max_long_edge=effective_max_edge,
-                    fill_color=tpl_fill,
-                )
-            elif effective_max_edge > 0:
-                image = resize_fit(image, effective_max_edge)
-
-            metadata_ctx = build_metadata_context(source, raw_meta)
-            rendered = render_template_overlay(
-                image,
-                raw_metadata=raw_meta,
-                metadata_context=metadata_ctx,
-                template_payload=template_payload,
-                draw_banner=draw_banner,
-                draw_text=draw_text,
-            )
-            rendered = rendered.convert("RGB")
-            _save_image(rendered, output_file, pil_format=pil_format, quality=quality_val)
-            return _Result(source=source, status="ok", output=output_file, elapsed=time.perf_counter() - t0)
-        except Exception as exc:
-            return _Result(source=source, status="failed", error=str(exc), elapsed=time.perf_counter() - t0)
-
-    results: list[_Result] = []
-    for f in files:
-        r = process_one(f)
-        results.append(r)
-        if r.status == "ok":
-            LOGGER.info("OK   %s -> %s  (%.2fs)", r.source.name, r.output.name if r.output else "-", r.elapsed)
-        elif r.status == "skipped":
-            LOGGER.info("SKIP %s (exists)", r.source.name)
+    if use_pipeline:
+        decode_count, render_count, encode_count = _resolve_pipeline_threads(
+            decode_threads, render_threads, encode_threads, pipeline_cfg
+        )
+        settings = PipelineSettings(
+            decode_threads=decode_count,
+            render_threads=render_count,
+            encode_threads=encode_count,
+            decode_queue_depth=_resolve_positive_int(decode_queue, pipeline_cfg, "decode_queue_depth", 4),
+            encode_queue_depth=_resolve_positive_int(encode_queue, pipeline_cfg, "encode_queue_depth", 4),
+            detect_batch_size=_resolve_positive_int(detect_batch, pipeline_cfg, "detect_batch_size", 8),
+        )
+        LOGGER.info(
+            "Render pipeline: decode=%d render=%d encode=%d threads, queues=%d/%d, detect batch=%d",
+            settings.decode_threads,
+            settings.render_threads,
+            settings.encode_threads,
+            settings.decode_queue_depth,
+            settings.encode_queue_depth,
+            settings.detect_batch_size,
+        )
+        # Stage threads render; batched detection runs in the detector process next to them.
+        budget = plan_cpu_budget(
+            render_workers=settings.decode_threads + settings.render_threads + settings.encode_threads
+        )
+        apply_detector_budget(budget)
+        _log_cpu_budget(budget)
+        result_iter = iter_pipeline_results(tasks, options, settings=settings)
+    else:
+        # Worker processes detect inline, between their own renders.
+        budget = plan_cpu_budget(render_workers=jobs_val)
+        _log_cpu_budget(budget)
+        if jobs_val > 1:
+            LOGGER.info("Render workers: %d processes", jobs_val)
         else:
-            LOGGER.error("FAIL %s  %s", r.source.name, r.error)
+            apply_detector_budget(budget, inline=True)
+        result_iter = iter_render_results(
+            tasks, options, jobs=jobs_val, detector_threads=budget.inline_detector_threads
+        )
+
+    results: list[RenderResult] = []
+    try:
+        for r in result_iter:
+            results.append(r)
+            _record_result(r, manifest, save=len(results) % _MANIFEST_SAVE_INTERVAL == 0)
+            if run_report is not None:
+                run_report.write_result(_result_payload(r))
+    finally:
+        if manifest is not None:
+            manifest.save()
+        if run_report is not None:
+            summary = run_report.close({"jobs": jobs_val, "pipeline": use_pipeline, "variants": len(options)})
+            LOGGER.info(
+                "Run: %.2fs wall, %s outputs/s, %s MP/s, peak RSS %s MiB; stages: %s",
+                summary["wall_seconds"],
+                summary["outputs_per_second"],
+                summary["megapixels_per_second"],
+                summary["peak_rss_mb"],
+                run_report.stages.format_line(),
+            )
+            typer.echo(f"Report written: {run_report.path}")
 
     ok = sum(1 for r in results if r.status == "ok")
     skip = sum(1 for r in results if r.status == "skipped")
@@ -262,6 +615,265 @@ def render(
         raise typer.Exit(1)
 
 
+@app.command()
+def watch(
+    folders: list[Path] = typer.Argument(..., exists=True, file_okay=False, resolve_path=True, help="Hot folder(s) to watch."),
+    out: Path | None = typer.Option(None, "--out", help="Output directory (default: <folder>/output)."),
+    recursive: bool = typer.Option(True, "--recursive/--no-recursive", help="Watch sub-folders too."),
+    ignore: list[str] | None = typer.Option(None, "--ignore", help="Skip files/folders matching this glob (repeatable)."),
+    template: str | None = typer.Option(None, "--template", help="Template name or .json file path (default: built-in default)."),
+    max_long_edge: int | None = typer.Option(None, "--max-long-edge", min=0, help="Resize long edge to this value (0=unlimited)."),
+    output_format: str | None = typer.Option(None, "--format", help="Output format: jpeg|png"),
+    quality: int | None = typer.Option(None, "--quality", min=1, max=100),
+    name_template: str | None = typer.Option(None, "--name", help='Output filename template, e.g. "{stem}__banner.{ext}"'),
+    use_exiftool: str | None = typer.Option(None, "--use-exiftool", help="auto|on|off"),
+    use_manifest: bool | None = typer.Option(None, "--manifest/--no-manifest", help="Track rendered outputs (default: config 'manifest')."),
+    draw_banner: bool = typer.Option(True, "--draw-banner/--no-draw-banner", help="Draw banner background."),
+    draw_text: bool = typer.Option(True, "--draw-text/--no-draw-text", help="Draw text fields."),
+    existing: bool = typer.Option(False, "--existing/--new-only", help="Also render files already in the folder at startup."),
+    settle: float = typer.Option(0.5, "--settle", min=0.0, help="Seconds a file must stop changing before it is rendered."),
+    poll_interval: float = typer.Option(1.0, "--poll-interval", min=0.1, help="Scan interval when polling."),
+    polling: bool = typer.Option(False, "--polling", help="Poll instead of using file-system events (e.g. on network shares)."),
+    cpu_budget: int | None = typer.Option(
+        None,
+        "--cpu-budget",
+        min=0,
+        help="Cores shared by render workers and the bird detector (0 = all; default: config 'cpu_budget').",
+    ),
+    log_level: str = typer.Option("info", "--log-level"),
+) -> None:
+    """Watch hot folders and render new photos as they arrive (Ctrl+C to stop)."""
+    _setup_logging(log_level)
+    cfg = load_config()
+    _configure_bird_detector(cfg)
+    _configure_cpu_budget(cpu_budget, cfg)
+
+    try:
+        from birdstamp.batch_render import attach_manifest, iter_render_results, iter_render_tasks, warm_up
+        from birdstamp.watch import FolderWatcher
+    except Exception as exc:
+        typer.secho(f"Render engine unavailable: {exc}", err=True, fg=typer.colors.RED)
+        raise typer.Exit(1)
+
+    # One RenderOptions (and manifest) per watched folder; the template is loaded once.
+    base = _build_render_options(
+        cfg,
+        template=template,
+        out_dir=out or (folders[0] / "output"),
+        output_format=output_format,
+        quality=quality,
+        max_long_edge=max_long_edge,
+        name_template=name_template,
+        use_exiftool=use_exiftool,
+        skip_existing=True,
+        draw_banner=draw_banner,
+        draw_text=draw_text,
+    )
+    _attach_bird_box_store([base], None, cfg)
+    targets: dict[Path, tuple] = {}
+    # Folders sharing one --out share one manifest: separate copies would each save
+    # only their own records over the same file.
+    manifests: dict[Path, object] = {}
+    for folder in folders:
+        options = dataclasses.replace(base, out_dir=out or (folder / "output"))
+        options.out_dir.mkdir(parents=True, exist_ok=True)
+        if options.out_dir in manifests:
+            manifest = manifests[options.out_dir]
+            if manifest is not None:
+                attach_manifest(options, manifest)
+        else:
+            manifest = manifests[options.out_dir] = _open_manifest(options, use_manifest, cfg)
+        if manifest is not None:
+            # Same process: share the live entries so renders from this session count as up to date.
+            options.manifest_entries = manifest.entries
+        targets[folder] = (options, manifest)
+
+    # Files render one at a time on this thread, so detection may use the whole budget.
+    apply_detector_budget(plan_cpu_budget(render_workers=1), inline=True)
+    warm_up(base)
+    watcher = FolderWatcher(
+        folders,
+        recursive=recursive,
+        ignore=_resolve_ignore_patterns(ignore, cfg),
+        exclude_dirs=[options.out_dir for options, _ in targets.values()],
+        settle_seconds=settle,
+        poll_interval=poll_interval,
+        force_polling=polling,
+    )
+    watcher.start(include_existing=existing)
+    typer.echo(f"Watching {len(folders)} folder(s) via {watcher.backend}; press Ctrl+C to stop.")
+
+    # Watched roots are resolved; map them back to the folders as given.
+    folder_for_root = dict(zip(watcher.roots, folders))
+
+    def _target_for(path: Path) -> Path | None:
+        root = max((r for r in watcher.roots if r in path.parents), key=lambda r: len(r.parts), default=None)
+        return folder_for_root.get(root) if root is not None else None
+
+    try:
+        for batch in watcher.iter_ready():
+            by_folder: dict[Path, list[Path]] = {}
+            for path in batch:
+                folder = _target_for(path)
+                if folder is None:
+                    LOGGER.warning("Skipping %s: not under a watched folder", path)
+                    continue
+                by_folder.setdefault(folder, []).append(path)
+            for folder, paths in by_folder.items():
+                options, manifest = targets[folder]
+                tasks = iter_render_tasks(paths, exiftool_mode=options.exiftool_mode, chunk_size=len(paths))
+                for r in iter_render_results(tasks, options, jobs=1):
+                    _record_result(r, manifest)
+                if manifest is not None:
+                    manifest.save()
+    except KeyboardInterrupt:
+        typer.echo("Stopping watch.")
+    finally:
+        watcher.stop()
+        for manifest in manifests.values():
+            if manifest is not None:
+                manifest.save()
+
+
+@app.command()
+def serve(
+    host: str = typer.Option("127.0.0.1", "--host", help="Bind address (keep it local)."),
+    port: int = typer.Option(8765, "--port", min=0, max=65535),
+    socket_path: Path | None = typer.Option(None, "--socket", help="Listen on this Unix domain socket instead of TCP."),
+    template: str | None = typer.Option(None, "--template", help="Default template when a request names none."),
+    max_long_edge: int | None = typer.Option(None, "--max-long-edge", min=0, help="Default long edge (0=unlimited)."),
+    output_format: str | None = typer.Option(None, "--format", help="Default output format: jpeg|png"),
+    quality: int | None = typer.Option(None, "--quality", min=1, max=100),
+    use_exiftool: str | None = typer.Option(None, "--use-exiftool", help="auto|on|off"),
+    workers: int | None = typer.Option(None, "--workers", min=1, help="Concurrent renders (default: config 'jobs', else the CPU budget's render share)."),
+    max_queue: int = typer.Option(16, "--queue", min=0, help="Requests allowed to wait for a worker before 503."),
+    cpu_budget: int | None = typer.Option(
+        None,
+        "--cpu-budget",
+        min=0,
+        help="Cores shared by render workers and the bird detector (0 = all; default: config 'cpu_budget').",
+    ),
+    log_level: str = typer.Option("info", "--log-level"),
+) -> None:
+    """Run a local render service (POST /render, GET /health, GET /metrics)."""
+    _setup_logging(log_level)
+    cfg = load_config()
+    _configure_bird_detector(cfg)
+    _configure_cpu_budget(cpu_budget, cfg)
+
+    try:
+        from birdstamp.serve import RenderService, TemplateCache, create_server
+    except Exception as exc:
+        typer.secho(f"Render engine unavailable: {exc}", err=True, fg=typer.colors.RED)
+        raise typer.Exit(1)
+
+    options = _build_render_options(
+        cfg,
+        template=template,
+        out_dir=Path.cwd(),
+        output_format=output_format,
+        quality=quality,
+        max_long_edge=max_long_edge,
+        name_template=None,
+        use_exiftool=use_exiftool,
+        skip_existing=False,
+        draw_banner=True,
+        draw_text=True,
+    )
+    workers_val = _resolve_jobs(workers, cfg)
+    budget = plan_cpu_budget(render_workers=workers_val)
+    apply_detector_budget(budget)
+    _log_cpu_budget(budget)
+    service = RenderService(
+        options,
+        TemplateCache(_find_template_path, default_name=template),
+        workers=workers_val,
+        max_queue=max_queue,
+    )
+    service.warm_up()
+    try:
+        server = create_server(service, host=host, port=port, socket_path=socket_path)
+    except Exception as exc:
+        service.close()
+        typer.secho(f"Cannot start server: {exc}", err=True, fg=typer.colors.RED)
+        raise typer.Exit(1)
+
+    where = str(socket_path) if socket_path is not None else f"http://{host}:{server.server_address[1]}"
+    typer.echo(f"Serving on {where} with {service.workers} workers; press Ctrl+C to stop.")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        typer.echo("Stopping server.")
+    finally:
+        server.server_close()
+        service.close()
+        if socket_path is not None:
+            socket_path.unlink(missing_ok=True)
+
+
+@app.command()
+def bench(
+    size: list[str] | None = typer.Option(
+        None, "--size", help="Synthetic image size WIDTHxHEIGHT (repeatable; default: 1600x1067, 3000x2000, 6000x4000)."
+    ),
+    stage: list[str] | None = typer.Option(None, "--stage", help="Only run these stages (repeatable; default: all)."),
+    iterations: int = typer.Option(10, "--iterations", "-n", min=1, help="Timed calls per stage and size."),
+    warmup: int = typer.Option(2, "--warmup", min=0, help="Untimed calls before measuring."),
+    template: str | None = typer.Option(None, "--template", help="Template for the overlay stage (default: built-in default)."),
+    quality: int = typer.Option(92, "--quality", min=1, max=100, help="JPEG quality for the encode stage."),
+    as_json: bool = typer.Option(False, "--json", help="Print machine-readable JSON instead of a table."),
+    log_level: str = typer.Option("warning", "--log-level"),
+) -> None:
+    """Benchmark each render stage on deterministic synthetic images (ops/sec, p50/p95)."""
+    _setup_logging(log_level)
+    try:
+        from birdstamp.bench import (
+            BENCH_STAGES,
+            BENCH_TABLE_HEADER,
+            DEFAULT_BENCH_SIZES,
+            environment_info,
+            format_result_row,
+            parse_size,
+            run_bench,
+        )
+    except Exception as exc:
+        typer.secho(f"Render engine unavailable: {exc}", err=True, fg=typer.colors.RED)
+        raise typer.Exit(1)
+
+    try:
+        sizes = [parse_size(text) for text in _parse_multi_values(size or [])] or list(DEFAULT_BENCH_SIZES)
+    except ValueError as exc:
+        raise typer.BadParameter(str(exc), param_hint="--size") from None
+    stages = _parse_multi_values(stage or [])
+    unknown = [name for name in stages if name not in BENCH_STAGES]
+    if unknown:
+        raise typer.BadParameter(
+            f"unknown stage(s) {', '.join(unknown)}; choose from {', '.join(BENCH_STAGES)}", param_hint="--stage"
+        )
+    template_payload = _load_render_template(template)
+
+    if not as_json:
+        typer.echo(BENCH_TABLE_HEADER)
+    results = run_bench(
+        sizes=sizes,
+        stages=stages or None,
+        iterations=iterations,
+        warmup=warmup,
+        template_payload=template_payload,
+        quality=quality,
+        on_result=None if as_json else (lambda result: typer.echo(format_result_row(result))),
+    )
+    if as_json:
+        payload = {
+            "environment": environment_info(),
+            "iterations": iterations,
+            "warmup": warmup,
+            "template": str(template_payload.get("name") or template or "default"),
+            "results": [result.summary() for result in results],
+        }
+        typer.echo(json.dumps(payload, ensure_ascii=False, indent=2))
+
+
 @app.command("inspect")
 def inspect_file(
     file: Path = typer.Argument(..., exists=True, resolve_path=True, dir_okay=False),
@@ -375,6 +987,8 @@ def gui(
 
 
 def main() -> None:
+    # Required for the render process pool in frozen (PyInstaller) builds.
+    multiprocessing.freeze_support()
     app()
 
 
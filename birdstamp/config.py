@@ -12,11 +12,6 @@ import yaml
 from birdstamp.constants import DEFAULT_SHOW_FIELDS
 
 
-def default_jobs() -> int:
-    cpu_count = os.cpu_count() or 2
-    return max(1, cpu_count - 1)
-
-
 DEFAULT_CONFIG: dict[str, Any] = {
     "template": "default",
     "theme": "gray",
@@ -34,7 +29,24 @@ DEFAULT_CONFIG: dict[str, Any] = {
     "use_exiftool": "auto",
     "decoder": "auto",
     "skip_existing": True,
-    "jobs": default_jobs(),
+    "manifest": True,
+    "bird_box_cache": True,
+    "bird_detector": "auto",
+    "ignore": [],
+    # 0 = 按 CPU 预算（cpu_budget）自动确定渲染进程数
+    "jobs": 0,
+    "cpu_budget": 0,
+    "meta_chunk_size": 200,
+    "pipeline": {
+        "enabled": False,
+        # 0 = 按 CPU 预算自动分配各阶段线程数
+        "decode_threads": 0,
+        "render_threads": 0,
+        "encode_threads": 0,
+        "decode_queue_depth": 4,
+        "encode_queue_depth": 4,
+        "detect_batch_size": 8,
+    },
     "show_eq_focal": True,
     "time_format": "%Y-%m-%d %H:%M",
 }
@@ -140,18 +152,13 @@ def load_config(path: Path | None = None) -> dict[str, Any]:
         if legacy_path is not None:
             cfg_path = legacy_path
     if not cfg_path.exists():
-        cfg = copy.deepcopy(DEFAULT_CONFIG)
-        cfg["jobs"] = default_jobs()
-        return cfg
+        return copy.deepcopy(DEFAULT_CONFIG)
 
     text = cfg_path.read_text(encoding="utf-8")
     loaded = yaml.safe_load(text) or {}
     if not isinstance(loaded, dict):
         loaded = {}
-    cfg = _deep_merge(DEFAULT_CONFIG, loaded)
-    if not cfg.get("jobs"):
-        cfg["jobs"] = default_jobs()
-    return cfg
+    return _deep_merge(DEFAULT_CONFIG, loaded)
 
 
 def write_default_config(path: Path | None = None, force: bool = False) -> Path:
@@ -160,6 +167,5 @@ def write_default_config(path: Path | None = None, force: bool = False) -> Path:
     if cfg_path.exists() and not force:
         return cfg_path
     cfg = copy.deepcopy(DEFAULT_CONFIG)
-    cfg["jobs"] = default_jobs()
     cfg_path.write_text(yaml.safe_dump(cfg, sort_keys=False, allow_unicode=True), encoding="utf-8")
     return cfg_path
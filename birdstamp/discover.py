@@ -1,10 +1,15 @@
 from __future__ import annotations
 
+import fnmatch
+import os
 from pathlib import Path
-from typing import Iterable
+from typing import Iterable, Iterator
 
 from birdstamp.constants import SUPPORTED_EXTENSIONS
 
+# 预览缓存目录，重复运行时不应被当作输入再次处理。
+PRUNED_DIR_NAMES = frozenset({".preview"})
+
 
 def _normalize_extensions(extensions: Iterable[str] | None) -> set[str]:
     if not extensions:
@@ -18,19 +23,115 @@ def _normalize_extensions(extensions: Iterable[str] | None) -> set[str]:
     return normalized
 
 
-def discover_inputs(
+def _is_ignored(name: str, rel_path: str, patterns: tuple[str, ...]) -> bool:
+    for pattern in patterns:
+        if fnmatch.fnmatch(name, pattern) or fnmatch.fnmatch(rel_path, pattern):
+            return True
+    return False
+
+
+def is_excluded_path(
+    path: Path,
+    root: Path,
+    *,
+    ignore: Iterable[str] | None = None,
+    exclude_dirs: Iterable[Path] | None = None,
+) -> bool:
+    """Whether ``iter_inputs(root, recursive=True, ...)`` would skip ``path``.
+
+    Used for paths reported by file-system events instead of a tree walk.
+    """
+    try:
+        rel_parts = Path(path).relative_to(root).parts
+    except ValueError:
+        return True
+    patterns = tuple(p for p in (ignore or ()) if p)
+    for index, name in enumerate(rel_parts):
+        if index < len(rel_parts) - 1 and name in PRUNED_DIR_NAMES:
+            return True
+        if patterns and _is_ignored(name, "/".join(rel_parts[: index + 1]), patterns):
+            return True
+    real = os.path.normcase(os.path.realpath(path))
+    for excluded in exclude_dirs or ():
+        prefix = os.path.normcase(os.path.realpath(excluded))
+        if real == prefix or real.startswith(prefix.rstrip(os.sep) + os.sep):
+            return True
+    return False
+
+
+def iter_inputs(
     input_path: Path,
     recursive: bool = False,
     extensions: Iterable[str] | None = None,
-) -> list[Path]:
+    *,
+    ignore: Iterable[str] | None = None,
+    exclude_dirs: Iterable[Path] | None = None,
+) -> Iterator[Path]:
+    """Yield supported image files under ``input_path`` while walking the tree.
+
+    Uses ``os.scandir`` so the type checks come from the cached ``DirEntry``
+    data. Entries are sorted per directory and sub-directories are visited in
+    place, which yields the same order as sorting the whole result would.
+
+    ``ignore`` holds fnmatch patterns matched against the entry name and its
+    path relative to ``input_path`` (``/`` separated); matching directories are
+    not descended into. ``exclude_dirs`` (e.g. the render output directory) and
+    ``.preview`` folders are always pruned.
+    """
     exts = _normalize_extensions(extensions)
     if input_path.is_file():
-        return [input_path] if input_path.suffix.lower() in exts else []
-    if not input_path.exists():
-        return []
-    if recursive:
-        files = [p for p in input_path.rglob("*") if p.is_file() and p.suffix.lower() in exts]
-    else:
-        files = [p for p in input_path.iterdir() if p.is_file() and p.suffix.lower() in exts]
-    return sorted(files)
+        if input_path.suffix.lower() in exts:
+            yield input_path
+        return
+    if not input_path.is_dir():
+        return
 
+    patterns = tuple(p for p in (ignore or ()) if p)
+    excluded = {os.path.normcase(os.path.realpath(p)) for p in (exclude_dirs or ())}
+
+    def _walk(directory: Path, rel_prefix: str) -> Iterator[Path]:
+        try:
+            with os.scandir(directory) as it:
+                entries = sorted(it, key=lambda e: e.name)
+        except OSError:
+            return
+        for entry in entries:
+            rel_path = f"{rel_prefix}{entry.name}"
+            if patterns and _is_ignored(entry.name, rel_path, patterns):
+                continue
+            try:
+                if entry.is_file():
+                    if os.path.splitext(entry.name)[1].lower() in exts:
+                        yield directory / entry.name
+                    continue
+                # 与 rglob 一致：不进入目录链接（文件链接仍按文件处理）。
+                if not recursive or not entry.is_dir(follow_symlinks=False):
+                    continue
+            except OSError:
+                continue
+            if entry.name in PRUNED_DIR_NAMES:
+                continue
+            if excluded and os.path.normcase(os.path.realpath(entry.path)) in excluded:
+                continue
+            yield from _walk(directory / entry.name, f"{rel_path}/")
+
+    yield from _walk(input_path, "")
+
+
+def discover_inputs(
+    input_path: Path,
+    recursive: bool = False,
+    extensions: Iterable[str] | None = None,
+    *,
+    ignore: Iterable[str] | None = None,
+    exclude_dirs: Iterable[Path] | None = None,
+) -> list[Path]:
+    return list(
+        iter_inputs(
+            input_path,
+            recursive=recursive,
+            extensions=extensions,
+            ignore=ignore,
+            exclude_dirs=exclude_dirs,
+        )
+    )
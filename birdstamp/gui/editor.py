@@ -1793,7 +1793,10 @@ class BirdStampEditorWindow(QMainWindow, _BirdStampCropMixin, _BirdStampRenderer
             self.raw_metadata_cache.pop(key, None)
             self.photo_render_overrides.pop(key, None)
         if removed_keys:
-            self._bird_box_cache.clear()
+            # 签名为 "<path_key>:<size>:<mtime_ns>"，只丢弃被删除照片的条目
+            for signature in list(self._bird_box_cache):
+                if signature in removed_keys or signature.rsplit(":", 2)[0] in removed_keys:
+                    self._bird_box_cache.pop(signature, None)
             self.photo_list.refresh_row_numbers()
 
         if self.photo_list.topLevelItemCount() == 0:
@@ -2,12 +2,20 @@
 # No Qt/GUI dependencies; safe for CLI use.
 from __future__ import annotations
 
+import importlib.util
 import math
+import multiprocessing
+import os
+import queue
 import re
+import sys
+import threading
+import time
 import xml.etree.ElementTree as ET
+from concurrent.futures import Future, ProcessPoolExecutor
 from functools import lru_cache
 from pathlib import Path
-from typing import Any
+from typing import Any, Callable
 
 from PIL import Image, ImageColor, ImageDraw, ImageOps
 from app_common.focus_calc import (
@@ -19,6 +27,8 @@ from app_common.focus_calc import (
     resolve_focus_camera_type as _resolve_focus_camera_type,
     resolve_focus_camera_type_from_metadata as _resolve_focus_camera_type_from_metadata,
 )
+from birdstamp import profiling
+from birdstamp.cpu_budget import plan_cpu_budget
 from birdstamp.config import resolve_bundled_path
 
 # Center mode constants (used by CLI and GUI)
@@ -31,10 +41,29 @@ DEFAULT_CROP_PADDING_PX = 128
 DEFAULT_FOCUS_BOX_SHORT_EDGE_RATIO = 0.12
 
 _BIRD_MODEL_CANDIDATES = ("yolo11n.pt", "yolo11s.pt", "yolov8n.pt")
+_BIRD_ONNX_MODEL_CANDIDATES = ("yolo11n.onnx", "yolo11s.onnx", "yolov8n.onnx")
+# 检测后端：auto = 有 onnxruntime 和 .onnx 模型时用 ONNX，否则回退 ultralytics；
+# onnx = 只用 ONNX（从不导入 torch）；ultralytics = 只用 ultralytics。
+BIRD_DETECTOR_BACKENDS = ("auto", "onnx", "ultralytics")
+BIRD_DETECTOR_ENV_VAR = "BIRDSTAMP_BIRD_DETECTOR"
+_BIRD_DETECTOR_BACKEND: str | None = None
+# 检测模型的算子线程数（torch intra-op / ONNX intra_op_num_threads）；0 = 运行时默认（全部核心）。
+_BIRD_DETECT_THREADS = 0
 _BIRD_CLASS_NAME = "bird"
 _COCO_FALLBACK_BIRD_CLASS_ID = 14
 _BIRD_DETECT_CONFIDENCE = 0.25
 _BIRD_DETECTOR_ERROR_MESSAGE = ""
+# YOLO predictors are not thread-safe; serialize inference for threaded callers (pipeline, serve).
+_BIRD_DETECT_LOCK = threading.Lock()
+# 检测输入长边：与 YOLO 默认 imgsz 一致，整幅大图先缩到这个尺寸再送入模型。
+_BIRD_DETECT_INPUT_EDGE = 640
+# 粗检测得到的鸟体长边小于画面长边的这个比例时，在其周围裁一块再检测一次。
+_BIRD_REFINE_MAX_BOX_FRACTION = 0.15
+# 二次检测裁块在鸟体框四周各留出 (框长边 × 此倍数) 的上下文。
+_BIRD_REFINE_CONTEXT = 0.75
+# 批量检测：每次 predict 最多合并的图片数，以及凑批时等待后续请求的最长时间。
+DEFAULT_BIRD_DETECT_BATCH_SIZE = 8
+_BIRD_BATCH_MAX_WAIT_SECONDS = 0.005
 
 _RDF_NS = "http://www.w3.org/1999/02/22-rdf-syntax-ns#"
 _RDF_DESC_TAG = f"{{{_RDF_NS}}}Description"
@@ -680,15 +709,19 @@ def draw_focus_box_overlay(
     return image
 
 
-def resize_fit(image: Image.Image, max_long_edge: int) -> Image.Image:
-    if max_long_edge <= 0:
-        return image
-    width, height = image.size
+def fit_size(width: int, height: int, max_long_edge: int) -> tuple[int, int]:
+    """Size ``resize_fit`` produces for a ``width`` x ``height`` image."""
     long_edge = max(width, height)
-    if long_edge <= max_long_edge:
-        return image
+    if max_long_edge <= 0 or long_edge <= max_long_edge:
+        return (width, height)
     scale = max_long_edge / float(long_edge)
-    new_size = (max(1, int(round(width * scale))), max(1, int(round(height * scale))))
+    return (max(1, int(round(width * scale))), max(1, int(round(height * scale))))
+
+
+def resize_fit(image: Image.Image, max_long_edge: int) -> Image.Image:
+    new_size = fit_size(image.width, image.height, max_long_edge)
+    if new_size == image.size:
+        return image
     return image.resize(new_size, Image.Resampling.LANCZOS)
 
 
@@ -935,6 +968,11 @@ def _short_error_text(exc: Exception) -> str:
     return text
 
 
+def _result_array(value: Any) -> Any:
+    """Torch tensors (ultralytics) come back via ``.cpu().numpy()``; NumPy arrays (ONNX) as-is."""
+    return value.cpu().numpy() if hasattr(value, "cpu") else value
+
+
 def _best_bird_box_from_result(result: Any, bird_class_ids: set[int]) -> tuple[float, float, float, float] | None:
     boxes = getattr(result, "boxes", None)
     if boxes is None:
@@ -945,7 +983,7 @@ def _best_bird_box_from_result(result: Any, bird_class_ids: set[int]) -> tuple[f
     if xyxy is None:
         return None
     try:
-        xyxy_arr = xyxy.cpu().numpy()
+        xyxy_arr = _result_array(xyxy)
     except Exception:
         return None
     if xyxy_arr.size == 0:
@@ -953,13 +991,13 @@ def _best_bird_box_from_result(result: Any, bird_class_ids: set[int]) -> tuple[f
     cls_arr = None
     if cls is not None:
         try:
-            cls_arr = cls.cpu().numpy()
+            cls_arr = _result_array(cls)
         except Exception:
             pass
     conf_arr = None
     if conf is not None:
         try:
-            conf_arr = conf.cpu().numpy()
+            conf_arr = _result_array(conf)
         except Exception:
             pass
     best: tuple[float, float, float, float, float] | None = None
@@ -1045,10 +1083,105 @@ def _preferred_bird_detect_device() -> str | int:
     return "cpu"
 
 
-@lru_cache(maxsize=1)
-def _load_bird_detector() -> tuple[Any, set[int]] | None:
+def set_bird_detector_backend(backend: str | None) -> None:
+    """Select the detector backend (``auto`` / ``onnx`` / ``ultralytics``); None = ``BIRDSTAMP_BIRD_DETECTOR`` or auto."""
+    global _BIRD_DETECTOR_BACKEND
+    value = str(backend or "").strip().lower() or None
+    if value is not None and value not in BIRD_DETECTOR_BACKENDS:
+        raise ValueError(f"unknown bird detector backend: {backend!r} (expected one of {', '.join(BIRD_DETECTOR_BACKENDS)})")
+    if value != _BIRD_DETECTOR_BACKEND:
+        _BIRD_DETECTOR_BACKEND = value
+        _load_bird_detector.cache_clear()
+
+
+def set_bird_detector_threads(threads: int) -> None:
+    """Cap the detector's intra-op threads (0 = runtime default); applies to torch now, to ONNX on (re)load."""
+    global _BIRD_DETECT_THREADS
+    threads = max(0, int(threads))
+    if threads == _BIRD_DETECT_THREADS:
+        return
+    _BIRD_DETECT_THREADS = threads
+    if "torch" in sys.modules:
+        _apply_torch_threads()
+    if _load_bird_detector.cache_info().currsize:
+        detector = _load_bird_detector()
+        if detector is not None and getattr(detector[0], "inference_device", None) is not None:
+            _load_bird_detector.cache_clear()  # ONNX 会话的线程数只能在创建时指定
+
+
+def _apply_torch_threads() -> None:
+    if _BIRD_DETECT_THREADS <= 0:
+        return
+    torch_module = _load_torch_module()
+    if torch_module is None:
+        return
+    try:
+        torch_module.set_num_threads(_BIRD_DETECT_THREADS)
+    except Exception:
+        pass
+
+
+def get_bird_detector_backend() -> str:
+    if _BIRD_DETECTOR_BACKEND is not None:
+        return _BIRD_DETECTOR_BACKEND
+    env_value = str(os.environ.get(BIRD_DETECTOR_ENV_VAR) or "").strip().lower()
+    return env_value if env_value in BIRD_DETECTOR_BACKENDS else "auto"
+
+
+def _first_bundled_model(candidates: tuple[str, ...]) -> tuple[str, Path] | None:
+    for model_name in candidates:
+        model_path = resolve_bundled_path("models", model_name)
+        if model_path.is_file():
+            return (model_name, model_path)
+    return None
+
+
+def _onnx_runtime_available() -> bool:
+    return importlib.util.find_spec("onnxruntime") is not None and importlib.util.find_spec("numpy") is not None
+
+
+def _resolved_bird_detector_model() -> tuple[str, str, Path] | None:
+    """``(backend, model_name, path)`` that ``_load_bird_detector`` will try first, without importing it."""
+    backend = get_bird_detector_backend()
+    if backend in ("auto", "onnx"):
+        onnx_model = _first_bundled_model(_BIRD_ONNX_MODEL_CANDIDATES) if _onnx_runtime_available() else None
+        if onnx_model is not None:
+            return ("onnx", *onnx_model)
+        if backend == "onnx":
+            return None
+    torch_model = _first_bundled_model(_BIRD_MODEL_CANDIDATES)
+    return ("ultralytics", *torch_model) if torch_model is not None else None
+
+
+def _load_onnx_bird_detector() -> tuple[Any, set[int]] | None:
+    global _BIRD_DETECTOR_ERROR_MESSAGE
+    if not _onnx_runtime_available():
+        _BIRD_DETECTOR_ERROR_MESSAGE = "onnxruntime not installed (pip install onnxruntime)"
+        return None
+    try:
+        from birdstamp.gui.editor_onnx_detector import load_onnx_bird_model
+    except Exception as exc:
+        _BIRD_DETECTOR_ERROR_MESSAGE = f"ONNX detector unavailable: {_short_error_text(exc)}"
+        return None
+    last_error = ""
+    for model_name in _BIRD_ONNX_MODEL_CANDIDATES:
+        model_path = resolve_bundled_path("models", model_name)
+        if not model_path.is_file():
+            last_error = f"{model_name}: model file not found ({model_path})"
+            continue
+        try:
+            model = load_onnx_bird_model(model_path, intra_op_threads=_BIRD_DETECT_THREADS)
+        except Exception as exc:
+            last_error = f"{model_name}: {_short_error_text(exc)}"
+            continue
+        bird_class_ids = _resolve_bird_class_ids(model.names or None)
+        return (model, bird_class_ids)
+    _BIRD_DETECTOR_ERROR_MESSAGE = last_error or "ONNX bird detection model failed to load"
+    return None
+
+
+def _load_ultralytics_bird_detector() -> tuple[Any, set[int]] | None:
     global _BIRD_DETECTOR_ERROR_MESSAGE
-    _BIRD_DETECTOR_ERROR_MESSAGE = ""
     yolo_class = _load_yolo_class()
     if yolo_class is None:
         if not _BIRD_DETECTOR_ERROR_MESSAGE:
@@ -1069,11 +1202,53 @@ def _load_bird_detector() -> tuple[Any, set[int]] | None:
         if not bird_class_ids:
             last_error = f"{model_name}: no bird class"
             continue
+        _apply_torch_threads()
         return (model, bird_class_ids)
     _BIRD_DETECTOR_ERROR_MESSAGE = last_error or "Bird detection model failed to load"
     return None
 
 
+@lru_cache(maxsize=1)
+def _load_bird_detector() -> tuple[Any, set[int]] | None:
+    global _BIRD_DETECTOR_ERROR_MESSAGE
+    _BIRD_DETECTOR_ERROR_MESSAGE = ""
+    backend = get_bird_detector_backend()
+    if backend in ("auto", "onnx"):
+        detector = _load_onnx_bird_detector()
+        if detector is not None or backend == "onnx":
+            return detector
+        _BIRD_DETECTOR_ERROR_MESSAGE = ""
+    return _load_ultralytics_bird_detector()
+
+
+def bird_detector_cache_key() -> str:
+    """Identifies the backend, model file and detection parameters a stored bird box was produced with.
+
+    Uses the model ``_load_bird_detector`` would pick without loading it, so a fully
+    cached run never imports torch or onnxruntime.
+    """
+    model_id = "none"
+    resolved = _resolved_bird_detector_model()
+    if resolved is not None:
+        backend, model_name, model_path = resolved
+        try:
+            model_id = f"{backend}:{model_name}:{model_path.stat().st_size}"
+        except OSError:
+            model_id = f"{backend}:{model_name}"
+    return (
+        f"{model_id}|conf={_BIRD_DETECT_CONFIDENCE}|edge={_BIRD_DETECT_INPUT_EDGE}"
+        f"|refine={_BIRD_REFINE_MAX_BOX_FRACTION}/{_BIRD_REFINE_CONTEXT}"
+    )
+
+
+class BirdDetectionError(RuntimeError):
+    """Bird detection could not run for this call (no model, inference or detector process failure).
+
+    Unlike a ``None`` box ("no bird in the photo"), this outcome must not be remembered.
+    The same text is kept for ``get_bird_detector_error_message``.
+    """
+
+
 def get_bird_detector_error_message() -> str:
     return _BIRD_DETECTOR_ERROR_MESSAGE
 
@@ -1084,21 +1259,61 @@ def preload_bird_detector() -> None:
 
 
 def detect_primary_bird_box(image: Image.Image) -> tuple[float, float, float, float] | None:
+    """Primary bird box, or None when there is no bird or detection failed (see ``get_bird_detector_error_message``)."""
+    with profiling.span(profiling.STAGE_DETECTION):
+        try:
+            return _detect_primary_bird_box(image)
+        except BirdDetectionError:
+            return None
+
+
+def detect_primary_bird_boxes(images: list[Image.Image]) -> list[tuple[float, float, float, float] | None]:
+    """``detect_primary_bird_box`` for several images, batched into as few model calls as possible."""
+    images = list(images)
+    with profiling.span(profiling.STAGE_DETECTION):
+        try:
+            return _detect_primary_bird_boxes(images)
+        except BirdDetectionError:
+            return [None] * len(images)
+
+
+def _bird_detect_input(image: Image.Image, max_edge: int = _BIRD_DETECT_INPUT_EDGE) -> Image.Image:
+    """RGB copy of ``image`` with its long edge reduced to ``max_edge`` (never enlarged)."""
+    if image.mode not in ("RGB", "RGBA", "L"):
+        image = image.convert("RGB")
+    width, height = image.size
+    long_edge = max(width, height)
+    if long_edge > max_edge > 0:
+        scale = max_edge / float(long_edge)
+        size = (max(1, int(round(width * scale))), max(1, int(round(height * scale))))
+        image = image.resize(size, Image.Resampling.BILINEAR, reducing_gap=2.0)
+    return image if image.mode == "RGB" else image.convert("RGB")
+
+
+def _predict_bird_boxes(
+    model: Any,
+    bird_class_ids: set[int],
+    sources: list[Image.Image],
+) -> list[tuple[float, float, float, float] | None]:
+    """Best bird box per source (normalized) from one ``predict`` call.
+
+    Failures set the error message and raise ``BirdDetectionError``.
+
+    A single source is passed as-is, several as a list, which YOLO runs as one batch.
+    """
     global _BIRD_DETECTOR_ERROR_MESSAGE
-    detector = _load_bird_detector()
-    if detector is None:
-        return None
-    _BIRD_DETECTOR_ERROR_MESSAGE = ""
-    model, bird_class_ids = detector
-    source = image if image.mode == "RGB" else image.convert("RGB")
-    detect_device = _preferred_bird_detect_device()
+    if not sources:
+        return []
+    # ONNX 模型固定在 CPU 上跑，不要为探测设备去导入 torch。
+    detect_device = getattr(model, "inference_device", None) or _preferred_bird_detect_device()
     predict_kwargs = {
-        "source": source,
+        "source": sources[0] if len(sources) == 1 else list(sources),
         "conf": _BIRD_DETECT_CONFIDENCE,
         "verbose": False,
     }
     try:
-        results = model.predict(device=detect_device, **predict_kwargs)
+        with _BIRD_DETECT_LOCK:
+            results = model.predict(device=detect_device, **predict_kwargs)
     except Exception as primary_exc:
         primary_text = _short_error_text(primary_exc)
         if detect_device == "cpu":
@@ -1106,22 +1321,398 @@ def detect_primary_bird_box(image: Image.Image) -> tuple[float, float, float, fl
                 _BIRD_DETECTOR_ERROR_MESSAGE = "Torch/NumPy version incompatible (try numpy<2 or matching versions)"
             else:
                 _BIRD_DETECTOR_ERROR_MESSAGE = f"Bird detection inference failed: {primary_text}"
-            return None
+            raise BirdDetectionError(_BIRD_DETECTOR_ERROR_MESSAGE) from primary_exc
         try:
-            results = model.predict(device="cpu", **predict_kwargs)
+            with _BIRD_DETECT_LOCK:
+                results = model.predict(device="cpu", **predict_kwargs)
         except Exception as fallback_exc:
             fallback_text = _short_error_text(fallback_exc)
             if "Numpy is not available" in fallback_text:
                 _BIRD_DETECTOR_ERROR_MESSAGE = "Torch/NumPy version incompatible (try numpy<2 or matching versions)"
             else:
                 _BIRD_DETECTOR_ERROR_MESSAGE = f"Bird detection failed: {primary_text}; CPU fallback: {fallback_text}"
-            return None
-    if not results:
+            raise BirdDetectionError(_BIRD_DETECTOR_ERROR_MESSAGE) from fallback_exc
+    results = list(results or ())
+    boxes: list[tuple[float, float, float, float] | None] = []
+    for index, source in enumerate(sources):
+        best_box = _best_bird_box_from_result(results[index], bird_class_ids) if index < len(results) else None
+        boxes.append(None if best_box is None else _normalize_xyxy_box(best_box, source.width, source.height))
+    return boxes
+
+
+def _bird_refine_region(
+    box: tuple[float, float, float, float],
+    width: int,
+    height: int,
+) -> tuple[int, int, int, int] | None:
+    """Pixel crop around a small coarse ``box`` worth a second, higher-resolution pass."""
+    if max(width, height) <= _BIRD_DETECT_INPUT_EDGE:
+        return None  # 粗检测已经是原分辨率
+    box_w = (box[2] - box[0]) * width
+    box_h = (box[3] - box[1]) * height
+    if max(box_w, box_h) >= _BIRD_REFINE_MAX_BOX_FRACTION * max(width, height):
         return None
-    best_box = _best_bird_box_from_result(results[0], bird_class_ids)
-    if best_box is None:
+    pad = max(box_w, box_h) * _BIRD_REFINE_CONTEXT
+    left = max(0, int(math.floor(box[0] * width - pad)))
+    top = max(0, int(math.floor(box[1] * height - pad)))
+    right = min(width, int(math.ceil(box[2] * width + pad)))
+    bottom = min(height, int(math.ceil(box[3] * height + pad)))
+    if right - left < 2 or bottom - top < 2:
         return None
-    return _normalize_xyxy_box(best_box, source.width, source.height)
+    return (left, top, right, bottom)
+
+
+def _predict_in_process(sources: list[Image.Image]) -> list[tuple[float, float, float, float] | None]:
+    """Detector-input images (already reduced) through the model loaded in this process."""
+    global _BIRD_DETECTOR_ERROR_MESSAGE
+    detector = _load_bird_detector()
+    if detector is None:
+        raise BirdDetectionError(_BIRD_DETECTOR_ERROR_MESSAGE or "Bird detection model unavailable")
+    _BIRD_DETECTOR_ERROR_MESSAGE = ""
+    model, bird_class_ids = detector
+    return _predict_bird_boxes(model, bird_class_ids, sources)
+
+
+def _detect_primary_bird_boxes(
+    images: list[Image.Image],
+    predict: Callable[[list[Image.Image]], list[tuple[float, float, float, float] | None]] | None = None,
+) -> list[tuple[float, float, float, float] | None]:
+    """Coarse pass on reduced copies, then a refine pass on crops around small birds.
+
+    The model letterboxes to 640px anyway, so handing it the full-resolution frame only
+    costs conversion time; distant birds, however, shrink to a few pixels in that pass,
+    so their box is re-detected on a padded crop at higher effective resolution.
+    Each pass is one batched ``predict`` over all images that need it; ``predict`` only
+    ever sees images reduced to the detector input size (``BirdDetectorProcess`` ships
+    them to a worker process). Raises ``BirdDetectionError`` when the coarse pass fails;
+    a failed refine pass keeps the coarse boxes.
+    """
+    if not images:
+        return []
+    predict = predict or _predict_in_process
+    boxes = list(predict([_bird_detect_input(image) for image in images]))
+    refine: list[tuple[int, tuple[int, int, int, int]]] = []
+    for index, (image, box) in enumerate(zip(images, boxes)):
+        if box is not None:
+            region = _bird_refine_region(box, image.width, image.height)
+            if region is not None:
+                refine.append((index, region))
+    if not refine:
+        return boxes
+    try:
+        roi_boxes = predict([_bird_detect_input(images[index].crop(region)) for index, region in refine])
+    except BirdDetectionError:
+        return boxes
+    for (index, (left, top, right, bottom)), roi_box in zip(refine, roi_boxes):
+        if roi_box is None:
+            continue
+        width, height = images[index].size
+        region_w = float(right - left)
+        region_h = float(bottom - top)
+        boxes[index] = (
+            clamp01((left + roi_box[0] * region_w) / width),
+            clamp01((top + roi_box[1] * region_h) / height),
+            clamp01((left + roi_box[2] * region_w) / width),
+            clamp01((top + roi_box[3] * region_h) / height),
+        )
+    return boxes
+
+
+def _detect_primary_bird_box(image: Image.Image) -> tuple[float, float, float, float] | None:
+    return _detect_primary_bird_boxes([image])[0]
+
+
+class BirdDetectionBatcher:
+    """Collects images from many threads and detects birds on them in batches.
+
+    ``submit`` queues an image and returns a ``Future``; a single worker thread takes
+    up to ``batch_size`` queued images (waiting at most ``max_wait`` seconds for more
+    after the first) and runs them through one batched ``predict``, then resolves each
+    caller's future with its own box. Instances are ``bird_box_provider`` callables,
+    so render threads can pass one straight to ``apply_editor_crop`` /
+    ``compute_crop_plan``. The batch size only fills up when that many threads are
+    waiting on detection at once.
+    """
+
+    def __init__(
+        self,
+        batch_size: int = DEFAULT_BIRD_DETECT_BATCH_SIZE,
+        *,
+        max_wait: float = _BIRD_BATCH_MAX_WAIT_SECONDS,
+        detector: Callable[[list[Image.Image]], list[tuple[float, float, float, float] | None]] | None = None,
+    ) -> None:
+        self.batch_size = max(1, int(batch_size))
+        self.max_wait = max(0.0, float(max_wait))
+        self._detector = detector or _detect_primary_bird_boxes
+        self._queue: queue.SimpleQueue = queue.SimpleQueue()
+        self._lock = threading.Lock()
+        self._thread: threading.Thread | None = None
+        self._closed = False
+        self.batches = 0
+        self.images = 0
+
+    def submit(self, image: Image.Image) -> Future:
+        future: Future = Future()
+        with self._lock:
+            if self._closed:
+                raise RuntimeError("bird detection batcher is closed")
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="birdstamp-bird-detect", daemon=True)
+                self._thread.start()
+            self._queue.put((image, future))
+        return future
+
+    def detect(self, image: Image.Image) -> tuple[float, float, float, float] | None:
+        future = self.submit(image)
+        with profiling.span(profiling.STAGE_DETECTION):
+            return future.result()
+
+    def __call__(self, image: Image.Image) -> tuple[float, float, float, float] | None:
+        return self.detect(image)
+
+    def close(self) -> None:
+        """Finish the queued images and stop the worker thread."""
+        with self._lock:
+            if self._closed:
+                return
+            self._closed = True
+            thread = self._thread
+            if thread is not None:
+                self._queue.put(None)
+        if thread is not None:
+            thread.join()
+
+    def __enter__(self) -> "BirdDetectionBatcher":
+        return self
+
+    def __exit__(self, *exc_info: object) -> None:
+        self.close()
+
+    def _next_batch(self) -> list[tuple[Image.Image, Future]] | None:
+        first = self._queue.get()
+        if first is None:
+            return None
+        batch = [first]
+        deadline = time.perf_counter() + self.max_wait
+        while len(batch) < self.batch_size:
+            timeout = deadline - time.perf_counter()
+            try:
+                item = self._queue.get(timeout=timeout) if timeout > 0 else self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if item is None:
+                self._queue.put(None)  # 处理完这一批再退出
+                break
+            batch.append(item)
+        return batch
+
+    def _run(self) -> None:
+        while True:
+            batch = self._next_batch()
+            if batch is None:
+                return
+            batch = [(image, future) for image, future in batch if future.set_running_or_notify_cancel()]
+            if not batch:
+                continue
+            self.batches += 1
+            self.images += len(batch)
+            try:
+                boxes = list(self._detector([image for image, _future in batch]))
+            except BaseException as exc:
+                for _image, future in batch:
+                    future.set_exception(exc)
+                continue
+            for index, (_image, future) in enumerate(batch):
+                future.set_result(boxes[index] if index < len(boxes) else None)
+
+
+def stored_bird_box_provider(
+    source_path: Path,
+    store: Any,
+    detector: Callable[[Image.Image], tuple[float, float, float, float] | None] | None = None,
+) -> Callable[[Image.Image], tuple[float, float, float, float] | None]:
+    """``bird_box_provider`` that answers from ``store`` (a ``BirdBoxStore``) and records new detections.
+
+    ``detector`` (default: the in-process model) must raise ``BirdDetectionError`` when it
+    could not run; that call returns None without storing it, so the photo is detected
+    again next time. A returned None means "no bird" and is stored.
+    """
+    detector_key = bird_detector_cache_key()
+
+    def _provider(image: Image.Image) -> tuple[float, float, float, float] | None:
+        found, box = store.get(source_path, detector_key)
+        if found:
+            return box
+        try:
+            if detector is None:
+                with profiling.span(profiling.STAGE_DETECTION):
+                    box = _detect_primary_bird_box(image)
+            else:
+                box = detector(image)
+        except BirdDetectionError:
+            return None
+        store.put(source_path, detector_key, box)
+        return box
+
+    return _provider
+
+
+def _init_bird_detector_worker(backend: str, threads: int) -> None:
+    set_bird_detector_backend(backend)
+    set_bird_detector_threads(threads)
+
+
+def _predict_in_worker(sources: list[Image.Image]) -> tuple[list[tuple[float, float, float, float] | None], str]:
+    boxes = _predict_in_process(sources)
+    return (boxes, _BIRD_DETECTOR_ERROR_MESSAGE)
+
+
+class BirdDetectorProcess:
+    """The bird detector in a dedicated worker process with its own thread budget.
+
+    Render threads no longer wait on a lock around in-process inference, and the model's
+    intra-op threads are capped at ``threads`` instead of competing with the PIL threads
+    for every core. Only detector-size images (long edge <= 640) cross the process
+    boundary; refine crops are cut here from the full-resolution image. The worker is
+    spawned on first use (no forked torch state) and replaced after a crash.
+    ``detect_many`` is the ``detector`` for a ``BirdDetectionBatcher``.
+    """
+
+    def __init__(self, *, threads: int = 0, backend: str | None = None) -> None:
+        self.threads = max(0, int(threads))
+        self.backend = backend
+        self._executor: ProcessPoolExecutor | None = None
+        self._lock = threading.Lock()
+
+    def _pool(self) -> ProcessPoolExecutor:
+        with self._lock:
+            if self._executor is None:
+                self._executor = ProcessPoolExecutor(
+                    max_workers=1,
+                    mp_context=multiprocessing.get_context("spawn"),
+                    initializer=_init_bird_detector_worker,
+                    initargs=(self.backend or get_bird_detector_backend(), self.threads),
+                )
+            return self._executor
+
+    def set_threads(self, threads: int) -> None:
+        """Change the worker's thread cap; a running worker applies it before its next batch."""
+        threads = max(0, int(threads))
+        with self._lock:
+            if threads == self.threads:
+                return
+            self.threads = threads
+            executor = self._executor
+        if executor is not None:
+            try:
+                executor.submit(set_bird_detector_threads, threads)
+            except Exception:
+                pass  # 已损坏的 worker 会在下次 predict 时按新线程数重启
+
+    def predict(self, sources: list[Image.Image]) -> list[tuple[float, float, float, float] | None]:
+        """Boxes from the worker; raises ``BirdDetectionError`` when the worker could not detect."""
+        global _BIRD_DETECTOR_ERROR_MESSAGE
+        if not sources:
+            return []
+        executor = self._pool()
+        try:
+            boxes, error_message = executor.submit(_predict_in_worker, list(sources)).result()
+        except BirdDetectionError as exc:
+            _BIRD_DETECTOR_ERROR_MESSAGE = str(exc)
+            raise
+        except Exception as exc:
+            # BrokenProcessPool 等：丢弃这个 worker，下次请求重新启动
+            with self._lock:
+                if self._executor is executor:
+                    self._executor = None
+            executor.shutdown(wait=False, cancel_futures=True)
+            _BIRD_DETECTOR_ERROR_MESSAGE = f"Bird detector process failed: {_short_error_text(exc)}"
+            raise BirdDetectionError(_BIRD_DETECTOR_ERROR_MESSAGE) from exc
+        _BIRD_DETECTOR_ERROR_MESSAGE = error_message
+        return list(boxes)
+
+    def detect_many(self, images: list[Image.Image]) -> list[tuple[float, float, float, float] | None]:
+        with profiling.span(profiling.STAGE_DETECTION):
+            return _detect_primary_bird_boxes(list(images), self.predict)
+
+    def close(self) -> None:
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=True, cancel_futures=True)
+
+    def __enter__(self) -> "BirdDetectorProcess":
+        return self
+
+    def __exit__(self, *exc_info: object) -> None:
+        self.close()
+
+
+@lru_cache(maxsize=1)
+def shared_bird_detector_process() -> BirdDetectorProcess:
+    """Process-wide detector worker, started on the first detection that needs it.
+
+    Its threads default to the detector share of the CPU budget (``birdstamp.cpu_budget``).
+    """
+    return BirdDetectorProcess(threads=plan_cpu_budget().detector_threads)
+
+
+@lru_cache(maxsize=1)
+def shared_bird_detection_batcher() -> BirdDetectionBatcher:
+    """Process-wide batcher for threaded callers that do not manage their own (video export).
+
+    Batches run in the shared detector worker process.
+    """
+    return BirdDetectionBatcher(detector=shared_bird_detector_process().detect_many)
+
+
+class LazyBirdBox:
+    """Primary bird box of one image, detected on first ``get()`` only.
+
+    Crop planning asks for it only when the center mode needs it (bird mode, or
+    focus mode without a focus point), so image-centred crops never import torch
+    or load the model. Also usable as a ``bird_box_provider`` callable; one
+    instance shared by several crops of the same image detects once. A detector
+    raising ``BirdDetectionError`` resolves to None; other exceptions propagate.
+    """
+
+    __slots__ = ("_image", "_detector", "_box", "_resolved", "_lock")
+
+    def __init__(
+        self,
+        image: Image.Image | None = None,
+        detector: Callable[[Image.Image], tuple[float, float, float, float] | None] | None = None,
+    ) -> None:
+        self._image = image
+        self._detector = detector
+        self._box: tuple[float, float, float, float] | None = None
+        self._resolved = False
+        self._lock = threading.Lock()
+
+    @property
+    def resolved(self) -> bool:
+        return self._resolved
+
+    def get(self, image: Image.Image | None = None) -> tuple[float, float, float, float] | None:
+        if self._resolved:
+            return self._box
+        with self._lock:
+            if not self._resolved:
+                target = self._image if self._image is not None else image
+                box = None
+                if target is not None:
+                    try:
+                        box = (self._detector or detect_primary_bird_box)(target)
+                    except BirdDetectionError:
+                        # 检测器不可用（错误信息已记录）：按“无鸟”处理；其它异常照常抛出。
+                        box = None
+                self._box = box
+                self._resolved = True
+                self._image = None
+        return self._box
+
+    def __call__(self, image: Image.Image | None = None) -> tuple[float, float, float, float] | None:
+        return self.get(image)
 
 
 def compute_crop_plan(
@@ -1135,12 +1726,15 @@ def compute_crop_plan(
     inner_bottom: int = 0,
     inner_left: int = 0,
     inner_right: int = 0,
+    bird_box_provider: Callable[[Image.Image], tuple[float, float, float, float] | None] | None = None,
 ) -> tuple[tuple[float, float, float, float] | None, tuple[int, int, int, int]]:
     """Compute (crop_box, outer_pad) using the same logic as the main editor's pipeline.
 
     Returns the normalised crop box (0-1 coordinates) and the outer padding
     (top, bottom, left, right) in pixels that must be added to the image *before*
     applying the crop. Matches ``_BirdStampCropCalculatorMixin._compute_crop_plan_for_image``.
+    Bird detection (``bird_box_provider`` or ``detect_primary_bird_box``) only runs
+    when the center mode needs it.
     """
     if ratio is None:
         return (None, (0, 0, 0, 0))
@@ -1150,22 +1744,17 @@ def compute_crop_plan(
     keep_box: tuple[float, float, float, float] | None = None
 
     # Resolve anchor and keep_box
-    focus_point = get_focus_point_for_display(raw_metadata, w, h, camera_type=camera_type)
-    bird_box: tuple[float, float, float, float] | None = None
-    try:
-        bird_box = detect_primary_bird_box(image)
-    except Exception:
-        pass
-
-    if center_mode == CENTER_MODE_FOCUS:
-        if focus_point is not None:
-            anchor = focus_point
-        elif bird_box is not None:
-            anchor = box_center(bird_box)
-    elif center_mode == CENTER_MODE_BIRD:
-        if bird_box is not None:
-            anchor = box_center(bird_box)
-            keep_box = bird_box
+    if center_mode in (CENTER_MODE_FOCUS, CENTER_MODE_BIRD):
+        focus_point = get_focus_point_for_display(raw_metadata, w, h, camera_type=camera_type)
+        bird_box = LazyBirdBox(image, bird_box_provider)
+        if center_mode == CENTER_MODE_FOCUS:
+            if focus_point is not None:
+                anchor = focus_point
+            elif bird_box.get() is not None:
+                anchor = box_center(bird_box.get())
+        elif bird_box.get() is not None:
+            anchor = box_center(bird_box.get())
+            keep_box = bird_box.get()
         elif focus_point is not None:
             anchor = focus_point
 
@@ -1229,6 +1818,7 @@ def apply_full_crop(
     inner_right: int = 0,
     max_long_edge: int = 0,
     fill_color: str = "#FFFFFF",
+    bird_box_provider: Callable[[Image.Image], tuple[float, float, float, float] | None] | None = None,
 ) -> Image.Image:
     """Apply the full main-editor crop pipeline to an image and return the result.
 
@@ -1245,6 +1835,7 @@ def apply_full_crop(
         inner_bottom=inner_bottom,
         inner_left=inner_left,
         inner_right=inner_right,
+        bird_box_provider=bird_box_provider,
     )
     pt, pb, pl, pr = outer_pad
     if pt or pb or pl or pr:
@@ -1267,8 +1858,13 @@ def apply_editor_crop(
     crop_padding_px: int = DEFAULT_CROP_PADDING_PX,
     max_long_edge: int = 0,
     fill_color: str = "#FFFFFF",
+    bird_box_provider: Callable[[Image.Image], tuple[float, float, float, float] | None] | None = None,
 ) -> Image.Image:
-    """Apply editor-style crop (focus/bird/image center) for CLI or batch use."""
+    """Apply editor-style crop (focus/bird/image center) for CLI or batch use.
+
+    ``bird_box_provider`` replaces ``detect_primary_bird_box`` in bird mode, e.g.
+    to reuse one detection for several crops of the same image.
+    """
     w, h = image.width, image.height
     if w <= 0 or h <= 0:
         return image
@@ -1291,7 +1887,7 @@ def apply_editor_crop(
                 keep_box = focus_box
                 anchor = box_center(focus_box)
     elif center_mode == CENTER_MODE_BIRD:
-        bird_box = detect_primary_bird_box(image)
+        bird_box = (bird_box_provider or detect_primary_bird_box)(image)
         if bird_box is not None:
             keep_box = bird_box
             anchor = box_center(bird_box)
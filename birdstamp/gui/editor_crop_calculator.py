@@ -11,6 +11,7 @@ from typing import Any
 
 from PIL import Image
 
+from birdstamp.bird_box_store import shared_bird_box_store
 from birdstamp.gui import editor_core, editor_options
 
 _parse_ratio_value                  = editor_core.parse_ratio_value
@@ -51,7 +52,12 @@ class _BirdStampCropMixin:
                 self._bird_box_cache[signature] = None
                 return None
 
-        bird_box = _detect_primary_bird_box(image)
+        detector = _detect_primary_bird_box
+        store = shared_bird_box_store()
+        if store is not None:
+            # 默认检测器会区分"没有鸟"和"检测失败"，失败的结果不会写入缓存。
+            detector = editor_core.stored_bird_box_provider(path, store)
+        bird_box = detector(image)
         self._bird_box_cache[signature] = bird_box
         if bird_box is None and not self._bird_detect_error_reported and _get_bird_detector_error_message():
             self._set_status(f"鸟体识别不可用: {_get_bird_detector_error_message()}")
@@ -106,11 +112,13 @@ class _BirdStampCropMixin:
             image.height,
             camera_type=focus_camera_type,
         )
+        mode = _normalize_center_mode(center_mode)
         bird_box: tuple[float, float, float, float] | None = None
-        if path is not None:
+        # 只有鸟体居中、或对焦居中却没有对焦点时才需要跑鸟体检测。
+        needs_bird_box = mode == _CENTER_MODE_BIRD or (mode == _CENTER_MODE_FOCUS and focus_point is None)
+        if needs_bird_box and path is not None:
             bird_box = self._bird_box_for_path(path, source_image=image)
 
-        mode = _normalize_center_mode(center_mode)
         resolver_map = {
             _CENTER_MODE_IMAGE: self._resolve_crop_targets_for_image_center,
             _CENTER_MODE_FOCUS: self._resolve_crop_targets_for_focus_center,
@@ -11,6 +11,7 @@ from typing import Any
 from PIL import Image
 from PyQt6.QtWidgets import QFileDialog, QMessageBox
 
+from birdstamp.cpu_budget import apply_detector_budget, plan_cpu_budget
 from birdstamp.gui import editor_options
 
 OUTPUT_FORMAT_OPTIONS = editor_options.OUTPUT_FORMAT_OPTIONS
@@ -88,6 +89,8 @@ class _BirdStampExporterMixin:
         stem_counter: dict[str, int] = {}
         ok_count = 0
         failed: list[str] = []
+        # 逐张串行渲染，鸟检测在渲染间隙运行，可用整份 CPU 预算（BIRDSTAMP_CPU_BUDGET）。
+        apply_detector_budget(plan_cpu_budget(render_workers=1), inline=True)
 
         for path in paths:
             try:
@@ -0,0 +1,181 @@
+# YOLO bird detection on ONNX Runtime (CPU) — no torch / ultralytics import.
+# Loads a model exported with ``yolo export format=onnx`` (scripts_dev/export_bird_onnx.py)
+# and reproduces the part of the ultralytics predictor the bird crop needs:
+# letterbox to the model input, one session run per batch, confidence filter and
+# class-aware NMS in NumPy. ``predict`` returns objects shaped like ultralytics
+# ``Results`` (``boxes.xyxy`` / ``cls`` / ``conf``) in source pixel coordinates.
+from __future__ import annotations
+
+import ast
+from pathlib import Path
+from typing import Any
+
+import numpy as np
+from PIL import Image
+
+# 与 ultralytics 预测默认值一致：灰色填充、NMS IoU 0.7、每图最多 300 个框。
+_LETTERBOX_FILL = (114, 114, 114)
+_NMS_IOU = 0.7
+_MAX_DETECTIONS = 300
+# 类别感知 NMS：按类别把框平移开，不同类别的框互不抑制。
+_CLASS_OFFSET = 7680.0
+_DEFAULT_INPUT_SIZE = (640, 640)
+
+
+class OnnxBoxes:
+    __slots__ = ("xyxy", "cls", "conf")
+
+    def __init__(self, xyxy: np.ndarray, cls: np.ndarray, conf: np.ndarray) -> None:
+        self.xyxy = xyxy
+        self.cls = cls
+        self.conf = conf
+
+
+class OnnxResult:
+    __slots__ = ("boxes",)
+
+    def __init__(self, boxes: OnnxBoxes) -> None:
+        self.boxes = boxes
+
+
+def _metadata_literal(value: Any) -> Any:
+    if not isinstance(value, str) or not value:
+        return None
+    try:
+        return ast.literal_eval(value)
+    except (ValueError, SyntaxError):
+        return None
+
+
+def _nms(boxes: np.ndarray, scores: np.ndarray, iou_threshold: float) -> np.ndarray:
+    """Indices kept by greedy NMS, highest score first."""
+    x1, y1, x2, y2 = boxes[:, 0], boxes[:, 1], boxes[:, 2], boxes[:, 3]
+    areas = np.clip(x2 - x1, 0, None) * np.clip(y2 - y1, 0, None)
+    order = scores.argsort()[::-1]
+    keep: list[int] = []
+    while order.size:
+        index = int(order[0])
+        keep.append(index)
+        if len(keep) >= _MAX_DETECTIONS or order.size == 1:
+            break
+        rest = order[1:]
+        inter_w = np.clip(np.minimum(x2[index], x2[rest]) - np.maximum(x1[index], x1[rest]), 0, None)
+        inter_h = np.clip(np.minimum(y2[index], y2[rest]) - np.maximum(y1[index], y1[rest]), 0, None)
+        inter = inter_w * inter_h
+        iou = inter / (areas[index] + areas[rest] - inter + 1e-9)
+        order = rest[iou <= iou_threshold]
+    return np.asarray(keep, dtype=np.int64)
+
+
+class OnnxBirdModel:
+    """Drop-in for the ultralytics ``YOLO`` object as used by ``editor_core`` (``names`` + ``predict``)."""
+
+    # editor_core 据此跳过 torch 设备探测
+    inference_device = "cpu"
+
+    def __init__(
+        self,
+        session: Any,
+        *,
+        names: dict[int, str] | None = None,
+        input_size: tuple[int, int] | None = None,
+    ) -> None:
+        self.session = session
+        model_input = session.get_inputs()[0]
+        self.input_name = model_input.name
+        shape = list(model_input.shape)
+        try:
+            metadata = dict(session.get_modelmeta().custom_metadata_map or {})
+        except Exception:
+            metadata = {}
+        parsed_names = names if names is not None else _metadata_literal(metadata.get("names"))
+        self.names: dict[int, str] = dict(parsed_names) if isinstance(parsed_names, dict) else {}
+        if input_size is None:
+            if len(shape) == 4 and isinstance(shape[2], int) and isinstance(shape[3], int):
+                input_size = (shape[2], shape[3])
+            else:
+                imgsz = _metadata_literal(metadata.get("imgsz"))
+                if isinstance(imgsz, (list, tuple)) and len(imgsz) == 2:
+                    input_size = (int(imgsz[0]), int(imgsz[1]))
+        self.input_size: tuple[int, int] = input_size or _DEFAULT_INPUT_SIZE  # (height, width)
+        # 静态导出的模型 batch 维固定为 1，只能逐张推理。
+        self.batchable = not (shape and isinstance(shape[0], int))
+
+    def _letterbox(self, image: Image.Image) -> tuple[np.ndarray, float, tuple[int, int]]:
+        if image.mode != "RGB":
+            image = image.convert("RGB")
+        target_h, target_w = self.input_size
+        width, height = image.size
+        ratio = min(target_w / float(width), target_h / float(height))
+        new_w = max(1, int(round(width * ratio)))
+        new_h = max(1, int(round(height * ratio)))
+        if (new_w, new_h) != (width, height):
+            image = image.resize((new_w, new_h), Image.Resampling.BILINEAR)
+        left = int(round((target_w - new_w) / 2.0 - 0.1))
+        top = int(round((target_h - new_h) / 2.0 - 0.1))
+        canvas = Image.new("RGB", (target_w, target_h), _LETTERBOX_FILL)
+        canvas.paste(image, (left, top))
+        tensor = np.asarray(canvas, dtype=np.float32).transpose(2, 0, 1) / np.float32(255.0)
+        return np.ascontiguousarray(tensor), ratio, (left, top)
+
+    def _run(self, batch: np.ndarray) -> np.ndarray:
+        return np.asarray(self.session.run(None, {self.input_name: batch})[0])
+
+    def _postprocess(
+        self,
+        prediction: np.ndarray,
+        ratio: float,
+        pad: tuple[int, int],
+        source_size: tuple[int, int],
+        conf_threshold: float,
+        iou_threshold: float,
+    ) -> OnnxResult:
+        rows = prediction.T  # (anchors, 4 + classes)
+        scores = rows[:, 4:]
+        cls = scores.argmax(axis=1)
+        conf = scores[np.arange(rows.shape[0]), cls]
+        mask = conf > conf_threshold
+        rows, cls, conf = rows[mask], cls[mask], conf[mask]
+        cx, cy, w, h = rows[:, 0], rows[:, 1], rows[:, 2], rows[:, 3]
+        xyxy = np.stack([cx - w / 2, cy - h / 2, cx + w / 2, cy + h / 2], axis=1)
+        if xyxy.shape[0]:
+            keep = _nms(xyxy + (cls[:, None] * _CLASS_OFFSET), conf, iou_threshold)
+            xyxy, cls, conf = xyxy[keep], cls[keep], conf[keep]
+        left, top = pad
+        xyxy = (xyxy - np.array([left, top, left, top], dtype=xyxy.dtype)) / ratio
+        width, height = source_size
+        xyxy[:, [0, 2]] = xyxy[:, [0, 2]].clip(0, width)
+        xyxy[:, [1, 3]] = xyxy[:, [1, 3]].clip(0, height)
+        return OnnxResult(OnnxBoxes(xyxy.astype(np.float32), cls.astype(np.float32), conf.astype(np.float32)))
+
+    def predict(
+        self,
+        *,
+        source: Image.Image | list[Image.Image],
+        conf: float = 0.25,
+        iou: float = _NMS_IOU,
+        **_kwargs: Any,
+    ) -> list[OnnxResult]:
+        sources = list(source) if isinstance(source, list) else [source]
+        if not sources:
+            return []
+        prepared = [self._letterbox(image) for image in sources]
+        if self.batchable:
+            predictions = list(self._run(np.stack([tensor for tensor, _ratio, _pad in prepared])))
+        else:
+            predictions = [self._run(tensor[None])[0] for tensor, _ratio, _pad in prepared]
+        return [
+            self._postprocess(prediction, ratio, pad, image.size, conf, iou)
+            for prediction, (_tensor, ratio, pad), image in zip(predictions, prepared, sources)
+        ]
+
+
+def load_onnx_bird_model(model_path: Path, *, intra_op_threads: int = 0) -> OnnxBirdModel:
+    """CPU ``InferenceSession`` for ``model_path``; ``intra_op_threads`` 0 keeps the runtime default."""
+    import onnxruntime as ort
+
+    options = ort.SessionOptions()
+    if intra_op_threads > 0:
+        options.intra_op_num_threads = int(intra_op_threads)
+    session = ort.InferenceSession(str(model_path), sess_options=options, providers=["CPUExecutionProvider"])
+    return OnnxBirdModel(session)
@@ -13,10 +13,14 @@ from typing import Any
 from PIL import Image
 from PyQt6.QtGui import QPixmap
 
+from app_common.log import get_logger
+from birdstamp import profiling
 from birdstamp.decoders.image_decoder import decode_image
 from birdstamp.gui import editor_core, editor_options, editor_template, editor_utils, template_context as _template_context
 from birdstamp.gui.editor_preview_canvas import EditorPreviewOverlayOptions, EditorPreviewOverlayState
 
+_log = get_logger("editor_renderer")
+
 _pil_to_qpixmap                     = editor_utils.pil_to_qpixmap
 _path_key                           = editor_utils.path_key
 _safe_color                         = editor_utils.safe_color
@@ -41,7 +45,8 @@ _normalized_box_to_pixel_box        = editor_core.normalized_box_to_pixel_box
 _normalize_template_payload         = editor_template.normalize_template_payload
 _deep_copy_payload                  = editor_template.deep_copy_payload
 _default_template_payload           = editor_template.default_template_payload
-_load_template_payload              = editor_template.load_template_payload
+_load_compiled_template             = editor_template.load_compiled_template
+_compile_template                   = editor_template.compile_template
 render_template_overlay             = editor_template.render_template_overlay
 _render_template_overlay_in_crop_region = editor_template.render_template_overlay_in_crop_region
 _DEFAULT_TEMPLATE_CENTER_MODE       = editor_template.DEFAULT_TEMPLATE_CENTER_MODE
@@ -536,7 +541,7 @@ class _BirdStampRendererMixin:
         target_w = max(1, right - left)
         target_h = max(1, bottom - top)
 
-        patch = rendered_crop.convert("RGB")
+        patch = rendered_crop if rendered_crop.mode == "RGB" else rendered_crop.convert("RGB")
         if patch.width != target_w or patch.height != target_h:
             patch = patch.resize((target_w, target_h), Image.Resampling.LANCZOS)
 
@@ -544,22 +549,22 @@ class _BirdStampRendererMixin:
         merged.paste(patch, (left, top))
         return merged
 
-    def _resolve_template_payload_for_render(self, settings: dict[str, Any]) -> dict[str, Any]:
+    def _resolve_template_for_render(self, settings: dict[str, Any]) -> editor_template.CompiledTemplate:
         template_name = str(settings.get("template_name") or "default").strip() or "default"
-        payload_raw = settings.get("template_payload")
-        if isinstance(payload_raw, dict):
-            payload = _normalize_template_payload(payload_raw, fallback_name=template_name)
-        else:
-            payload = _default_template_payload(name=template_name)
-
-        # 主预览和导出的模板内容始终跟随模板文件配置。
+        # 主预览和导出的模板内容始终跟随模板文件配置；文件未变化时复用已编译的模板。
         template_path = self.template_paths.get(template_name)
         if template_path and template_path.is_file():
             try:
-                payload = _load_template_payload(template_path)
+                return _load_compiled_template(template_path)
             except Exception:
                 pass
-        return payload
+
+        payload_raw = settings.get("template_payload")
+        if isinstance(payload_raw, dict):
+            payload = _normalize_template_payload(payload_raw, fallback_name=template_name)
+        else:
+            payload = _default_template_payload(name=template_name)
+        return _compile_template(payload, fallback_name=template_name)
 
     def _render_overlay_for_preview_frame(
         self,
@@ -574,7 +579,7 @@ class _BirdStampRendererMixin:
         if not self._should_draw_template_overlay(settings):
             return preview_base
 
-        template_payload = self._resolve_template_payload_for_render(settings)
+        template_payload = self._resolve_template_for_render(settings)
         # 直接在当前预览帧的裁切区域绘制模板，避免先按输出尺寸渲染再缩放导致 Banner 预览偏差。
         return _render_template_overlay_in_crop_region(
             preview_base,
@@ -645,31 +650,45 @@ class _BirdStampRendererMixin:
         return _draw_focus_box_overlay(image, focus_box)
 
     def _render_for_path(self, path: Path, *, prefer_current_ui: bool) -> Image.Image:
+        timer = profiling.StageTimer()
+        with profiling.activate(timer):
+            rendered = self._render_for_path_timed(path, prefer_current_ui=prefer_current_ui)
+        _log.debug(
+            "render %s stages: %s",
+            path.name,
+            " ".join(f"{name}={seconds * 1000.0:.0f}ms" for name, seconds in timer.spans.items()) or "-",
+        )
+        return rendered
+
+    def _render_for_path_timed(self, path: Path, *, prefer_current_ui: bool) -> Image.Image:
         settings = self._render_settings_for_path(path, prefer_current_ui=prefer_current_ui)
         if self.current_path and path == self.current_path and self.current_source_image is not None:
             source_image = self.current_source_image.copy()
             raw_metadata = dict(self.current_raw_metadata)
         else:
-            source_image = decode_image(path, decoder="auto")
-            raw_metadata = self._load_raw_metadata(path)
+            with profiling.span(profiling.STAGE_DECODE):
+                source_image = decode_image(path, decoder="auto")
+            with profiling.span(profiling.STAGE_METADATA):
+                raw_metadata = self._load_raw_metadata(path)
 
-        crop_box, outer_pad = self._compute_crop_plan_for_image(
-            path=path,
-            image=source_image,
-            raw_metadata=raw_metadata,
-            settings=settings,
-        )
-        processed = self._build_processed_image(
-            source_image,
-            raw_metadata,
-            settings=settings,
-            source_path=path,
-            apply_ratio_crop=True,
-            crop_plan=(crop_box, outer_pad),
-        )
+        with profiling.span(profiling.STAGE_CROP_PLAN):
+            crop_box, outer_pad = self._compute_crop_plan_for_image(
+                path=path,
+                image=source_image,
+                raw_metadata=raw_metadata,
+                settings=settings,
+            )
+            processed = self._build_processed_image(
+                source_image,
+                raw_metadata,
+                settings=settings,
+                source_path=path,
+                apply_ratio_crop=True,
+                crop_plan=(crop_box, outer_pad),
+            )
         rendered = processed
         if self._should_draw_template_overlay(settings):
-            template_payload = self._resolve_template_payload_for_render(settings)
+            template_payload = self._resolve_template_for_render(settings)
             if self.current_path and path == self.current_path and self.current_source_image is not None:
                 context = dict(self.current_metadata_context)
                 photo_info = self.current_photo_info
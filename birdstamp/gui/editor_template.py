@@ -4,14 +4,20 @@ from __future__ import annotations
 import json
 import shutil
 import sys
-from collections import defaultdict
+import threading
+import time
+from collections import OrderedDict, defaultdict
+from dataclasses import dataclass
 from functools import lru_cache
 from pathlib import Path
 from typing import Any
 
 from PIL import Image, ImageColor, ImageDraw
 
+from birdstamp import profiling
 from birdstamp.config import get_config_path, resolve_bundled_path
+from birdstamp.render.layout_index import find_text_slot
+from birdstamp.render.lru import ByteLRUCache, image_nbytes
 from birdstamp.render.typography import load_font
 
 from birdstamp.gui.editor_core import (
@@ -65,6 +71,12 @@ _DEFAULT_TEMPLATE_CROP_PADDING_FILL = "#FFFFFF"
 _DEFAULT_TEMPLATE_CENTER_MODE = CENTER_MODE_IMAGE
 _DEFAULT_TEMPLATE_AUTO_CROP_BY_BIRD = True  # 固定为根据鸟体计算，保留键以兼容旧模板
 _DEFAULT_TEMPLATE_MAX_LONG_EDGE = 0
+_ITALIC_SHEAR = -0.28
+# 同尺寸批量渲染时渐变条只生成一次；按像素字节数限制占用。
+_GRADIENT_STRIP_CACHE_BYTES = 96 * 1024 * 1024
+_gradient_strip_cache: ByteLRUCache[Image.Image] = ByteLRUCache(_GRADIENT_STRIP_CACHE_BYTES)
+_TEXT_SPRITE_CACHE_BYTES = 48 * 1024 * 1024
+_text_sprite_cache: ByteLRUCache[Image.Image] = ByteLRUCache(_TEXT_SPRITE_CACHE_BYTES)
 
 
 def _clamp_int(value: Any, minimum: int, maximum: int, fallback: int) -> int:
@@ -452,17 +464,14 @@ def _lookup_tag_value(tag: str, lookup: dict[str, Any], context: dict[str, str])
     return None
 
 
-def _draw_styled_text(
-    image: Image.Image,
+def _render_styled_text_sprite(
     draw: ImageDraw.ImageDraw,
     text: str,
     *,
-    x: int,
-    y: int,
-    color: str,
+    color: str | tuple[int, ...],
     font: Any,
     style: str,
-) -> None:
+) -> Image.Image:
     left, top, right, bottom = draw.textbbox((0, 0), text, font=font)
     width = max(1, right - left)
     height = max(1, bottom - top)
@@ -478,7 +487,7 @@ def _draw_styled_text(
     else:
         layer_draw.text(text_pos, text, font=font, fill=color)
     if is_italic:
-        shear = -0.28
+        shear = _ITALIC_SHEAR
         new_width = int(round(layer.width + abs(shear) * layer.height))
         layer = layer.transform(
             (max(1, new_width), layer.height),
@@ -486,9 +495,69 @@ def _draw_styled_text(
             (1, shear, 0, 0, 1, 0),
             resample=Image.Resampling.BICUBIC,
         )
+    return layer
+
+
+def _text_sprite_key(text: str, font: Any, color: str | tuple[int, ...], style: str) -> tuple[Any, ...]:
+    # 有路径的字体按 (路径, 字号, face index) 区分；默认位图字体没有路径，退回对象本身。
+    font_path = getattr(font, "path", None)
+    font_key = (font_path, getattr(font, "size", None), getattr(font, "index", 0)) if font_path else font
+    return (text, font_key, color, style)
+
+
+def _draw_styled_text(
+    image: Image.Image,
+    draw: ImageDraw.ImageDraw,
+    text: str,
+    *,
+    x: int,
+    y: int,
+    color: str | tuple[int, ...],
+    font: Any,
+    style: str,
+) -> None:
+    # 作者、机身、镜头等字段整批都一样，栅格化后的文字图层跨照片/视频帧复用。
+    layer = _text_sprite_cache.get_or_create(
+        _text_sprite_key(text, font, color, style),
+        lambda: _render_styled_text_sprite(draw, text, color=color, font=font, style=style),
+        image_nbytes,
+    )
     image.alpha_composite(layer, (x - 5, y - 5))
 
 
+def _styled_text_layer_rect(
+    text_rect: tuple[int, int, int, int],
+    style: str,
+) -> tuple[int, int, int, int]:
+    """Canvas area touched by ``_draw_styled_text`` for a text box (5px margin, italic shear)."""
+    left, top, right, bottom = text_rect
+    width = (right - left) + 10
+    height = (bottom - top) + 10
+    if style in {"italic", "bold_italic"}:
+        width = max(1, int(round(width + abs(_ITALIC_SHEAR) * height)))
+    return (left - 5, top - 5, left - 5 + width, top - 5 + height)
+
+
+def _offset_rect(rect: tuple[int, int, int, int], dx: int, dy: int) -> tuple[int, int, int, int]:
+    return (rect[0] + dx, rect[1] + dy, rect[2] + dx, rect[3] + dy)
+
+
+def _union_rect_in_canvas(
+    rects: list[tuple[int, int, int, int]],
+    canvas_width: int,
+    canvas_height: int,
+) -> tuple[int, int, int, int] | None:
+    if not rects:
+        return None
+    left = max(0, min(rect[0] for rect in rects))
+    top = max(0, min(rect[1] for rect in rects))
+    right = min(canvas_width, max(rect[2] for rect in rects))
+    bottom = min(canvas_height, max(rect[3] for rect in rects))
+    if right <= left or bottom <= top:
+        return None
+    return (left, top, right, bottom)
+
+
 def _template_font_scale_for_canvas(width: int, height: int) -> float:
     if width <= 0 or height <= 0:
         return 1.0
@@ -532,20 +601,6 @@ def _compute_template_text_position(
     return (x, y)
 
 
-def _text_boxes_overlap(
-    a: tuple[int, int, int, int],
-    b: tuple[int, int, int, int],
-    *,
-    gap: int,
-) -> bool:
-    return not (
-        a[2] + gap <= b[0]
-        or b[2] + gap <= a[0]
-        or a[3] + gap <= b[1]
-        or b[3] + gap <= a[1]
-    )
-
-
 def _resolve_template_text_position_with_avoidance(
     *,
     base_x: int,
@@ -559,51 +614,19 @@ def _resolve_template_text_position_with_avoidance(
     occupied: list[tuple[int, int, int, int]],
     gap: int,
 ) -> tuple[int, int, tuple[int, int, int, int], bool]:
-    max_x = max(0, canvas_width - text_width)
-    max_y = max(0, canvas_height - text_height)
-    origin_x = max(0, min(max_x, base_x))
-    origin_y = max(0, min(max_y, base_y))
-    step_y = max(4, int(round(text_height * 0.36)))
-    step_x = max(6, int(round(text_width * 0.10)))
-    y_steps = max(8, (canvas_height // step_y) + 3)
-    y_offsets: list[int] = [0]
-    if align_v == "bottom":
-        y_offsets.extend([-step_y * i for i in range(1, y_steps + 1)])
-        y_offsets.extend([step_y * i for i in range(1, max(3, y_steps // 2) + 1)])
-    elif align_v == "top":
-        y_offsets.extend([step_y * i for i in range(1, y_steps + 1)])
-        y_offsets.extend([-step_y * i for i in range(1, max(3, y_steps // 2) + 1)])
-    else:
-        for i in range(1, y_steps + 1):
-            y_offsets.extend([step_y * i, -step_y * i])
-    x_offsets: list[int] = [0]
-    x_span = max(2, min(8, canvas_width // max(1, step_x)))
-    if align_h == "left":
-        x_offsets.extend([step_x * i for i in range(1, x_span + 1)])
-        x_offsets.extend([-step_x * i for i in range(1, max(2, x_span // 2) + 1)])
-    elif align_h == "right":
-        x_offsets.extend([-step_x * i for i in range(1, x_span + 1)])
-        x_offsets.extend([step_x * i for i in range(1, max(2, x_span // 2) + 1)])
-    else:
-        for i in range(1, x_span + 1):
-            x_offsets.extend([step_x * i, -step_x * i])
-    best: tuple[int, int, tuple[int, int, int, int], int] | None = None
-    for dy in y_offsets:
-        for dx in x_offsets:
-            x = max(0, min(max_x, origin_x + dx))
-            y = max(0, min(max_y, origin_y + dy))
-            rect = (x, y, x + text_width, y + text_height)
-            overlaps = sum(1 for existing in occupied if _text_boxes_overlap(rect, existing, gap=gap))
-            if overlaps == 0:
-                return (x, y, rect, True)
-            distance = abs(dx) + abs(dy)
-            score = overlaps * 100000 + distance
-            if best is None or score < best[3]:
-                best = (x, y, rect, score)
-    if best is not None:
-        return (best[0], best[1], best[2], False)
-    rect = (origin_x, origin_y, origin_x + text_width, origin_y + text_height)
-    return (origin_x, origin_y, rect, False)
+    # 候选位置与打分规则见 birdstamp.render.layout_index（按占用区间直接求空位，结果与逐个试探一致）。
+    return find_text_slot(
+        base_x=base_x,
+        base_y=base_y,
+        text_width=text_width,
+        text_height=text_height,
+        canvas_width=canvas_width,
+        canvas_height=canvas_height,
+        align_h=align_h,
+        align_v=align_v,
+        occupied=occupied,
+        gap=gap,
+    )
 
 
 def _iter_font_sizes_for_layout(base_size: int, minimum: int = 8) -> list[int]:
@@ -621,6 +644,21 @@ def _iter_font_sizes_for_layout(base_size: int, minimum: int = 8) -> list[int]:
     return sizes
 
 
+def _fit_font_size(sizes: list[int], place: Any) -> tuple[Any, ...]:
+    """Placement for the first of ``sizes`` (descending) that fits without overlap.
+
+    ``place(size)`` returns a tuple whose last item is "fits". Sizes are walked in
+    order rather than bisected: whether a size finds a free slot is not monotonic
+    in the size. Falls back to the smallest size.
+    """
+    placed: tuple[Any, ...] = ()
+    for size in sizes:
+        placed = place(size)
+        if placed[-1]:
+            break
+    return placed
+
+
 def _compute_template_banner_rect(
     *,
     text_boxes: list[tuple[int, int, int, int]],
@@ -656,6 +694,42 @@ def _compute_template_bottom_gradient_rect(
     return (0, top, canvas_width, canvas_height)
 
 
+def _gradient_column_values(
+    height: int,
+    top_rgba: tuple[int, int, int, int],
+    bottom_rgba: tuple[int, int, int, int],
+) -> bytes:
+    """Row-by-row RGBA bytes of a linear top->bottom blend (round-half-even like ``round``)."""
+    denominator = float(max(1, height - 1))
+    try:
+        import numpy as np
+    except Exception:
+        np = None
+    if np is not None:
+        t = np.arange(height, dtype=np.float64) / denominator
+        top = np.asarray(top_rgba, dtype=np.float64)
+        bottom = np.asarray(bottom_rgba, dtype=np.float64)
+        values = np.rint(top[None, :] + (bottom - top)[None, :] * t[:, None])
+        return values.astype(np.uint8).tobytes()
+    out = bytearray()
+    for row in range(height):
+        t = row / denominator
+        out.extend(int(round(a + (b - a) * t)) for a, b in zip(top_rgba, bottom_rgba))
+    return bytes(out)
+
+
+def _build_vertical_gradient_strip(
+    width: int,
+    height: int,
+    top_rgba: tuple[int, int, int, int],
+    bottom_rgba: tuple[int, int, int, int],
+) -> Image.Image:
+    column = Image.frombytes("RGBA", (1, height), _gradient_column_values(height, top_rgba, bottom_rgba))
+    if width > 1:
+        return column.resize((width, height), resample=Image.Resampling.NEAREST)
+    return column
+
+
 def _draw_vertical_gradient_scrim(
     image: Image.Image,
     *,
@@ -684,22 +758,13 @@ def _draw_vertical_gradient_scrim(
     bottom_alpha = int(round(max(0.0, min(100.0, bottom_opacity_pct)) * 2.55))
     if top_alpha <= 0 and bottom_alpha <= 0:
         return
-    denominator = max(1, height - 1)
-    pixels: list[tuple[int, int, int, int]] = []
-    for row in range(height):
-        t = row / float(denominator)
-        r = int(round(tr + (br - tr) * t))
-        g = int(round(tg + (bg - tg) * t))
-        b = int(round(tb + (bb - tb) * t))
-        a = int(round(top_alpha + (bottom_alpha - top_alpha) * t))
-        pixels.append((r, g, b, a))
-    gradient = Image.new("RGBA", (1, height))
-    gradient.putdata(pixels)
-    if width > 1:
-        gradient = gradient.resize((width, height), resample=Image.Resampling.BILINEAR)
-    overlay = Image.new("RGBA", image.size, color=(0, 0, 0, 0))
-    overlay.paste(gradient, (left, top))
-    image.alpha_composite(overlay)
+    key = (width, height, (tr, tg, tb, top_alpha), (br, bg, bb, bottom_alpha))
+    gradient = _gradient_strip_cache.get_or_create(
+        key,
+        lambda: _build_vertical_gradient_strip(width, height, key[2], key[3]),
+        image_nbytes,
+    )
+    image.alpha_composite(gradient, (left, top))
 
 
 BANNER_BACKGROUND_STYLE_SOLID = _BANNER_BACKGROUND_STYLE_SOLID
@@ -729,61 +794,275 @@ def normalize_banner_background_style(value: Any) -> str:
     return _normalize_banner_background_style(value)
 
 
-def render_template_overlay(
-    image: Image.Image,
+@dataclass(frozen=True, slots=True)
+class CompiledTemplateField:
+    """One template text field with everything render needs already parsed."""
+
+    name: str
+    provider: Any                 # TemplateContextProvider (stateless: source key + label)
+    color: tuple[int, ...]        # RGB(A) parsed once
+    font_size: int
+    font_path: Path | None
+    style: str
+    align_h: str
+    align_v: str
+    x_offset: float               # fraction of canvas width (x_offset_pct / 100)
+    y_offset: float
+
+
+@dataclass(frozen=True, slots=True)
+class CompiledTemplate:
+    """Immutable render plan for one template payload.
+
+    Built once per template (``compile_template``) so per-photo rendering does not
+    re-normalize fields, rebuild text providers, re-parse colors or stat font files.
+    ``payload`` is the source payload, kept for naming and manifest hashing only.
+    """
+
+    name: str
+    payload: dict[str, Any]
+    fields: tuple[CompiledTemplateField, ...]
+    banner_fill: tuple[int, ...] | None
+    draw_banner_background: bool
+    banner_background_style: str
+    banner_gradient_height_pct: float
+    banner_gradient_top_color: str
+    banner_gradient_top_opacity_pct: float
+    banner_gradient_bottom_color: str
+    banner_gradient_bottom_opacity_pct: float
+    ratio: float | None
+    center_mode: str
+    max_long_edge: int
+    crop_padding_fill: str
+
+
+_COMPILED_TEMPLATE_CACHE_SIZE = 64
+_compiled_template_cache: OrderedDict[str, CompiledTemplate] = OrderedDict()
+_compiled_template_files: dict[str, tuple[int, int, CompiledTemplate]] = {}
+_compiled_template_lock = threading.Lock()
+
+
+def _compile_template_field(raw_field: dict[str, Any], index: int) -> CompiledTemplateField:
+    field = _normalize_template_field(raw_field, index)
+    text_source = field.get("text_source") or {}
+    provider = build_template_context_provider(
+        str(text_source.get("type") or TEMPLATE_SOURCE_FROM_FILE),
+        str(text_source.get("key") or ""),
+        display_label=str(field.get("name") or ""),
+    )
+    return CompiledTemplateField(
+        name=str(field.get("name") or ""),
+        provider=provider,
+        color=ImageColor.getrgb(safe_color(str(field.get("color") or "#FFFFFF"), "#FFFFFF")),
+        font_size=max(8, int(field.get("font_size") or 24)),
+        font_path=template_font_path_from_type(field.get("font_type")),
+        style=str(field.get("style") or "normal"),
+        align_h=str(field.get("align_horizontal") or field.get("align") or "left").lower(),
+        align_v=str(field.get("align_vertical") or "top").lower(),
+        x_offset=float(field.get("x_offset_pct") or 0.0) / 100.0,
+        y_offset=float(field.get("y_offset_pct") or 0.0) / 100.0,
+    )
+
+
+def _compile_template_uncached(payload: dict[str, Any], fallback_name: str) -> CompiledTemplate:
+    fields_raw = payload.get("fields") or []
+    if not isinstance(fields_raw, list):
+        fields_raw = []
+    fields = tuple(
+        _compile_template_field(raw_field, index)
+        for index, raw_field in enumerate(fields_raw)
+        if isinstance(raw_field, dict)
+    )
+    banner_fill = template_banner_fill_color(payload.get("banner_color"))
+    # 渐变色缺省时回退到 banner 颜色（与旧模板渲染结果保持一致）
+    _bc_fallback = banner_fill or _BANNER_GRADIENT_BOTTOM_COLOR_DEFAULT
+    try:
+        max_long_edge = max(0, int(payload.get("max_long_edge") or 0))
+    except Exception:
+        max_long_edge = 0
+    return CompiledTemplate(
+        name=str(payload.get("name") or fallback_name),
+        payload=payload,
+        fields=fields,
+        banner_fill=ImageColor.getrgb(banner_fill) if banner_fill else None,
+        draw_banner_background=_parse_bool_value(payload.get("draw_banner_background"), True),
+        banner_background_style=_normalize_banner_background_style(payload.get("banner_background_style")),
+        banner_gradient_height_pct=_normalize_banner_gradient_height_pct(payload.get("banner_gradient_height_pct")),
+        banner_gradient_top_color=_normalize_banner_gradient_color(
+            payload.get("banner_gradient_top_color"), _bc_fallback
+        ),
+        banner_gradient_top_opacity_pct=_normalize_banner_gradient_top_opacity_pct(
+            payload.get("banner_gradient_top_opacity_pct")
+        ),
+        banner_gradient_bottom_color=_normalize_banner_gradient_color(
+            payload.get("banner_gradient_bottom_color"), _bc_fallback
+        ),
+        banner_gradient_bottom_opacity_pct=_normalize_banner_gradient_bottom_opacity_pct(
+            payload.get("banner_gradient_bottom_opacity_pct")
+        ),
+        ratio=_parse_ratio_value(payload.get("ratio")),
+        center_mode=normalize_center_mode(payload.get("center_mode") or CENTER_MODE_IMAGE),
+        max_long_edge=max_long_edge,
+        crop_padding_fill=str(payload.get("crop_padding_fill") or _DEFAULT_TEMPLATE_CROP_PADDING_FILL),
+    )
+
+
+def compile_template(
+    template: dict[str, Any] | CompiledTemplate,
+    fallback_name: str = "default",
+) -> CompiledTemplate:
+    """Return the ``CompiledTemplate`` for a (normalized) template payload.
+
+    Results are memoized on the payload's JSON content, so callers that still
+    pass dicts (GUI, older call sites) pay the compile cost once per distinct
+    template; edited payloads simply produce a new key.
+    """
+    if isinstance(template, CompiledTemplate):
+        return template
+    try:
+        key = f"{fallback_name}\0" + json.dumps(template, ensure_ascii=False, sort_keys=True, default=str)
+    except Exception:
+        return _compile_template_uncached(template, fallback_name)
+    with _compiled_template_lock:
+        compiled = _compiled_template_cache.get(key)
+        if compiled is not None:
+            _compiled_template_cache.move_to_end(key)
+            return compiled
+    compiled = _compile_template_uncached(template, fallback_name)
+    with _compiled_template_lock:
+        _compiled_template_cache[key] = compiled
+        while len(_compiled_template_cache) > _COMPILED_TEMPLATE_CACHE_SIZE:
+            _compiled_template_cache.popitem(last=False)
+    return compiled
+
+
+def load_compiled_template(path: Path) -> CompiledTemplate:
+    """Load + compile a template file; reused until the file's mtime/size changes."""
+    stat = path.stat()
+    key = str(path.resolve(strict=False))
+    with _compiled_template_lock:
+        cached = _compiled_template_files.get(key)
+    if cached is not None and cached[0] == stat.st_mtime_ns and cached[1] == stat.st_size:
+        return cached[2]
+    compiled = compile_template(load_template_payload(path), fallback_name=path.stem)
+    with _compiled_template_lock:
+        _compiled_template_files[key] = (stat.st_mtime_ns, stat.st_size, compiled)
+    return compiled
+
+
+@dataclass(frozen=True, slots=True)
+class TemplateTextPlacement:
+    """One laid-out text field: what to draw, with which font, and where."""
+
+    name: str
+    text: str
+    font_path: str | None          # font requested by the template (None = system default)
+    font_file: str | None          # file actually loaded
+    font_size: int
+    style: str
+    color: tuple[int, ...]
+    x: int
+    y: int
+    rect: tuple[int, int, int, int]
+    fits: bool                     # False when no non-overlapping spot was found
+
+    def to_dict(self) -> dict[str, Any]:
+        return {
+            "name": self.name,
+            "text": self.text,
+            "font_path": self.font_path,
+            "font_file": self.font_file,
+            "font_size": self.font_size,
+            "style": self.style,
+            "color": list(self.color),
+            "x": self.x,
+            "y": self.y,
+            "rect": list(self.rect),
+            "fits": self.fits,
+        }
+
+
+@dataclass(frozen=True, slots=True)
+class TemplateOverlayLayout:
+    """Geometry of a template overlay on a canvas of ``canvas_size``; no pixels involved.
+
+    Depends only on the canvas size, the template and the field texts, so it can be
+    cached and reused while the underlying pixels change (video frames, previews).
+    """
+
+    template_name: str
+    canvas_size: tuple[int, int]
+    texts: tuple[TemplateTextPlacement, ...]
+    banner_rect: tuple[int, int, int, int] | None = None   # solid banner (ImageDraw coords, inclusive)
+    scrim_rect: tuple[int, int, int, int] | None = None    # bottom gradient
+
+    def to_dict(self) -> dict[str, Any]:
+        return {
+            "template": self.template_name,
+            "canvas_size": list(self.canvas_size),
+            "texts": [placement.to_dict() for placement in self.texts],
+            "banner_rect": list(self.banner_rect) if self.banner_rect is not None else None,
+            "scrim_rect": list(self.scrim_rect) if self.scrim_rect is not None else None,
+        }
+
+
+_LAYOUT_CACHE_SIZE = 256
+_layout_cache: OrderedDict[tuple[Any, ...], tuple[CompiledTemplate, TemplateOverlayLayout]] = OrderedDict()
+_layout_cache_lock = threading.Lock()
+
+
+def layout_template_overlay(
+    canvas_size: tuple[int, int],
     *,
     raw_metadata: dict[str, Any],
     metadata_context: dict[str, str],
     photo_info: PhotoInfo | None = None,
-    template_payload: dict[str, Any],
+    template_payload: dict[str, Any] | CompiledTemplate,
     auto_scale_font: bool = True,
     draw_banner: bool = True,
-    draw_text: bool = True,
-) -> Image.Image:
-    canvas = image.convert("RGBA")
-    draw = ImageDraw.Draw(canvas)
-    font_scale = _template_font_scale_for_canvas(canvas.width, canvas.height) if auto_scale_font else 1.0
-    occupied_boxes: list[tuple[int, int, int, int]] = []
-    text_gap = max(4, int(round(min(canvas.width, canvas.height) * 0.006)))
-    draw_commands: list[tuple[str, int, int, str, Any, str, tuple[int, int, int, int]]] = []
-    fields = template_payload.get("fields") or []
-    if not isinstance(fields, list):
-        fields = []
+) -> TemplateOverlayLayout:
+    """Resolve field texts, fit font sizes and place text/banner boxes for ``canvas_size``.
+
+    布局结果按 (模板, 画布尺寸, 字段文本) 缓存；同尺寸、同文字的照片/视频帧直接复用。
+    """
+    started = time.perf_counter()
+    template = compile_template(template_payload)
+    canvas_width, canvas_height = int(canvas_size[0]), int(canvas_size[1])
     source_file = raw_metadata.get("SourceFile") or raw_metadata.get("sourcefile") or "."
     render_photo_info = ensure_photo_info(photo_info or source_file, raw_metadata=raw_metadata)
-    for field_index, raw_field in enumerate(fields):
-        if not isinstance(raw_field, dict):
-            continue
-        field = _normalize_template_field(raw_field, field_index)
-        text_source = field.get("text_source") or {}
-        provider = build_template_context_provider(
-            str(text_source.get("type") or TEMPLATE_SOURCE_FROM_FILE),
-            str(text_source.get("key") or ""),
-            display_label=str(field.get("name") or ""),
-        )
-        text = _resolve_template_field_text(provider, render_photo_info)
+    texts = tuple(_resolve_template_field_text(field.provider, render_photo_info) for field in template.fields)
+    cache_key = (id(template), canvas_width, canvas_height, texts, bool(auto_scale_font), bool(draw_banner))
+    with _layout_cache_lock:
+        cached = _layout_cache.get(cache_key)
+        if cached is not None and cached[0] is template:
+            _layout_cache.move_to_end(cache_key)
+            profiling.record(profiling.STAGE_OVERLAY_LAYOUT, time.perf_counter() - started)
+            return cached[1]
+
+    # 排版阶段只量字，不需要整幅 RGBA 画布。
+    draw = ImageDraw.Draw(Image.new("RGBA", (1, 1)))
+    font_scale = _template_font_scale_for_canvas(canvas_width, canvas_height) if auto_scale_font else 1.0
+    occupied_boxes: list[tuple[int, int, int, int]] = []
+    text_gap = max(4, int(round(min(canvas_width, canvas_height) * 0.006)))
+    placements: list[TemplateTextPlacement] = []
+    for field, text in zip(template.fields, texts):
         if not text:
             continue
-        font_size_base = max(8, int(field.get("font_size") or 24))
-        color = safe_color(str(field.get("color") or "#FFFFFF"), "#FFFFFF")
-        align_h = str(field.get("align_horizontal") or field.get("align") or "left").lower()
-        align_v = str(field.get("align_vertical") or "top").lower()
-        x_offset = float(field.get("x_offset_pct") or 0.0) / 100.0
-        y_offset = float(field.get("y_offset_pct") or 0.0) / 100.0
-        field_font_path = template_font_path_from_type(field.get("font_type"))
-        scaled_size = max(8, min(320, int(round(font_size_base * font_scale))))
-        chosen_font = load_font(field_font_path, scaled_size)
-        chosen_x = 0
-        chosen_y = 0
-        chosen_rect = (0, 0, 1, 1)
-        for candidate_size in _iter_font_sizes_for_layout(scaled_size, minimum=8):
+        align_h = field.align_h
+        align_v = field.align_v
+        x_offset = field.x_offset
+        y_offset = field.y_offset
+        field_font_path = field.font_path
+        scaled_size = max(8, min(320, int(round(field.font_size * font_scale))))
+
+        def _place(candidate_size: int) -> tuple[int, Any, int, int, tuple[int, int, int, int], bool]:
             font = load_font(field_font_path, candidate_size)
             text_box = draw.textbbox((0, 0), text, font=font)
             text_width = max(1, text_box[2] - text_box[0])
             text_height = max(1, text_box[3] - text_box[1])
             base_x, base_y = _compute_template_text_position(
-                canvas_width=canvas.width,
-                canvas_height=canvas.height,
+                canvas_width=canvas_width,
+                canvas_height=canvas_height,
                 text_width=text_width,
                 text_height=text_height,
                 align_h=align_h,
@@ -796,86 +1075,146 @@ def render_template_overlay(
                 base_y=base_y,
                 text_width=text_width,
                 text_height=text_height,
-                canvas_width=canvas.width,
-                canvas_height=canvas.height,
+                canvas_width=canvas_width,
+                canvas_height=canvas_height,
                 align_h=align_h,
                 align_v=align_v,
                 occupied=occupied_boxes,
                 gap=text_gap,
             )
-            chosen_font = font
-            chosen_x = x
-            chosen_y = y
-            chosen_rect = rect
-            if non_overlap:
-                break
-        draw_commands.append(
-            (
-                text,
-                chosen_x,
-                chosen_y,
-                color,
-                chosen_font,
-                str(field.get("style") or "normal"),
-                chosen_rect,
+            return (candidate_size, font, x, y, rect, non_overlap)
+
+        chosen_size, chosen_font, chosen_x, chosen_y, chosen_rect, fits = _fit_font_size(
+            _iter_font_sizes_for_layout(scaled_size, minimum=8), _place
+        )
+        font_file = getattr(chosen_font, "path", None)
+        placements.append(
+            TemplateTextPlacement(
+                name=field.name,
+                text=text,
+                font_path=str(field_font_path) if field_font_path else None,
+                font_file=font_file if isinstance(font_file, str) else None,
+                font_size=chosen_size,
+                style=field.style,
+                color=tuple(field.color),
+                x=chosen_x,
+                y=chosen_y,
+                rect=chosen_rect,
+                fits=bool(fits),
             )
         )
         occupied_boxes.append(chosen_rect)
-    banner_fill = template_banner_fill_color(template_payload.get("banner_color"))
-    draw_banner_background = _parse_bool_value(template_payload.get("draw_banner_background"), True)
-    banner_background_style = _normalize_banner_background_style(template_payload.get("banner_background_style"))
-    banner_gradient_height_pct = _normalize_banner_gradient_height_pct(template_payload.get("banner_gradient_height_pct"))
-    banner_gradient_top_opacity_pct = _normalize_banner_gradient_top_opacity_pct(
-        template_payload.get("banner_gradient_top_opacity_pct")
-    )
-    banner_gradient_bottom_opacity_pct = _normalize_banner_gradient_bottom_opacity_pct(
-        template_payload.get("banner_gradient_bottom_opacity_pct")
-    )
-    _bc_fallback = banner_fill or _BANNER_GRADIENT_BOTTOM_COLOR_DEFAULT
-    banner_gradient_top_color = _normalize_banner_gradient_color(
-        template_payload.get("banner_gradient_top_color"), _bc_fallback
-    )
-    banner_gradient_bottom_color = _normalize_banner_gradient_color(
-        template_payload.get("banner_gradient_bottom_color"), _bc_fallback
-    )
-    if draw_banner and draw_banner_background and draw_commands:
-        if banner_background_style == _BANNER_BACKGROUND_STYLE_GRADIENT_BOTTOM:
+
+    scrim_rect: tuple[int, int, int, int] | None = None
+    banner_rect: tuple[int, int, int, int] | None = None
+    if draw_banner and template.draw_banner_background and placements:
+        if template.banner_background_style == _BANNER_BACKGROUND_STYLE_GRADIENT_BOTTOM:
             scrim_rect = _compute_template_bottom_gradient_rect(
-                canvas_width=canvas.width,
-                canvas_height=canvas.height,
-                height_pct=banner_gradient_height_pct,
+                canvas_width=canvas_width,
+                canvas_height=canvas_height,
+                height_pct=template.banner_gradient_height_pct,
             )
-            if scrim_rect is not None:
-                _draw_vertical_gradient_scrim(
-                    canvas,
-                    rect=scrim_rect,
-                    top_color=banner_gradient_top_color,
-                    top_opacity_pct=banner_gradient_top_opacity_pct,
-                    bottom_color=banner_gradient_bottom_color,
-                    bottom_opacity_pct=banner_gradient_bottom_opacity_pct,
-                )
-        elif banner_fill:
+        elif template.banner_fill:
             banner_rect = _compute_template_banner_rect(
-                text_boxes=[cmd[6] for cmd in draw_commands],
-                canvas_width=canvas.width,
-                canvas_height=canvas.height,
+                text_boxes=occupied_boxes,
+                canvas_width=canvas_width,
+                canvas_height=canvas_height,
                 top_padding=TEMPLATE_BANNER_TOP_PADDING_PX,
             )
-            if banner_rect is not None:
-                draw.rectangle(banner_rect, fill=banner_fill)
+    layout = TemplateOverlayLayout(
+        template_name=template.name,
+        canvas_size=(canvas_width, canvas_height),
+        texts=tuple(placements),
+        banner_rect=banner_rect,
+        scrim_rect=scrim_rect,
+    )
+    with _layout_cache_lock:
+        _layout_cache[cache_key] = (template, layout)
+        while len(_layout_cache) > _LAYOUT_CACHE_SIZE:
+            _layout_cache.popitem(last=False)
+    profiling.record(profiling.STAGE_OVERLAY_LAYOUT, time.perf_counter() - started)
+    return layout
+
+
+def rasterize_template_overlay(
+    image: Image.Image,
+    layout: TemplateOverlayLayout,
+    *,
+    template_payload: dict[str, Any] | CompiledTemplate,
+    draw_text: bool = True,
+) -> Image.Image:
+    """Paint ``layout`` onto a copy of ``image`` (RGB result); ``template_payload`` supplies banner colors."""
+    started = time.perf_counter()
+    template = compile_template(template_payload)
+    canvas_width, canvas_height = image.size
+    scrim_rect = layout.scrim_rect
+    banner_rect = layout.banner_rect
+    # 只在横幅和文字覆盖的区域做 RGBA 合成，再贴回 RGB 结果；其余像素不经过 RGBA 往返。
+    dirty_rects = [scrim_rect] if scrim_rect is not None else []
+    if banner_rect is not None:
+        # ImageDraw.rectangle 的右/下边界是闭区间。
+        dirty_rects.append((banner_rect[0], banner_rect[1], banner_rect[2] + 1, banner_rect[3] + 1))
     if draw_text:
-        for text, x, y, color, font, style, _rect in draw_commands:
-            _draw_styled_text(
-                canvas,
-                draw,
-                text,
-                x=x,
-                y=y,
-                color=color,
-                font=font,
-                style=style,
+        dirty_rects.extend(_styled_text_layer_rect(placement.rect, placement.style) for placement in layout.texts)
+    region = _union_rect_in_canvas(dirty_rects, canvas_width, canvas_height)
+    rendered = image.copy() if image.mode == "RGB" else image.convert("RGB")
+    if region is not None:
+        region_left, region_top = region[0], region[1]
+        patch = image.crop(region)
+        if patch.mode != "RGBA":
+            patch = patch.convert("RGBA")
+        patch_draw = ImageDraw.Draw(patch)
+        if scrim_rect is not None:
+            _draw_vertical_gradient_scrim(
+                patch,
+                rect=_offset_rect(scrim_rect, -region_left, -region_top),
+                top_color=template.banner_gradient_top_color,
+                top_opacity_pct=template.banner_gradient_top_opacity_pct,
+                bottom_color=template.banner_gradient_bottom_color,
+                bottom_opacity_pct=template.banner_gradient_bottom_opacity_pct,
             )
-    return canvas.convert("RGB")
+        if banner_rect is not None and template.banner_fill:
+            patch_draw.rectangle(_offset_rect(banner_rect, -region_left, -region_top), fill=template.banner_fill)
+        if draw_text:
+            for placement in layout.texts:
+                _draw_styled_text(
+                    patch,
+                    patch_draw,
+                    placement.text,
+                    x=placement.x - region_left,
+                    y=placement.y - region_top,
+                    color=placement.color,
+                    font=load_font(placement.font_path, placement.font_size),
+                    style=placement.style,
+                )
+        rendered.paste(patch.convert("RGB"), (region_left, region_top))
+    profiling.record(profiling.STAGE_OVERLAY_RASTER, time.perf_counter() - started)
+    return rendered
+
+
+def render_template_overlay(
+    image: Image.Image,
+    *,
+    raw_metadata: dict[str, Any],
+    metadata_context: dict[str, str],
+    photo_info: PhotoInfo | None = None,
+    template_payload: dict[str, Any] | CompiledTemplate,
+    auto_scale_font: bool = True,
+    draw_banner: bool = True,
+    draw_text: bool = True,
+) -> Image.Image:
+    """``layout_template_overlay`` for the image size, then ``rasterize_template_overlay``."""
+    template = compile_template(template_payload)
+    layout = layout_template_overlay(
+        image.size,
+        raw_metadata=raw_metadata,
+        metadata_context=metadata_context,
+        photo_info=photo_info,
+        template_payload=template,
+        auto_scale_font=auto_scale_font,
+        draw_banner=draw_banner,
+    )
+    return rasterize_template_overlay(image, layout, template_payload=template, draw_text=draw_text)
 
 
 def default_template_payload(name: str = "default") -> dict[str, Any]:
@@ -904,7 +1243,7 @@ def render_template_overlay_in_crop_region(
     raw_metadata: dict[str, Any],
     metadata_context: dict[str, str],
     photo_info: PhotoInfo | None = None,
-    template_payload: dict[str, Any],
+    template_payload: dict[str, Any] | CompiledTemplate,
     crop_box: tuple[float, float, float, float] | None,
     draw_banner: bool = True,
     draw_text: bool = True,
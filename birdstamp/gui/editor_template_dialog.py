@@ -2095,6 +2095,7 @@ class TemplateManagerDialog(QDialog):
                 inner_bottom=inner_bottom,
                 inner_left=inner_left,
                 inner_right=inner_right,
+                bird_box_provider=lambda _image: self._preview_source_bird_box(),
             )
             pad_top, pad_bottom, pad_left, pad_right = outer_pad
             if pad_top or pad_bottom or pad_left or pad_right:
@@ -0,0 +1,176 @@
+"""Incremental render manifest stored next to the rendered outputs.
+
+Each output file name maps to the inputs that produced it: the source
+signature (path, size, mtime_ns), a hash of the template payload, a hash of
+the effective crop/size/format/quality options and a hash of the raw
+metadata (minus the file-system tags ExifTool reports, which change on every
+read and are covered by the source signature anyway). A rerun only skips an output whose record is identical and whose
+file still exists; anything else is rendered again.
+"""
+from __future__ import annotations
+
+import hashlib
+import json
+import logging
+import os
+from pathlib import Path
+from typing import Any
+
+_log = logging.getLogger(__name__)
+
+MANIFEST_FILENAME = ".birdstamp-manifest.json"
+MANIFEST_VERSION = 2
+# ExifTool 的文件系统伪标签（访问时间、inode 变更时间、权限等）随读取而变化，
+# 路径/大小/mtime 已由 source_signature 覆盖，不参与元数据哈希。
+_VOLATILE_METADATA_GROUPS = frozenset({"file", "system"})
+_VOLATILE_METADATA_KEYS = frozenset(
+    {
+        "sourcefile",
+        "directory",
+        "filename",
+        "filesize",
+        "filemodifydate",
+        "fileaccessdate",
+        "fileinodechangedate",
+        "filecreatedate",
+        "filepermissions",
+        "fileattributes",
+    }
+)
+
+
+def hash_payload(value: Any) -> str:
+    """Stable short hash of a JSON-like value (dict key order does not matter)."""
+    encoded = json.dumps(value, sort_keys=True, ensure_ascii=False, separators=(",", ":"), default=str)
+    return hashlib.sha1(encoded.encode("utf-8")).hexdigest()
+
+
+def source_signature(path: Path) -> dict[str, Any]:
+    stat = os.stat(path)
+    return {
+        "path": str(Path(path).resolve(strict=False)),
+        "size": int(stat.st_size),
+        "mtime_ns": int(stat.st_mtime_ns),
+    }
+
+
+def _is_volatile_metadata_key(key: Any) -> bool:
+    text = str(key).lower()
+    group, sep, name = text.rpartition(":")
+    if sep and group.split(":")[0] in _VOLATILE_METADATA_GROUPS:
+        return True
+    return (name if sep else text) in _VOLATILE_METADATA_KEYS
+
+
+def stable_metadata(raw_metadata: dict[str, Any] | None) -> dict[str, Any]:
+    """``raw_metadata`` without ``SourceFile`` and the ``File:*`` / ``System:*`` file-system tags."""
+    return {key: value for key, value in (raw_metadata or {}).items() if not _is_volatile_metadata_key(key)}
+
+
+def build_record(
+    source: Path,
+    *,
+    template_hash: str,
+    options_hash: str,
+    raw_metadata: dict[str, Any] | None,
+) -> dict[str, Any]:
+    """Manifest record for one output; compare records with ``==``."""
+    return {
+        "source": source_signature(source),
+        "template": template_hash,
+        "options": options_hash,
+        "metadata": hash_payload(stable_metadata(raw_metadata)),
+    }
+
+
+def is_up_to_date(
+    entries: dict[str, dict[str, Any]], out_dir: Path, output_name: str, record: dict[str, Any]
+) -> bool:
+    """True when ``entries`` holds exactly ``record`` for ``output_name`` and the output file exists.
+
+    ``entries`` may be a ``RenderManifest.snapshot()`` handed to a render worker.
+    """
+    return entries.get(output_name) == record and (Path(out_dir) / output_name).is_file()
+
+
+class RenderManifest:
+    """JSON manifest in the output directory, keyed by output file name."""
+
+    def __init__(self, out_dir: Path, entries: dict[str, dict[str, Any]] | None = None) -> None:
+        self.out_dir = Path(out_dir)
+        self.path = self.out_dir / MANIFEST_FILENAME
+        self.entries: dict[str, dict[str, Any]] = dict(entries or {})
+        self._dirty = False
+
+    @classmethod
+    def load(cls, out_dir: Path) -> "RenderManifest":
+        manifest = cls(out_dir)
+        if not manifest.path.is_file():
+            return manifest
+        try:
+            data = json.loads(manifest.path.read_text(encoding="utf-8"))
+        except Exception as exc:
+            _log.warning("render manifest unreadable, starting fresh: %s (%s)", manifest.path, exc)
+            return manifest
+        if not isinstance(data, dict) or data.get("version") != MANIFEST_VERSION:
+            _log.info("render manifest version changed, starting fresh: %s", manifest.path)
+            return manifest
+        entries = data.get("entries")
+        if isinstance(entries, dict):
+            manifest.entries = {str(k): v for k, v in entries.items() if isinstance(v, dict)}
+        return manifest
+
+    def key_for(self, output_path: Path) -> str:
+        try:
+            return Path(output_path).relative_to(self.out_dir).as_posix()
+        except ValueError:
+            return Path(output_path).name
+
+    def snapshot(self) -> dict[str, dict[str, Any]]:
+        """Plain dict copy handed to render workers."""
+        return dict(self.entries)
+
+    def is_up_to_date(self, output_name: str, record: dict[str, Any]) -> bool:
+        return is_up_to_date(self.entries, self.out_dir, output_name, record)
+
+    def update(self, output_name: str, record: dict[str, Any]) -> None:
+        if self.entries.get(output_name) != record:
+            self.entries[output_name] = record
+            self._dirty = True
+
+    def discard(self, output_name: str) -> None:
+        if self.entries.pop(output_name, None) is not None:
+            self._dirty = True
+
+    @property
+    def dirty(self) -> bool:
+        return self._dirty
+
+    def save(self) -> None:
+        """Write atomically (temp file + ``os.replace``) so an interrupted run never leaves half a manifest."""
+        if not self._dirty:
+            return
+        self.out_dir.mkdir(parents=True, exist_ok=True)
+        payload = {"version": MANIFEST_VERSION, "entries": self.entries}
+        temp_path = self.path.with_name(f"{self.path.name}.{os.getpid()}.tmp")
+        try:
+            temp_path.write_text(json.dumps(payload, ensure_ascii=False, sort_keys=True), encoding="utf-8")
+            os.replace(temp_path, self.path)
+        finally:
+            if temp_path.exists():
+                try:
+                    temp_path.unlink()
+                except OSError:
+                    pass
+        self._dirty = False
+
+
+__all__ = [
+    "MANIFEST_FILENAME",
+    "RenderManifest",
+    "build_record",
+    "hash_payload",
+    "is_up_to_date",
+    "source_signature",
+    "stable_metadata",
+]
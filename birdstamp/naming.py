@@ -31,6 +31,7 @@ def build_output_name(
     meta: NormalizedMetadata,
     extension: str,
     template_name: str = "banner",
+    variant: str = "",
 ) -> str:
     ext = extension.lower().lstrip(".")
     capture = meta.capture_dt.strftime("%Y%m%d_%H%M") if meta.capture_dt else "unknown_date"
@@ -42,6 +43,7 @@ def build_output_name(
         "bird": sanitize_token(meta.bird),
         "location": sanitize_token(meta.location),
         "template": sanitize_token(template_name, fallback="banner"),
+        "variant": sanitize_token(variant, fallback=sanitize_token(template_name, fallback="banner")),
         "ext": ext,
     }
     try:
@@ -0,0 +1,286 @@
+"""Lightweight per-stage timing, memory sampling and JSONL run reports.
+
+A ``StageTimer`` collects *exclusive* seconds per stage name: time spent in a
+nested span is not counted again in the enclosing one, so the stages of one
+file add up to (roughly) its total. Library code marks stages with the
+module-level ``span()``/``record()`` helpers, which write to the timer
+activated on the current thread and cost almost nothing when none is active.
+"""
+from __future__ import annotations
+
+import json
+import sys
+import threading
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, Callable, Iterable, Iterator, TextIO
+
+# Stage names used by the CLI, video export and GUI render paths.
+STAGE_DISCOVER = "discover"
+STAGE_METADATA = "metadata"
+STAGE_DECODE = "decode"
+STAGE_CROP_PLAN = "crop_plan"
+STAGE_DETECTION = "detection"
+STAGE_OVERLAY_LAYOUT = "overlay_layout"
+STAGE_OVERLAY_RASTER = "overlay_raster"
+STAGE_ENCODE = "encode"
+STAGE_WRITE = "write"
+
+_PERCENTILES = (("p50", 0.50), ("p95", 0.95), ("p99", 0.99))
+_local = threading.local()
+
+
+class _Span:
+    __slots__ = ("_timer", "_name", "_start", "_child")
+
+    def __init__(self, timer: "StageTimer", name: str) -> None:
+        self._timer = timer
+        self._name = name
+        self._start = 0.0
+        self._child = 0.0
+
+    def __enter__(self) -> "_Span":
+        self._timer._stack.append(self)
+        self._start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info: object) -> None:
+        elapsed = time.perf_counter() - self._start
+        stack = self._timer._stack
+        if stack and stack[-1] is self:
+            stack.pop()
+        self._timer._add(self._name, elapsed - self._child)
+        if stack:
+            stack[-1]._child += elapsed
+
+
+class StageTimer:
+    """Exclusive seconds per stage for one unit of work (a file, a frame)."""
+
+    __slots__ = ("spans", "_stack")
+
+    def __init__(self) -> None:
+        self.spans: dict[str, float] = {}
+        self._stack: list[_Span] = []
+
+    def span(self, name: str) -> _Span:
+        return _Span(self, name)
+
+    def record(self, name: str, seconds: float) -> None:
+        """Add an already measured duration (counts as a child of the open span)."""
+        self._add(name, seconds)
+        if self._stack:
+            self._stack[-1]._child += seconds
+
+    def _add(self, name: str, seconds: float) -> None:
+        self.spans[name] = self.spans.get(name, 0.0) + max(0.0, seconds)
+
+
+class _NullSpan:
+    __slots__ = ()
+
+    def __enter__(self) -> "_NullSpan":
+        return self
+
+    def __exit__(self, *exc_info: object) -> None:
+        return None
+
+
+_NULL_SPAN = _NullSpan()
+
+
+def active_timer() -> StageTimer | None:
+    return getattr(_local, "timer", None)
+
+
+@contextmanager
+def activate(timer: StageTimer | None) -> Iterator[StageTimer | None]:
+    """Route ``span()``/``record()`` calls on this thread to ``timer``."""
+    previous = getattr(_local, "timer", None)
+    _local.timer = timer
+    try:
+        yield timer
+    finally:
+        _local.timer = previous
+
+
+def span(name: str) -> _Span | _NullSpan:
+    timer = getattr(_local, "timer", None)
+    return _NULL_SPAN if timer is None else _Span(timer, name)
+
+
+def record(name: str, seconds: float) -> None:
+    timer = getattr(_local, "timer", None)
+    if timer is not None:
+        timer.record(name, seconds)
+
+
+def peak_rss_mb() -> float | None:
+    """Peak resident set size of this process in MiB (None when unavailable)."""
+    try:
+        import resource
+
+        peak = float(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss)
+        # Linux reports KiB, macOS bytes.
+        return round(peak / (1024.0 * 1024.0) if sys.platform == "darwin" else peak / 1024.0, 1)
+    except Exception:
+        pass
+    try:
+        import psutil  # optional; Windows has no ``resource`` module
+
+        info = psutil.Process().memory_info()
+        peak = getattr(info, "peak_wset", None) or info.rss
+        return round(float(peak) / (1024.0 * 1024.0), 1)
+    except Exception:
+        return None
+
+
+def percentile(sorted_values: list[float], q: float) -> float:
+    """Nearest-rank percentile of an already sorted, non-empty list."""
+    index = min(len(sorted_values) - 1, max(0, int(round(q * (len(sorted_values) - 1)))))
+    return sorted_values[index]
+
+
+class StageStats:
+    """Thread-safe aggregate of many ``StageTimer.spans`` dicts."""
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._samples: dict[str, list[float]] = {}
+
+    def add(self, spans: dict[str, float]) -> None:
+        with self._lock:
+            for name, seconds in spans.items():
+                self._samples.setdefault(name, []).append(float(seconds))
+
+    def add_stage(self, name: str, seconds: float) -> None:
+        self.add({name: seconds})
+
+    def summary(self) -> dict[str, dict[str, float]]:
+        with self._lock:
+            samples = {name: sorted(values) for name, values in self._samples.items()}
+        result: dict[str, dict[str, float]] = {}
+        for name, values in samples.items():
+            total = sum(values)
+            entry = {
+                "count": len(values),
+                "total": round(total, 6),
+                "mean": round(total / len(values), 6),
+            }
+            for label, q in _PERCENTILES:
+                entry[label] = round(percentile(values, q), 6)
+            entry["max"] = round(values[-1], 6)
+            result[name] = entry
+        return result
+
+    def format_line(self) -> str:
+        """Compact ``stage=total(p95)`` text for log lines."""
+        parts = [
+            f"{name}={entry['total']:.2f}s(p95 {entry['p95'] * 1000.0:.0f}ms)"
+            for name, entry in sorted(self.summary().items(), key=lambda item: -item[1]["total"])
+        ]
+        return " ".join(parts) or "-"
+
+
+class RunReport:
+    """``--report run.jsonl`` writer: one JSON line per result, then a summary line."""
+
+    def __init__(self, path: Path) -> None:
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._fh: TextIO | None = self.path.open("w", encoding="utf-8")
+        self._started = time.perf_counter()
+        self.stages = StageStats()
+        self.run_stages = StageStats()
+        self._status: dict[str, int] = {}
+        self._elapsed: list[float] = []
+        self._megapixels = 0.0
+        self._peak_rss: float | None = None
+
+    def add_stage(self, name: str, seconds: float) -> None:
+        """Run-level time not attributable to one file (discovery, batched metadata)."""
+        self.run_stages.add_stage(name, seconds)
+
+    def write_result(self, payload: dict[str, Any]) -> None:
+        status = str(payload.get("status") or "unknown")
+        self._status[status] = self._status.get(status, 0) + 1
+        timings = payload.get("timings") or {}
+        if status == "ok":
+            self._elapsed.append(float(payload.get("elapsed") or 0.0))
+            self.stages.add(timings)
+        self._megapixels += float(payload.get("megapixels") or 0.0)
+        rss = payload.get("peak_rss_mb")
+        if rss is not None:
+            self._peak_rss = max(self._peak_rss or 0.0, float(rss))
+        self._write({"type": "file", **payload})
+
+    def close(self, extra: dict[str, Any] | None = None) -> dict[str, Any]:
+        """Write the aggregate summary line and close the file; safe to call twice."""
+        if self._fh is None:
+            return {}
+        wall = time.perf_counter() - self._started
+        main_rss = peak_rss_mb()
+        peak = max(v for v in (self._peak_rss, main_rss, 0.0) if v is not None)
+        elapsed = sorted(self._elapsed)
+        summary: dict[str, Any] = {
+            "type": "summary",
+            "results": sum(self._status.values()),
+            "status": dict(self._status),
+            "wall_seconds": round(wall, 3),
+            "outputs_per_second": round(self._status.get("ok", 0) / wall, 3) if wall > 0 else None,
+            "megapixels": round(self._megapixels, 2),
+            "megapixels_per_second": round(self._megapixels / wall, 2) if wall > 0 else None,
+            "peak_rss_mb": peak or None,
+            "elapsed": {label: round(percentile(elapsed, q), 4) for label, q in _PERCENTILES} if elapsed else {},
+            "stages": self.stages.summary(),
+            "run_stages": self.run_stages.summary(),
+        }
+        if extra:
+            summary.update(extra)
+        self._write(summary)
+        self._fh.close()
+        self._fh = None
+        return summary
+
+    def _write(self, payload: dict[str, Any]) -> None:
+        if self._fh is not None:
+            self._fh.write(json.dumps(payload, ensure_ascii=False, default=str) + "\n")
+            self._fh.flush()
+
+
+def timed_iter(iterable: Iterable[Any], on_time: Callable[[float], None]) -> Iterator[Any]:
+    """Yield from ``iterable``, reporting the seconds spent producing each item to ``on_time``."""
+    iterator = iter(iterable)
+    while True:
+        t0 = time.perf_counter()
+        try:
+            item = next(iterator)
+        except StopIteration:
+            on_time(time.perf_counter() - t0)
+            return
+        on_time(time.perf_counter() - t0)
+        yield item
+
+
+__all__ = [
+    "RunReport",
+    "STAGE_CROP_PLAN",
+    "STAGE_DECODE",
+    "STAGE_DETECTION",
+    "STAGE_DISCOVER",
+    "STAGE_ENCODE",
+    "STAGE_METADATA",
+    "STAGE_OVERLAY_LAYOUT",
+    "STAGE_OVERLAY_RASTER",
+    "STAGE_WRITE",
+    "StageStats",
+    "StageTimer",
+    "activate",
+    "active_timer",
+    "peak_rss_mb",
+    "percentile",
+    "record",
+    "span",
+    "timed_iter",
+]
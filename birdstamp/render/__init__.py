@@ -1,3 +1,9 @@
-from birdstamp.render.typography import load_font, list_available_font_paths
+from birdstamp.render.typography import (
+    TextMeasurer,
+    clear_font_cache,
+    get_text_measurer,
+    list_available_font_paths,
+    load_font,
+)
 
-__all__ = ["load_font", "list_available_font_paths"]
+__all__ = ["TextMeasurer", "clear_font_cache", "get_text_measurer", "load_font", "list_available_font_paths"]
@@ -0,0 +1,242 @@
+"""Free-slot search for overlay text boxes.
+
+``find_text_slot`` places a text box near its anchored position without
+overlapping the boxes already placed. Candidate positions are the anchor
+shifted by a fixed ladder of x/y offsets, visited y-major; the first
+overlap-free candidate wins, otherwise the one with the lowest
+``overlaps * 100000 + |dx| + |dy|`` score.
+
+``find_text_slot_reference`` is that search written out literally (every
+candidate against every box). ``find_text_slot`` returns the same result but,
+per candidate column, sweeps the occupied boxes into merged blocked y-ranges
+and maps each free range straight onto the offset ladder, so the cost depends
+on the number of boxes instead of the canvas height.
+"""
+from __future__ import annotations
+
+import math
+from bisect import bisect_left, bisect_right
+from typing import Sequence
+
+Box = tuple[int, int, int, int]
+Slot = tuple[int, int, Box, bool]
+
+_OVERLAP_WEIGHT = 100000
+
+
+def boxes_overlap(a: Box, b: Box, *, gap: int) -> bool:
+    return not (
+        a[2] + gap <= b[0]
+        or b[2] + gap <= a[0]
+        or a[3] + gap <= b[1]
+        or b[3] + gap <= a[1]
+    )
+
+
+class _Ladder:
+    """Offsets ``[0, ...runs]``: each run is ``sign * step * k`` for k = 1..count at
+    list index ``start + stride * (k - 1)``."""
+
+    __slots__ = ("step", "runs")
+
+    def __init__(self, step: int, runs: tuple[tuple[int, int, int, int], ...]) -> None:
+        self.step = step
+        self.runs = runs
+
+    def values(self) -> list[int]:
+        size = 1 + sum(count for _sign, count, _start, _stride in self.runs)
+        values = [0] * size
+        for sign, count, start, stride in self.runs:
+            for k in range(1, count + 1):
+                values[start + stride * (k - 1)] = sign * self.step * k
+        return values
+
+    def first_index_in(self, low: float, high: float) -> int | None:
+        """Smallest list index whose offset lies in ``[low, high]``."""
+        best: int | None = 0 if low <= 0 <= high else None
+        step = self.step
+        for sign, count, start, stride in self.runs:
+            if sign > 0:
+                k_min = 1 if low == -math.inf else max(1, -((-int(low)) // step))
+                k_max = count if high == math.inf else min(count, int(high) // step)
+            else:
+                k_min = 1 if high == math.inf else max(1, -(int(high) // step))
+                k_max = count if low == -math.inf else min(count, (-int(low)) // step)
+            if k_min <= k_max:
+                index = start + stride * (k_min - 1)
+                if best is None or index < best:
+                    best = index
+        return best
+
+
+def _ladders(
+    *,
+    text_width: int,
+    text_height: int,
+    canvas_width: int,
+    canvas_height: int,
+    align_h: str,
+    align_v: str,
+) -> tuple[_Ladder, _Ladder]:
+    step_y = max(4, int(round(text_height * 0.36)))
+    step_x = max(6, int(round(text_width * 0.10)))
+    y_steps = max(8, (canvas_height // step_y) + 3)
+    y_back = max(3, y_steps // 2)
+    if align_v == "bottom":
+        y_runs = ((-1, y_steps, 1, 1), (1, y_back, y_steps + 1, 1))
+    elif align_v == "top":
+        y_runs = ((1, y_steps, 1, 1), (-1, y_back, y_steps + 1, 1))
+    else:
+        y_runs = ((1, y_steps, 1, 2), (-1, y_steps, 2, 2))
+    x_span = max(2, min(8, canvas_width // max(1, step_x)))
+    x_back = max(2, x_span // 2)
+    if align_h == "left":
+        x_runs = ((1, x_span, 1, 1), (-1, x_back, x_span + 1, 1))
+    elif align_h == "right":
+        x_runs = ((-1, x_span, 1, 1), (1, x_back, x_span + 1, 1))
+    else:
+        x_runs = ((1, x_span, 1, 2), (-1, x_span, 2, 2))
+    return _Ladder(step_y, y_runs), _Ladder(step_x, x_runs)
+
+
+def find_text_slot_reference(
+    *,
+    base_x: int,
+    base_y: int,
+    text_width: int,
+    text_height: int,
+    canvas_width: int,
+    canvas_height: int,
+    align_h: str,
+    align_v: str,
+    occupied: Sequence[Box],
+    gap: int,
+) -> Slot:
+    """Exhaustive search: every candidate offset against every occupied box."""
+    max_x = max(0, canvas_width - text_width)
+    max_y = max(0, canvas_height - text_height)
+    origin_x = max(0, min(max_x, base_x))
+    origin_y = max(0, min(max_y, base_y))
+    y_ladder, x_ladder = _ladders(
+        text_width=text_width,
+        text_height=text_height,
+        canvas_width=canvas_width,
+        canvas_height=canvas_height,
+        align_h=align_h,
+        align_v=align_v,
+    )
+    best: tuple[int, int, Box, int] | None = None
+    for dy in y_ladder.values():
+        for dx in x_ladder.values():
+            x = max(0, min(max_x, origin_x + dx))
+            y = max(0, min(max_y, origin_y + dy))
+            rect = (x, y, x + text_width, y + text_height)
+            overlaps = sum(1 for existing in occupied if boxes_overlap(rect, existing, gap=gap))
+            if overlaps == 0:
+                return (x, y, rect, True)
+            score = overlaps * _OVERLAP_WEIGHT + abs(dx) + abs(dy)
+            if best is None or score < best[3]:
+                best = (x, y, rect, score)
+    if best is not None:
+        return (best[0], best[1], best[2], False)
+    rect = (origin_x, origin_y, origin_x + text_width, origin_y + text_height)
+    return (origin_x, origin_y, rect, False)
+
+
+def _free_ranges(blocked: list[tuple[int, int]], max_y: int) -> list[tuple[int, int]]:
+    """Complement of the (inclusive, integer) ``blocked`` ranges within ``[0, max_y]``."""
+    free: list[tuple[int, int]] = []
+    cursor = 0
+    for low, high in sorted(blocked):
+        if high < cursor:
+            continue
+        if low > cursor:
+            free.append((cursor, min(low - 1, max_y)))
+        cursor = max(cursor, high + 1)
+        if cursor > max_y:
+            return free
+    if cursor <= max_y:
+        free.append((cursor, max_y))
+    return free
+
+
+def find_text_slot(
+    *,
+    base_x: int,
+    base_y: int,
+    text_width: int,
+    text_height: int,
+    canvas_width: int,
+    canvas_height: int,
+    align_h: str,
+    align_v: str,
+    occupied: Sequence[Box],
+    gap: int,
+) -> Slot:
+    """Same result as ``find_text_slot_reference`` via per-column free y-ranges."""
+    max_x = max(0, canvas_width - text_width)
+    max_y = max(0, canvas_height - text_height)
+    origin_x = max(0, min(max_x, base_x))
+    origin_y = max(0, min(max_y, base_y))
+    if not occupied:
+        rect = (origin_x, origin_y, origin_x + text_width, origin_y + text_height)
+        return (origin_x, origin_y, rect, True)
+    y_ladder, x_ladder = _ladders(
+        text_width=text_width,
+        text_height=text_height,
+        canvas_width=canvas_width,
+        canvas_height=canvas_height,
+        align_h=align_h,
+        align_v=align_v,
+    )
+    x_offsets = x_ladder.values()
+    # A candidate at (x, y) overlaps box b (with gap) iff
+    #   b0 - w - gap < x < b2 + gap  and  b1 - h - gap < y < b3 + gap.
+    x_bounds = [(b[0] - text_width - gap, b[2] + gap) for b in occupied]
+    y_bounds = [(b[1] - text_height - gap, b[3] + gap) for b in occupied]
+
+    columns: list[tuple[int, list[tuple[int, int]]]] = []
+    best_i: int | None = None
+    best_j = 0
+    for j, dx in enumerate(x_offsets):
+        x = max(0, min(max_x, origin_x + dx))
+        blocked = [
+            (y_low + 1, y_high - 1)
+            for (x_low, x_high), (y_low, y_high) in zip(x_bounds, y_bounds)
+            if x_low < x < x_high and y_low + 1 <= y_high - 1
+        ]
+        columns.append((x, blocked))
+        for free_low, free_high in _free_ranges(blocked, max_y):
+            # clamp(origin_y + dy) lands in [free_low, free_high]
+            low = -math.inf if free_low <= 0 else free_low - origin_y
+            high = math.inf if free_high >= max_y else free_high - origin_y
+            i = y_ladder.first_index_in(low, high)
+            if i is not None and (best_i is None or (i, j) < (best_i, best_j)):
+                best_i, best_j = i, j
+    if best_i is not None:
+        x = columns[best_j][0]
+        y = max(0, min(max_y, origin_y + y_ladder.values()[best_i]))
+        return (x, y, (x, y, x + text_width, y + text_height), True)
+
+    # Nothing free: lowest score, counting overlaps per column by bisection.
+    counters = []
+    for x, blocked in columns:
+        counters.append((sorted(low for low, _high in blocked), sorted(high for _low, high in blocked)))
+    best: tuple[int, int, int] | None = None
+    for dy in y_ladder.values():
+        y = max(0, min(max_y, origin_y + dy))
+        for j, dx in enumerate(x_offsets):
+            lows, highs = counters[j]
+            overlaps = bisect_right(lows, y) - bisect_left(highs, y)
+            score = overlaps * _OVERLAP_WEIGHT + abs(dx) + abs(dy)
+            if best is None or score < best[2]:
+                best = (columns[j][0], y, score)
+    x, y = best[0], best[1]
+    return (x, y, (x, y, x + text_width, y + text_height), False)
+
+
+__all__ = [
+    "boxes_overlap",
+    "find_text_slot",
+    "find_text_slot_reference",
+]
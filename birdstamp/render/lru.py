@@ -0,0 +1,94 @@
+"""Thread-safe LRU cache bounded by total payload bytes.
+
+Used for rendered pixel data (gradient strips, text sprites) where entry sizes
+vary by orders of magnitude, so an entry-count limit would either waste memory
+on a 45MP batch or thrash on small previews.
+"""
+from __future__ import annotations
+
+import threading
+from collections import OrderedDict
+from typing import Any, Callable, Generic, Hashable, TypeVar
+
+V = TypeVar("V")
+
+
+class ByteLRUCache(Generic[V]):
+    """``key -> value`` with least-recently-used eviction once ``max_bytes`` is exceeded.
+
+    Values larger than ``max_bytes`` are returned to the caller but never stored.
+    """
+
+    def __init__(self, max_bytes: int) -> None:
+        self.max_bytes = max(0, int(max_bytes))
+        self._entries: OrderedDict[Hashable, tuple[V, int]] = OrderedDict()
+        self._lock = threading.Lock()
+        self._bytes = 0
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: Hashable) -> V | None:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[0]
+
+    def put(self, key: Hashable, value: V, nbytes: int) -> V:
+        nbytes = max(0, int(nbytes))
+        if nbytes > self.max_bytes:
+            return value
+        with self._lock:
+            previous = self._entries.pop(key, None)
+            if previous is not None:
+                self._bytes -= previous[1]
+            self._entries[key] = (value, nbytes)
+            self._bytes += nbytes
+            while self._bytes > self.max_bytes and self._entries:
+                _key, (_value, size) = self._entries.popitem(last=False)
+                self._bytes -= size
+        return value
+
+    def get_or_create(self, key: Hashable, factory: Callable[[], V], sizeof: Callable[[V], int]) -> V:
+        """Cached value for ``key``; builds it with ``factory`` on a miss (outside the lock)."""
+        value = self.get(key)
+        if value is None:
+            value = factory()
+            self.put(key, value, sizeof(value))
+        return value
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+            self.hits = 0
+            self.misses = 0
+
+    @property
+    def current_bytes(self) -> int:
+        return self._bytes
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def stats(self) -> dict[str, Any]:
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+            }
+
+
+def image_nbytes(image: Any) -> int:
+    """Approximate pixel buffer size of a PIL image."""
+    bands = len(image.getbands())
+    return int(image.width) * int(image.height) * max(1, bands)
+
+
+__all__ = ["ByteLRUCache", "image_nbytes"]
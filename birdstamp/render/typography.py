@@ -2,8 +2,12 @@ from __future__ import annotations
 
 import os
 import platform
+import threading
+import weakref
+from collections import OrderedDict
 from functools import lru_cache
 from pathlib import Path
+from typing import Any
 
 from PIL import ImageDraw, ImageFont
 
@@ -73,20 +77,54 @@ def _system_font_directories() -> list[Path]:
     return deduped
 
 
-def load_font(font_path: Path | None, size: int) -> ImageFont.ImageFont:
+# Loaded FreeTypeFont objects shared process-wide, keyed by (path, size).
+# Font calls hold the GIL, so sharing them between render threads is safe.
+_FONT_CACHE_SIZE = 256
+
+
+@lru_cache(maxsize=64)
+def _existing_font_candidates(font_path: str | None) -> tuple[str, ...]:
+    """Existing font files to try for ``font_path`` (then the system fallbacks), stat'ed once."""
     candidates: list[Path] = []
     if font_path:
-        candidates.append(font_path)
+        candidates.append(Path(font_path))
     candidates.extend(_system_font_candidates())
+    existing: list[str] = []
     for candidate in candidates:
-        if candidate.exists():
-            try:
-                return ImageFont.truetype(str(candidate), size=size)
-            except Exception:
-                continue
+        try:
+            if candidate.exists():
+                existing.append(str(candidate))
+        except OSError:
+            continue
+    return tuple(existing)
+
+
+@lru_cache(maxsize=_FONT_CACHE_SIZE)
+def _load_truetype(path: str, size: int) -> ImageFont.FreeTypeFont:
+    return ImageFont.truetype(path, size=size)
+
+
+@lru_cache(maxsize=1)
+def _default_font() -> ImageFont.ImageFont:
     return ImageFont.load_default()
 
 
+def load_font(font_path: Path | None, size: int) -> ImageFont.ImageFont:
+    """Font at ``size`` from ``font_path`` or the first usable system font (cached)."""
+    for candidate in _existing_font_candidates(str(font_path) if font_path else None):
+        try:
+            return _load_truetype(candidate, int(size))
+        except Exception:
+            continue
+    return _default_font()
+
+
+def clear_font_cache() -> None:
+    """Forget loaded fonts and resolved paths (e.g. after fonts were installed)."""
+    _existing_font_candidates.cache_clear()
+    _load_truetype.cache_clear()
+
+
 @lru_cache(maxsize=1)
 def list_available_font_paths() -> list[Path]:
     system = platform.system().lower()
@@ -129,6 +167,80 @@ def text_height(draw: ImageDraw.ImageDraw, font: ImageFont.ImageFont) -> int:
     return max(1, height)
 
 
+_MEASURED_STRINGS_PER_FONT = 2048
+
+
+class TextMeasurer:
+    """Cached text measurement for one font.
+
+    ``width`` is the exact ink width ``text_size`` reports (one FreeType layout,
+    memoized per string). ``advance`` sums cached per-glyph advances, which is
+    cheap but ignores kerning and glyph overhang; wrapping uses it to skip exact
+    measurement until a line gets within ``slack`` of the limit.
+    """
+
+    def __init__(self, font: ImageFont.ImageFont) -> None:
+        self.font = font
+        self._advances: dict[str, float] = {}
+        self._widths: OrderedDict[str, int] = OrderedDict()
+        # 同一字体的测量器被多个渲染线程共享（流水线、serve、视频导出）
+        self._widths_lock = threading.Lock()
+        size = float(getattr(font, "size", 10) or 10)
+        # Overhang of italic/bold glyphs plus kerning drift stay well inside this margin.
+        self.slack = max(2.0, size * 0.5)
+
+    def advance(self, text: str) -> float:
+        advances = self._advances
+        total = 0.0
+        for ch in text:
+            value = advances.get(ch)
+            if value is None:
+                value = advances[ch] = self._glyph_advance(ch)
+            total += value
+        return total
+
+    def _glyph_advance(self, ch: str) -> float:
+        try:
+            return float(self.font.getlength(ch))
+        except Exception:
+            left, _top, right, _bottom = self.font.getbbox(ch)
+            return float(right - left)
+
+    def width(self, draw: ImageDraw.ImageDraw, text: str) -> int:
+        widths = self._widths
+        with self._widths_lock:
+            value = widths.get(text)
+            if value is not None:
+                widths.move_to_end(text)
+                return value
+        value, _ = text_size(draw, text, self.font)
+        with self._widths_lock:
+            widths[text] = value
+            if len(widths) > _MEASURED_STRINGS_PER_FONT:
+                widths.popitem(last=False)
+        return value
+
+    def fits(self, draw: ImageDraw.ImageDraw, text: str, max_width: int, advance: float | None = None) -> bool:
+        """``text_size(...)[0] <= max_width``, measuring exactly only near the limit."""
+        estimate = self.advance(text) if advance is None else advance
+        if estimate + self.slack + estimate * 0.02 <= max_width:
+            return True
+        return self.width(draw, text) <= max_width
+
+
+_measurers: "weakref.WeakKeyDictionary[Any, TextMeasurer]" = weakref.WeakKeyDictionary()
+_measurers_lock = threading.Lock()
+
+
+def get_text_measurer(font: ImageFont.ImageFont) -> TextMeasurer:
+    """Shared ``TextMeasurer`` for ``font`` (fonts from ``load_font`` are long-lived)."""
+    with _measurers_lock:
+        measurer = _measurers.get(font)
+        if measurer is None:
+            measurer = _measurers[font] = TextMeasurer(font)
+        return measurer
+
+
 def ellipsize(
     draw: ImageDraw.ImageDraw,
     text: str,
@@ -137,16 +249,22 @@ def ellipsize(
 ) -> str:
     if max_width <= 0:
         return ""
-    width, _ = text_size(draw, text, font)
-    if width <= max_width:
+    measurer = get_text_measurer(font)
+    if measurer.fits(draw, text, max_width):
         return text
     ellipsis = "..."
-    for cut in range(len(text), -1, -1):
+    # 二分查找最长可容纳的前缀（宽度随前缀长度单调增加），代替逐字符回退测量。
+    low, high = 0, len(text) - 1
+    best: str | None = None
+    while low <= high:
+        cut = (low + high) // 2
         candidate = text[:cut].rstrip() + ellipsis
-        cand_width, _ = text_size(draw, candidate, font)
-        if cand_width <= max_width:
-            return candidate
-    return ellipsis
+        if measurer.fits(draw, candidate, max_width):
+            best = candidate
+            low = cut + 1
+        else:
+            high = cut - 1
+    return best if best is not None else ellipsis
 
 
 def wrap_text(
@@ -162,8 +280,10 @@ def wrap_text(
     if max_lines <= 1:
         return [ellipsize(draw, clean, font, max_width)]
 
+    measurer = get_text_measurer(font)
     lines: list[str] = []
     current = ""
+    current_advance = 0.0
     overflow = False
     chars = list(clean)
     idx = 0
@@ -173,21 +293,26 @@ def wrap_text(
         if ch == "\n":
             lines.append(current)
             current = ""
+            current_advance = 0.0
             if len(lines) >= max_lines:
                 overflow = idx < len(chars)
                 break
             continue
         candidate = current + ch
-        width, _ = text_size(draw, candidate, font)
-        if width <= max_width:
+        # 逐字累加字宽，只有接近行宽时才做一次精确排版测量。
+        candidate_advance = current_advance + measurer.advance(ch)
+        if measurer.fits(draw, candidate, max_width, advance=candidate_advance):
             current = candidate
+            current_advance = candidate_advance
             continue
         if current:
             lines.append(current.rstrip())
             current = ch
+            current_advance = measurer.advance(ch)
         else:
             lines.append(ch)
             current = ""
+            current_advance = 0.0
         if len(lines) >= max_lines:
             overflow = idx < len(chars) or bool(current.strip())
             break
@@ -0,0 +1,498 @@
+"""Long-lived local render service for ``birdstamp serve``.
+
+Other tools POST a file path (JSON) or raw image bytes to ``/render`` and get
+the rendered image bytes, or the output path when they ask for a file to be
+written. The bird detector, fonts and templates stay loaded across requests.
+Only the standard library HTTP server is used, on localhost TCP or a Unix
+domain socket, so nothing external is needed.
+
+Endpoints::
+
+    POST /render   JSON {"path", "template"?, "output"?, "format"?, "quality"?,
+                         "max_long_edge"?, "draw_banner"?, "draw_text"?}
+                   or image bytes with the same keys as query parameters
+                   (plus "filename" to pick the decoder by extension);
+                   an unknown "template" is a 400
+    GET  /health   {"status": "ok", ...}
+    GET  /metrics  request counters and latency percentiles (JSON)
+"""
+from __future__ import annotations
+
+import contextlib
+import dataclasses
+import io
+import json
+import logging
+import os
+import shutil
+import socket
+import socketserver
+import stat
+import tempfile
+import threading
+import time
+from collections import OrderedDict, deque
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from http.server import BaseHTTPRequestHandler, HTTPServer, ThreadingHTTPServer
+from pathlib import Path
+from typing import Any, BinaryIO, Callable, Hashable, Iterator
+from urllib.parse import parse_qs, urlparse
+
+from app_common.exif_io import extract_metadata_with_xmp_priority
+from birdstamp.batch_render import RenderOptions, render_image, save_image, warm_up
+from birdstamp.decoders.image_decoder import decode_image
+from birdstamp.gui.editor_template import (
+    default_template_payload,
+    load_template_payload,
+    normalize_template_payload,
+)
+
+_log = logging.getLogger(__name__)
+
+# 上传先占位再读取：同时在内存/磁盘中的上传不超过 workers + max_queue 个。
+DEFAULT_MAX_UPLOAD_BYTES = 256 * 1024 * 1024
+_MAX_JSON_BYTES = 1024 * 1024
+_UPLOAD_CHUNK_BYTES = 1024 * 1024
+_LATENCY_WINDOW = 1000
+# 每种 (模板版本, 格式, 质量, 尺寸, 开关) 组合的 RenderOptions 只构建（编译模板）一次。
+_OPTIONS_CACHE_SIZE = 64
+_CONTENT_TYPE_SUFFIX = {
+    "image/jpeg": ".jpg",
+    "image/png": ".png",
+    "image/tiff": ".tif",
+    "image/heic": ".heic",
+    "image/heif": ".heif",
+    "image/webp": ".webp",
+}
+_FORMATS = {"jpeg": ("jpg", "JPEG"), "jpg": ("jpg", "JPEG"), "png": ("png", "PNG")}
+
+
+class ServiceBusy(RuntimeError):
+    """All workers busy and the wait queue is full."""
+
+
+class UnknownTemplate(ValueError):
+    """A request named a template that is neither a file nor in the template directory."""
+
+
+class TemplateCache:
+    """Template payloads by name/path; files are reloaded when their mtime changes.
+
+    Only the service default may fall back to the built-in template; a request
+    naming a template that does not resolve raises ``UnknownTemplate``.
+    """
+
+    _BUILTIN_KEY = "builtin"
+
+    def __init__(self, resolve_path: Callable[[str | None], Path | None], default_name: str | None = None) -> None:
+        self._resolve_path = resolve_path
+        self.default_name = default_name
+        self._entries: dict[str, tuple[int, dict[str, Any]]] = {}
+        self._lock = threading.Lock()
+
+    def get(self, name: str | None) -> dict[str, Any]:
+        return self.lookup(name)[1]
+
+    def lookup(self, name: str | None) -> tuple[Hashable, dict[str, Any]]:
+        """``(version, payload)``; ``version`` changes whenever the payload would (file path + mtime)."""
+        explicit = bool(name) and name != self.default_name
+        name = name or self.default_name
+        path = self._resolve_path(name)
+        if path is None:
+            if explicit:
+                raise UnknownTemplate(f"unknown template: {name!r}")
+            key, mtime_ns = self._BUILTIN_KEY, 0
+        else:
+            key, mtime_ns = str(path.resolve(strict=False)), path.stat().st_mtime_ns
+        with self._lock:
+            cached = self._entries.get(key)
+            if cached is not None and cached[0] == mtime_ns:
+                return (key, mtime_ns), cached[1]
+        if path is None:
+            payload = default_template_payload(name=self.default_name or "default")
+        else:
+            payload = normalize_template_payload(load_template_payload(path), fallback_name=path.stem)
+        with self._lock:
+            self._entries[key] = (mtime_ns, payload)
+        return (key, mtime_ns), payload
+
+
+@dataclass(slots=True)
+class RenderRequest:
+    source: Path
+    template: str | None = None
+    output: Path | None = None
+    output_format: str | None = None
+    quality: int | None = None
+    max_long_edge: int | None = None
+    draw_banner: bool | None = None
+    draw_text: bool | None = None
+
+
+class ServeMetrics:
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self.started = time.time()
+        self.requests = 0
+        self.ok = 0
+        self.failed = 0
+        self.rejected = 0
+        self.in_flight = 0
+        self.render_seconds = 0.0
+        self._latencies: deque[float] = deque(maxlen=_LATENCY_WINDOW)
+
+    def begin(self) -> None:
+        with self._lock:
+            self.requests += 1
+            self.in_flight += 1
+
+    def end(self, elapsed: float, *, ok: bool) -> None:
+        with self._lock:
+            self.in_flight -= 1
+            if ok:
+                self.ok += 1
+                self.render_seconds += elapsed
+                self._latencies.append(elapsed)
+            else:
+                self.failed += 1
+
+    def reject(self) -> None:
+        with self._lock:
+            self.requests += 1
+            self.rejected += 1
+
+    def snapshot(self) -> dict[str, Any]:
+        with self._lock:
+            latencies = sorted(self._latencies)
+            data = {
+                "uptime_seconds": round(time.time() - self.started, 3),
+                "requests": self.requests,
+                "ok": self.ok,
+                "failed": self.failed,
+                "rejected": self.rejected,
+                "in_flight": self.in_flight,
+                "render_seconds_total": round(self.render_seconds, 3),
+            }
+        for label, q in (("p50", 0.5), ("p95", 0.95), ("p99", 0.99)):
+            data[f"latency_{label}_ms"] = (
+                round(latencies[min(len(latencies) - 1, int(q * len(latencies)))] * 1000.0, 2) if latencies else None
+            )
+        return data
+
+
+class RenderService:
+    """Bounded thread pool rendering requests with shared (warm) caches.
+
+    Threads rather than processes: every worker shares the loaded detector,
+    fonts and templates, and PIL/torch release the GIL for the heavy parts.
+    At most ``workers + max_queue`` requests are accepted at once; beyond
+    that ``ServiceBusy`` is raised so clients can back off. The HTTP handler
+    takes its slot (``admit``) before reading the request body, so rejected
+    uploads are never buffered.
+    """
+
+    def __init__(
+        self,
+        base_options: RenderOptions,
+        templates: TemplateCache,
+        *,
+        workers: int = 2,
+        max_queue: int = 16,
+        max_upload_bytes: int = DEFAULT_MAX_UPLOAD_BYTES,
+    ) -> None:
+        self.base_options = base_options
+        self.templates = templates
+        self.workers = max(1, int(workers))
+        self.max_upload_bytes = max(1, int(max_upload_bytes))
+        self.metrics = ServeMetrics()
+        self._slots = threading.BoundedSemaphore(self.workers + max(0, int(max_queue)))
+        self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="birdstamp-serve")
+        self._upload_dir = Path(tempfile.mkdtemp(prefix="birdstamp-serve-"))
+        self._options: OrderedDict[tuple[Any, ...], RenderOptions] = OrderedDict()
+        self._options_lock = threading.Lock()
+        self._closed = False
+
+    def warm_up(self) -> None:
+        warm_up(self.base_options)
+
+    def close(self) -> None:
+        """Stop accepting work and wait for running renders; safe to call more than once."""
+        if self._closed:
+            return
+        self._closed = True
+        self._executor.shutdown(wait=True, cancel_futures=True)
+        shutil.rmtree(self._upload_dir, ignore_errors=True)
+
+    def options_for(self, request: RenderRequest) -> RenderOptions:
+        """Options for ``request``; built (and the template compiled) once per template version and overrides.
+
+        The returned options are shared between requests and must not be modified.
+        """
+        base = self.base_options
+        version, payload = self.templates.lookup(request.template)
+        out_ext, pil_format = base.out_ext, base.pil_format
+        if request.output_format:
+            try:
+                out_ext, pil_format = _FORMATS[request.output_format.lower()]
+            except KeyError:
+                raise ValueError(f"format must be jpeg/jpg or png, got: {request.output_format!r}") from None
+        overrides = {
+            "out_ext": out_ext,
+            "pil_format": pil_format,
+            "quality": int(request.quality) if request.quality is not None else base.quality,
+            "max_long_edge": int(request.max_long_edge) if request.max_long_edge is not None else base.max_long_edge,
+            "draw_banner": base.draw_banner if request.draw_banner is None else bool(request.draw_banner),
+            "draw_text": base.draw_text if request.draw_text is None else bool(request.draw_text),
+        }
+        key = (version, request.template, *overrides.values())
+        with self._options_lock:
+            options = self._options.get(key)
+            if options is not None:
+                self._options.move_to_end(key)
+                return options
+        options = dataclasses.replace(
+            base,
+            template_payload=payload,
+            template_name=str(payload.get("name") or request.template or base.template_name),
+            manifest_entries=None,
+            **overrides,
+        )
+        with self._options_lock:
+            self._options[key] = options
+            while len(self._options) > _OPTIONS_CACHE_SIZE:
+                self._options.popitem(last=False)
+        return options
+
+    @contextlib.contextmanager
+    def admit(self) -> Iterator[None]:
+        """Hold one of the ``workers + max_queue`` slots; ``ServiceBusy`` when none is free."""
+        if self._closed or not self._slots.acquire(blocking=False):
+            self.metrics.reject()
+            raise ServiceBusy("render queue full")
+        try:
+            yield
+        finally:
+            self._slots.release()
+
+    def render(self, request: RenderRequest, *, admitted: bool = False) -> tuple[bytes | None, RenderOptions, float]:
+        """Render synchronously on the pool; returns (image bytes or None if written, options, seconds).
+
+        ``admitted`` means the caller already holds a slot from ``admit``.
+        """
+        if not admitted:
+            with self.admit():
+                return self.render(request, admitted=True)
+        self.metrics.begin()
+        t0 = time.perf_counter()
+        ok = False
+        try:
+            data, options = self._executor.submit(self._render_now, request).result()
+            ok = True
+            return data, options, time.perf_counter() - t0
+        finally:
+            self.metrics.end(time.perf_counter() - t0, ok=ok)
+
+    def _render_now(self, request: RenderRequest) -> tuple[bytes | None, RenderOptions]:
+        options = self.options_for(request)
+        raw_meta = extract_metadata_with_xmp_priority(request.source, mode=options.exiftool_mode)
+        rendered = render_image(decode_image(request.source), request.source, raw_meta, options)
+        if request.output is not None:
+            save_image(rendered, request.output, pil_format=options.pil_format, quality=options.quality)
+            return None, options
+        buffer = io.BytesIO()
+        save_image(rendered, buffer, pil_format=options.pil_format, quality=options.quality)
+        return buffer.getvalue(), options
+
+    def stage_upload(self, stream: BinaryIO, length: int, suffix: str) -> Path:
+        """Copy ``length`` bytes of ``stream`` to a temp file in chunks (never the whole upload in memory)."""
+        fd, name = tempfile.mkstemp(suffix=suffix, dir=self._upload_dir)
+        path = Path(name)
+        try:
+            with os.fdopen(fd, "wb") as fh:
+                remaining = length
+                while remaining > 0:
+                    chunk = stream.read(min(_UPLOAD_CHUNK_BYTES, remaining))
+                    if not chunk:
+                        raise ValueError("request body shorter than Content-Length")
+                    fh.write(chunk)
+                    remaining -= len(chunk)
+        except BaseException:
+            path.unlink(missing_ok=True)
+            raise
+        return path
+
+
+def _parse_bool(value: Any) -> bool | None:
+    if value is None or isinstance(value, bool):
+        return value
+    return str(value).strip().lower() in {"1", "true", "yes", "on"}
+
+
+def _parse_int(value: Any) -> int | None:
+    if value is None or value == "":
+        return None
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        raise ValueError(f"expected an integer, got: {value!r}") from None
+
+
+def _request_from_fields(fields: dict[str, Any], source: Path) -> RenderRequest:
+    output = fields.get("output")
+    return RenderRequest(
+        source=source,
+        template=fields.get("template") or None,
+        output=Path(output).expanduser() if output else None,
+        output_format=fields.get("format") or None,
+        quality=_parse_int(fields.get("quality")),
+        max_long_edge=_parse_int(fields.get("max_long_edge")),
+        draw_banner=_parse_bool(fields.get("draw_banner")),
+        draw_text=_parse_bool(fields.get("draw_text")),
+    )
+
+
+class _RenderHandler(BaseHTTPRequestHandler):
+    server_version = "BirdStamp"
+    protocol_version = "HTTP/1.1"
+
+    @property
+    def service(self) -> RenderService:
+        return self.server.render_service  # type: ignore[attr-defined]
+
+    def log_message(self, format: str, *args: Any) -> None:  # noqa: A002 - BaseHTTPRequestHandler signature
+        _log.debug("serve: " + format, *args)
+
+    def _send_json(self, status: int, payload: dict[str, Any], *, close: bool = False) -> None:
+        body = json.dumps(payload, ensure_ascii=False).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        if close:
+            # 请求体未读取，连接不能复用
+            self.send_header("Connection", "close")
+            self.close_connection = True
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self) -> None:  # noqa: N802 - BaseHTTPRequestHandler naming
+        path = urlparse(self.path).path
+        if path == "/health":
+            self._send_json(200, {"status": "ok", "workers": self.service.workers})
+        elif path == "/metrics":
+            self._send_json(200, self.service.metrics.snapshot())
+        else:
+            self._send_json(404, {"error": "not found"})
+
+    def do_POST(self) -> None:  # noqa: N802
+        url = urlparse(self.path)
+        if url.path != "/render":
+            self._send_json(404, {"error": "not found"}, close=True)
+            return
+        try:
+            length = int(self.headers.get("Content-Length") or 0)
+        except ValueError:
+            length = -1
+        content_type = (self.headers.get("Content-Type") or "").split(";")[0].strip().lower()
+        is_json = content_type == "application/json"
+        limit = _MAX_JSON_BYTES if is_json else self.service.max_upload_bytes
+        if length < 0 or length > limit:
+            self._send_json(413 if length > 0 else 400, {"error": "invalid Content-Length"}, close=True)
+            return
+
+        upload: Path | None = None
+        try:
+            # 先占位再读请求体：繁忙时直接 503，不缓冲上传内容。
+            with self.service.admit():
+                if is_json:
+                    body = self.rfile.read(length) if length else b""
+                    fields = json.loads(body.decode("utf-8") or "{}")
+                    if not isinstance(fields, dict) or not fields.get("path"):
+                        raise ValueError('JSON body needs a "path"')
+                    source = Path(str(fields["path"])).expanduser()
+                    if not source.is_file():
+                        self._send_json(404, {"error": f"file not found: {source}"})
+                        return
+                else:
+                    fields = {k: v[-1] for k, v in parse_qs(url.query).items()}
+                    if not length:
+                        raise ValueError("empty request body")
+                    suffix = Path(str(fields.get("filename") or "")).suffix or _CONTENT_TYPE_SUFFIX.get(
+                        content_type, ".jpg"
+                    )
+                    upload = source = self.service.stage_upload(self.rfile, length, suffix)
+                request = _request_from_fields(fields, source)
+                data, options, elapsed = self.service.render(request, admitted=True)
+        except ServiceBusy as exc:
+            self._send_json(503, {"error": str(exc)}, close=True)
+            return
+        except (ValueError, json.JSONDecodeError) as exc:
+            self._send_json(400, {"error": str(exc)}, close=True)
+            return
+        except Exception as exc:
+            _log.error("serve: render failed: %s", exc)
+            self._send_json(500, {"error": str(exc)}, close=True)
+            return
+        finally:
+            if upload is not None:
+                upload.unlink(missing_ok=True)
+
+        if data is None:
+            self._send_json(200, {"status": "ok", "output": str(request.output), "elapsed": round(elapsed, 4)})
+            return
+        self.send_response(200)
+        self.send_header("Content-Type", "image/jpeg" if options.pil_format == "JPEG" else "image/png")
+        self.send_header("Content-Length", str(len(data)))
+        self.send_header("X-BirdStamp-Elapsed", f"{elapsed:.4f}")
+        self.end_headers()
+        self.wfile.write(data)
+
+
+if hasattr(socket, "AF_UNIX"):
+
+    class _UnixHTTPServer(socketserver.ThreadingMixIn, HTTPServer):
+        address_family = socket.AF_UNIX
+        daemon_threads = True
+
+        def server_bind(self) -> None:
+            socketserver.TCPServer.server_bind(self)
+            self.server_name = "localhost"
+            self.server_port = 0
+
+        def get_request(self):
+            request, _ = self.socket.accept()
+            return request, ("unix", 0)
+
+
+def create_server(service: RenderService, *, host: str = "127.0.0.1", port: int = 8765, socket_path: Path | None = None):
+    """HTTP server bound to ``host:port``, or to a Unix socket when ``socket_path`` is given."""
+    if socket_path is not None:
+        if not hasattr(socket, "AF_UNIX"):
+            raise RuntimeError("Unix domain sockets are not supported on this platform")
+        socket_path = Path(socket_path)
+        try:
+            mode = socket_path.lstat().st_mode
+        except FileNotFoundError:
+            mode = None
+        if mode is not None:
+            # 只清理上次运行遗留的 socket，绝不删除同名的普通文件/目录
+            if not stat.S_ISSOCK(mode):
+                raise FileExistsError(f"--socket path exists and is not a socket: {socket_path}")
+            socket_path.unlink()
+        server = _UnixHTTPServer(str(socket_path), _RenderHandler)
+    else:
+        server = ThreadingHTTPServer((host, port), _RenderHandler)
+        server.daemon_threads = True
+    server.render_service = service  # type: ignore[attr-defined]
+    return server
+
+
+__all__ = [
+    "DEFAULT_MAX_UPLOAD_BYTES",
+    "RenderRequest",
+    "RenderService",
+    "ServiceBusy",
+    "TemplateCache",
+    "UnknownTemplate",
+    "create_server",
+]
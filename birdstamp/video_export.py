@@ -1,6 +1,6 @@
 from __future__ import annotations
 
-from concurrent.futures import ThreadPoolExecutor, as_completed
+from concurrent.futures import Future, ThreadPoolExecutor, as_completed
 import os
 import shutil
 import subprocess
@@ -9,13 +9,16 @@ import tempfile
 import math
 import threading
 import time
-from dataclasses import dataclass
+from dataclasses import dataclass, replace
 from pathlib import Path
 from typing import Any, Callable
 
 from PIL import Image, ImageColor
 
 from app_common.log import get_logger
+from birdstamp import profiling
+from birdstamp.bird_box_store import shared_bird_box_store
+from birdstamp.cpu_budget import CpuBudget, plan_cpu_budget
 from birdstamp.config import get_app_dir, get_app_resource_dir, get_user_data_dir
 from birdstamp.decoders.image_decoder import decode_image
 from birdstamp.gui import editor_core, editor_template, editor_utils, template_context as _template_context
@@ -31,6 +34,11 @@ _PLATFORM_TOOL_SUBDIR = {
     "win32": "windows",
 }
 _BIRD_DETECT_WARNING_EMITTED = False
+_BIRD_BOX_MISSING = object()
+
+_BirdBox = tuple[float, float, float, float]
+# 源文件签名 -> 鸟框（None = 无鸟）；并行渲染时，检测中的条目是一个 Future。
+_BirdBoxCache = dict[str, "_BirdBox | None | Future[_BirdBox | None]"]
 _MAX_AUTO_VIDEO_RENDER_WORKERS = 6
 
 _build_metadata_context = editor_utils.build_metadata_context
@@ -52,6 +60,8 @@ _get_focus_point_for_display = editor_core.get_focus_point_for_display
 _resolve_focus_box_after_processing = editor_core.resolve_focus_box_after_processing
 _resolve_focus_camera_type_from_metadata = editor_core.resolve_focus_camera_type_from_metadata
 _detect_primary_bird_box = editor_core.detect_primary_bird_box
+_bird_detection_batcher = editor_core.shared_bird_detection_batcher
+_shared_bird_box_store = shared_bird_box_store
 _get_bird_detector_error_message = editor_core.get_bird_detector_error_message
 _CENTER_MODE_IMAGE = editor_core.CENTER_MODE_IMAGE
 _CENTER_MODE_FOCUS = editor_core.CENTER_MODE_FOCUS
@@ -62,8 +72,9 @@ _DEFAULT_TEMPLATE_MAX_LONG_EDGE = editor_template.DEFAULT_TEMPLATE_MAX_LONG_EDGE
 _default_template_payload = editor_template.default_template_payload
 _normalize_template_payload = editor_template.normalize_template_payload
 _deep_copy_payload = editor_template.deep_copy_payload
-_load_template_payload = editor_template.load_template_payload
 _render_template_overlay = editor_template.render_template_overlay
+_compile_template = editor_template.compile_template
+_load_compiled_template = editor_template.load_compiled_template
 
 
 @dataclass(slots=True)
@@ -93,6 +104,10 @@ class VideoExportOptions:
     frame_height: int = 0
     background_color: str = DEFAULT_VIDEO_BACKGROUND_COLOR
     render_workers: int = DEFAULT_VIDEO_RENDER_WORKERS
+    # CPU 预算（核数）：0 = 全部可用核心，见 birdstamp.cpu_budget
+    cpu_budget: int = 0
+    # ffmpeg -threads：0 = 按 CPU 预算
+    encoder_threads: int = 0
     overwrite: bool = True
 
     def normalized_output_path(self) -> Path:
@@ -290,6 +305,14 @@ def validate_video_export_options(options: VideoExportOptions) -> VideoExportOpt
     if render_workers < 0:
         raise ValueError("渲染线程数不能小于 0。")
 
+    try:
+        cpu_budget = int(options.cpu_budget)
+        encoder_threads = int(options.encoder_threads)
+    except Exception as exc:
+        raise ValueError("CPU 预算和编码线程数必须为整数。") from exc
+    if cpu_budget < 0 or encoder_threads < 0:
+        raise ValueError("CPU 预算和编码线程数不能小于 0。")
+
     return VideoExportOptions(
         output_path=options.output_path,
         container=container,
@@ -302,6 +325,8 @@ def validate_video_export_options(options: VideoExportOptions) -> VideoExportOpt
         frame_height=height,
         background_color=_safe_color(str(options.background_color or DEFAULT_VIDEO_BACKGROUND_COLOR), DEFAULT_VIDEO_BACKGROUND_COLOR),
         render_workers=render_workers,
+        cpu_budget=cpu_budget,
+        encoder_threads=encoder_threads,
         overwrite=bool(options.overwrite),
     )
 
@@ -379,36 +404,57 @@ def _should_draw_template_overlay(settings: dict[str, Any]) -> bool:
     return _parse_bool_value(settings.get("draw_banner"), True) or _parse_bool_value(settings.get("draw_text"), True)
 
 
-def _resolve_template_payload_for_render(
+def _resolve_template_for_render(
     settings: dict[str, Any],
     template_paths: dict[str, Path] | None,
-) -> dict[str, Any]:
+) -> editor_template.CompiledTemplate:
+    """Compiled template for a frame; template files are compiled once and reused until they change."""
     template_name = str(settings.get("template_name") or "default").strip() or "default"
+    if isinstance(template_paths, dict):
+        template_path = template_paths.get(template_name)
+        if template_path and template_path.is_file():
+            try:
+                return _load_compiled_template(template_path)
+            except Exception as exc:
+                _log.warning("template reload failed: name=%s path=%s err=%s", template_name, template_path, exc)
+
     payload_raw = settings.get("template_payload")
     if isinstance(payload_raw, dict):
-        payload = _normalize_template_payload(payload_raw, fallback_name=template_name)
-    else:
-        payload = _default_template_payload(name=template_name)
+        # _clone_render_settings 已规范化过 payload
+        return _compile_template(payload_raw, fallback_name=template_name)
+    return _compile_template(_default_template_payload(name=template_name), fallback_name=template_name)
+
+
+def _warn_if_bird_detect_unavailable(bird_box: tuple[float, float, float, float] | None) -> None:
+    global _BIRD_DETECT_WARNING_EMITTED
+
+    if bird_box is None and not _BIRD_DETECT_WARNING_EMITTED:
+        message = _get_bird_detector_error_message()
+        if message:
+            _log.warning("bird detect unavailable during video export: %s", message)
+            _BIRD_DETECT_WARNING_EMITTED = True
 
-    if not isinstance(template_paths, dict):
-        return payload
-    template_path = template_paths.get(template_name)
-    if template_path and template_path.is_file():
-        try:
-            return _load_template_payload(template_path)
-        except Exception as exc:
-            _log.warning("template reload failed: name=%s path=%s err=%s", template_name, template_path, exc)
-    return payload
+
+def _stored_bird_box_detector(
+    path: Path,
+    detector: Callable[[Image.Image], tuple[float, float, float, float] | None] | None = None,
+) -> Callable[[Image.Image], tuple[float, float, float, float] | None]:
+    """``detector`` (default: in-process detection) behind the persistent bird-box store.
+
+    With a store, ``detector`` must raise ``BirdDetectionError`` on failure (see ``stored_bird_box_provider``).
+    """
+    store = _shared_bird_box_store()
+    if store is None:
+        return detector or _detect_primary_bird_box
+    return editor_core.stored_bird_box_provider(path, store, detector)
 
 
 def _resolve_bird_box_for_image(
     path: Path | None,
     image: Image.Image,
-    bird_box_cache: dict[str, tuple[float, float, float, float] | None],
+    bird_box_cache: _BirdBoxCache,
     bird_box_lock: threading.Lock | None = None,
 ) -> tuple[float, float, float, float] | None:
-    global _BIRD_DETECT_WARNING_EMITTED
-
     if path is None:
         return None
 
@@ -416,25 +462,40 @@ def _resolve_bird_box_for_image(
     if bird_box_lock is None:
         if signature in bird_box_cache:
             return bird_box_cache[signature]
-        bird_box = _detect_primary_bird_box(image)
+        bird_box = _stored_bird_box_detector(path)(image)
         bird_box_cache[signature] = bird_box
-        if bird_box is None and not _BIRD_DETECT_WARNING_EMITTED:
-            message = _get_bird_detector_error_message()
-            if message:
-                _log.warning("bird detect unavailable during video export: %s", message)
-                _BIRD_DETECT_WARNING_EMITTED = True
+        _warn_if_bird_detect_unavailable(bird_box)
         return bird_box
 
+    # 并行渲染：锁只保护缓存。第一个请求某签名的线程占位一个 Future，查持久化缓存，
+    # 未命中再交给共享的批量检测（推理在独立的检测进程中进行）；同一签名的其他线程
+    # 等待这个 Future，已有鸟框的帧照常渲染。
+    with bird_box_lock:
+        cached = bird_box_cache.get(signature, _BIRD_BOX_MISSING)
+        owner = cached is _BIRD_BOX_MISSING
+        if owner:
+            cached = Future()
+            bird_box_cache[signature] = cached
+    if not isinstance(cached, Future):
+        return cached
+    if not owner:
+        with profiling.span(profiling.STAGE_DETECTION):
+            return cached.result()
+    try:
+        try:
+            bird_box = _stored_bird_box_detector(path, _bird_detection_batcher())(image)
+        except Exception:
+            bird_box = None
+    except BaseException as exc:
+        # KeyboardInterrupt / SystemExit 等：等待者不能永远阻塞；撤掉占位，下次重新检测。
+        with bird_box_lock:
+            bird_box_cache.pop(signature, None)
+        cached.set_exception(exc)
+        raise
     with bird_box_lock:
-        if signature in bird_box_cache:
-            return bird_box_cache[signature]
-        bird_box = _detect_primary_bird_box(image)
         bird_box_cache[signature] = bird_box
-        if bird_box is None and not _BIRD_DETECT_WARNING_EMITTED:
-            message = _get_bird_detector_error_message()
-            if message:
-                _log.warning("bird detect unavailable during video export: %s", message)
-                _BIRD_DETECT_WARNING_EMITTED = True
+    cached.set_result(bird_box)
+    _warn_if_bird_detect_unavailable(bird_box)
     return bird_box
 
 
@@ -444,7 +505,7 @@ def _resolve_crop_anchor_and_keep_box(
     image: Image.Image,
     raw_metadata: dict[str, Any],
     center_mode: str,
-    bird_box_cache: dict[str, tuple[float, float, float, float] | None],
+    bird_box_cache: _BirdBoxCache,
     bird_box_lock: threading.Lock | None = None,
 ) -> tuple[tuple[float, float], tuple[float, float, float, float] | None]:
     focus_camera_type = _resolve_focus_camera_type_from_metadata(raw_metadata)
@@ -456,7 +517,8 @@ def _resolve_crop_anchor_and_keep_box(
     )
     mode = _normalize_center_mode(center_mode)
     bird_box: tuple[float, float, float, float] | None = None
-    if mode in {_CENTER_MODE_BIRD, _CENTER_MODE_FOCUS}:
+    # 对焦居中有对焦点时不需要鸟体框，避免无谓的检测。
+    if mode == _CENTER_MODE_BIRD or (mode == _CENTER_MODE_FOCUS and focus_point is None):
         bird_box = _resolve_bird_box_for_image(path, image, bird_box_cache, bird_box_lock)
 
     if mode == _CENTER_MODE_BIRD:
@@ -546,7 +608,7 @@ def _compute_crop_plan_for_image(
     image: Image.Image,
     raw_metadata: dict[str, Any],
     settings: dict[str, Any],
-    bird_box_cache: dict[str, tuple[float, float, float, float] | None],
+    bird_box_cache: _BirdBoxCache,
     bird_box_lock: threading.Lock | None = None,
 ) -> tuple[tuple[float, float, float, float] | None, tuple[int, int, int, int]]:
     ratio = _parse_ratio_value(settings.get("ratio"))
@@ -590,7 +652,7 @@ def _build_processed_image(
     *,
     settings: dict[str, Any],
     source_path: Path | None,
-    bird_box_cache: dict[str, tuple[float, float, float, float] | None],
+    bird_box_cache: _BirdBoxCache,
     bird_box_lock: threading.Lock | None = None,
     crop_plan: tuple[tuple[float, float, float, float] | None, tuple[int, int, int, int]] | None = None,
 ) -> Image.Image:
@@ -619,38 +681,59 @@ def render_video_frame(
     job: VideoFrameJob,
     *,
     template_paths: dict[str, Path] | None = None,
-    bird_box_cache: dict[str, tuple[float, float, float, float] | None] | None = None,
+    bird_box_cache: _BirdBoxCache | None = None,
     bird_box_lock: threading.Lock | None = None,
+    timer: profiling.StageTimer | None = None,
+) -> Image.Image:
+    """Render one frame; ``timer`` (optional) collects per-stage seconds."""
+    if timer is None:
+        return _render_video_frame(
+            job, template_paths=template_paths, bird_box_cache=bird_box_cache, bird_box_lock=bird_box_lock
+        )
+    with profiling.activate(timer):
+        return _render_video_frame(
+            job, template_paths=template_paths, bird_box_cache=bird_box_cache, bird_box_lock=bird_box_lock
+        )
+
+
+def _render_video_frame(
+    job: VideoFrameJob,
+    *,
+    template_paths: dict[str, Path] | None,
+    bird_box_cache: _BirdBoxCache | None,
+    bird_box_lock: threading.Lock | None,
 ) -> Image.Image:
     cache = bird_box_cache if isinstance(bird_box_cache, dict) else {}
     settings = _clone_render_settings(job.settings)
     raw_metadata = dict(job.raw_metadata or {})
 
-    if job.source_image is not None:
-        image = job.source_image.copy()
-    else:
-        image = decode_image(job.path, decoder="auto")
+    with profiling.span(profiling.STAGE_DECODE):
+        if job.source_image is not None:
+            image = job.source_image.copy()
+        else:
+            image = decode_image(job.path, decoder="auto")
 
-    crop_box, outer_pad = _compute_crop_plan_for_image(
-        path=job.path,
-        image=image,
-        raw_metadata=raw_metadata,
-        settings=settings,
-        bird_box_cache=cache,
-        bird_box_lock=bird_box_lock,
-    )
-    processed = _build_processed_image(
-        image,
-        raw_metadata,
-        settings=settings,
-        source_path=job.path,
-        bird_box_cache=cache,
-        bird_box_lock=bird_box_lock,
-        crop_plan=(crop_box, outer_pad),
-    )
+    with profiling.span(profiling.STAGE_CROP_PLAN):
+        crop_box, outer_pad = _compute_crop_plan_for_image(
+            path=job.path,
+            image=image,
+            raw_metadata=raw_metadata,
+            settings=settings,
+            bird_box_cache=cache,
+            bird_box_lock=bird_box_lock,
+        )
+        processed = _build_processed_image(
+            image,
+            raw_metadata,
+            settings=settings,
+            source_path=job.path,
+            bird_box_cache=cache,
+            bird_box_lock=bird_box_lock,
+            crop_plan=(crop_box, outer_pad),
+        )
     rendered: Image.Image
     if _should_draw_template_overlay(settings):
-        template_payload = _resolve_template_payload_for_render(settings, template_paths)
+        template_payload = _resolve_template_for_render(settings, template_paths)
         photo_info = _template_context.ensure_photo_info(job.photo_info or job.path, raw_metadata=raw_metadata)
         metadata_context = dict(job.metadata_context or {}) or _build_metadata_context(photo_info, raw_metadata)
         rendered = _render_template_overlay(
@@ -677,7 +760,7 @@ def render_video_frame(
         )
         if focus_box is not None:
             rendered = _draw_focus_box_overlay(rendered, focus_box)
-    return rendered.convert("RGB")
+    return rendered if rendered.mode == "RGB" else rendered.convert("RGB")
 
 
 def _ensure_even_size(width: int, height: int) -> tuple[int, int]:
@@ -728,15 +811,15 @@ def _ffmpeg_fps_text(fps: float) -> str:
     return text or "25"
 
 
-def resolve_video_render_workers(render_workers: int, pending_jobs: int) -> int:
+def resolve_video_render_workers(render_workers: int, pending_jobs: int, budget: CpuBudget | None = None) -> int:
     if pending_jobs <= 0:
         return 1
     requested = max(0, int(render_workers))
     if requested > 0:
         return max(1, min(requested, pending_jobs))
 
-    cpu_count = max(1, int(os.cpu_count() or 1))
-    auto_workers = cpu_count if cpu_count <= 2 else cpu_count - 1
+    # 自动：CPU 预算中留给渲染的核数（检测器进程另占一份）
+    auto_workers = (budget or plan_cpu_budget()).render_workers
     auto_workers = max(1, min(auto_workers, _MAX_AUTO_VIDEO_RENDER_WORKERS))
     return max(1, min(auto_workers, pending_jobs))
 
@@ -771,26 +854,33 @@ def _render_and_save_video_frame(
     target_size: tuple[int, int],
     background_color: str,
     template_paths: dict[str, Path] | None,
-    bird_box_cache: dict[str, tuple[float, float, float, float] | None],
+    bird_box_cache: _BirdBoxCache,
     bird_box_lock: threading.Lock | None,
     cancel_event: threading.Event | None,
+    stage_stats: profiling.StageStats | None = None,
 ) -> tuple[int, str]:
     _raise_if_cancel_requested(cancel_event, message="视频导出已中断，正在保留已完成帧。")
+    timer = profiling.StageTimer() if stage_stats is not None else None
     rendered = render_video_frame(
         job,
         template_paths=template_paths,
         bird_box_cache=bird_box_cache,
         bird_box_lock=bird_box_lock,
+        timer=timer,
     )
     try:
         _raise_if_cancel_requested(cancel_event, message="视频导出已中断，正在保留已完成帧。")
         frame_path = frames_dir / f"frame_{index:06d}.png"
+        encode_started = time.perf_counter()
         _save_normalized_temp_frame(
             rendered,
             frame_path,
             target_size,
             background_color=background_color,
         )
+        if timer is not None:
+            timer.record(profiling.STAGE_ENCODE, time.perf_counter() - encode_started)
+            stage_stats.add(timer.spans)
     finally:
         try:
             rendered.close()
@@ -831,6 +921,7 @@ def build_ffmpeg_command(
 
 def _codec_args_for_options(options: VideoExportOptions) -> list[str]:
     validated = validate_video_export_options(options)
+    thread_args = ["-threads", str(validated.encoder_threads)] if validated.encoder_threads > 0 else []
     if validated.codec == "h265":
         return [
             "-c:v",
@@ -843,6 +934,7 @@ def _codec_args_for_options(options: VideoExportOptions) -> list[str]:
             "yuv420p",
             "-tag:v",
             "hvc1",
+            *thread_args,
         ]
     return [
         "-c:v",
@@ -853,6 +945,7 @@ def _codec_args_for_options(options: VideoExportOptions) -> list[str]:
         str(validated.crf),
         "-pix_fmt",
         "yuv420p",
+        *thread_args,
     ]
 
 
@@ -1016,6 +1109,12 @@ def export_video(
     validated = validate_video_export_options(options)
     if not jobs:
         raise ValueError("没有可用于生成视频的图片。")
+    # 渲染线程与检测器进程分摊 CPU 预算；ffmpeg 在全部帧渲染完成后才运行，独占整份预算。
+    budget = plan_cpu_budget(validated.cpu_budget, render_workers=validated.render_workers)
+    if validated.encoder_threads <= 0:
+        validated = replace(validated, encoder_threads=budget.encoder_threads)
+    # 视频帧的鸟检测走共享检测进程（shared_bird_detection_batcher）
+    editor_core.shared_bird_detector_process().set_threads(budget.detector_threads)
 
     ffmpeg_path = find_ffmpeg_executable()
     if ffmpeg_path is None:
@@ -1026,8 +1125,9 @@ def export_video(
     if output_path.exists() and not validated.overwrite:
         raise FileExistsError(f"输出文件已存在: {output_path}")
 
-    bird_box_cache: dict[str, tuple[float, float, float, float] | None] = {}
+    bird_box_cache: _BirdBoxCache = {}
     bird_box_lock = threading.Lock()
+    stage_stats = profiling.StageStats()
     total = len(jobs)
     work_dir = _create_video_work_dir(output_path)
     frames_dir = work_dir / "frames"
@@ -1046,12 +1146,15 @@ def export_video(
             message=f"正在渲染首帧 1/{total}: {first_job.path.name}",
         )
         _raise_if_cancel_requested(cancel_event, message="视频导出已中断，尚未开始渲染。")
+        first_timer = profiling.StageTimer()
         first_frame = render_video_frame(
             first_job,
             template_paths=template_paths,
             bird_box_cache=bird_box_cache,
             bird_box_lock=bird_box_lock,
+            timer=first_timer,
         )
+        stage_stats.add(first_timer.spans)
         try:
             _raise_if_cancel_requested(cancel_event, message="视频导出已中断，正在保留已完成帧。")
             target_size = resolve_target_frame_size(validated, first_frame.size)
@@ -1076,10 +1179,13 @@ def export_video(
 
         remaining_jobs = jobs[1:]
         if remaining_jobs:
-            render_workers = resolve_video_render_workers(validated.render_workers, len(remaining_jobs))
+            render_workers = resolve_video_render_workers(validated.render_workers, len(remaining_jobs), budget)
             _log.info(
-                "video export parallel render workers=%s remaining_frames=%s target_size=%sx%s",
+                "video export parallel render workers=%s detector_threads=%s encoder_threads=%s"
+                " remaining_frames=%s target_size=%sx%s",
                 render_workers,
+                budget.detector_threads,
+                validated.encoder_threads,
                 len(remaining_jobs),
                 target_size[0],
                 target_size[1],
@@ -1108,6 +1214,7 @@ def export_video(
                         bird_box_cache=bird_box_cache,
                         bird_box_lock=bird_box_lock,
                         cancel_event=cancel_event,
+                        stage_stats=stage_stats,
                     )
                     futures[future] = (index, job.path.name)
 
@@ -1132,6 +1239,7 @@ def export_video(
             finally:
                 executor.shutdown(wait=True, cancel_futures=True)
 
+        _log.info("video export frame stage timings: %s", stage_stats.format_line())
         _raise_if_cancel_requested(cancel_event, message="视频导出已中断，正在停止视频编码。")
         _emit_progress(
             progress_callback,
@@ -0,0 +1,246 @@
+"""Hot-folder watching for ``birdstamp watch``.
+
+``FolderWatcher`` reports image files that appeared (or changed) under one or
+more directories once they have stopped growing. It uses ``watchdog``
+(inotify / FSEvents / ReadDirectoryChangesW) when installed and falls back to
+polling with ``iter_inputs`` otherwise.
+"""
+from __future__ import annotations
+
+import logging
+import os
+import threading
+import time
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Iterable, Iterator
+
+from birdstamp.discover import _normalize_extensions, is_excluded_path, iter_inputs
+
+_log = logging.getLogger(__name__)
+
+DEFAULT_SETTLE_SECONDS = 0.5
+DEFAULT_POLL_INTERVAL = 1.0
+_TICK_SECONDS = 0.1
+
+
+@dataclass(slots=True)
+class _Pending:
+    size: int
+    mtime_ns: int
+    since: float
+    closed: bool = False
+
+
+class FolderWatcher:
+    """Collect new/changed image files under ``roots`` and hand them out once stable.
+
+    A file is "stable" when its size and mtime have not changed for
+    ``settle_seconds`` (partially copied files keep growing), or immediately
+    after a close-after-write event where the backend reports one.
+    """
+
+    def __init__(
+        self,
+        roots: Iterable[Path],
+        *,
+        recursive: bool = True,
+        extensions: Iterable[str] | None = None,
+        ignore: Iterable[str] | None = None,
+        exclude_dirs: Iterable[Path] | None = None,
+        settle_seconds: float = DEFAULT_SETTLE_SECONDS,
+        poll_interval: float = DEFAULT_POLL_INTERVAL,
+        force_polling: bool = False,
+    ) -> None:
+        self.roots = [Path(root).resolve(strict=False) for root in roots]
+        self.recursive = recursive
+        self._exts = _normalize_extensions(extensions)
+        self._ignore = [p for p in (ignore or ()) if p]
+        self._exclude_dirs = [Path(p) for p in (exclude_dirs or ())]
+        self.settle_seconds = max(0.0, float(settle_seconds))
+        self.poll_interval = max(_TICK_SECONDS, float(poll_interval))
+        self._force_polling = force_polling
+        self._pending: dict[Path, _Pending] = {}
+        self._known: dict[Path, tuple[int, int]] = {}
+        self._lock = threading.Lock()
+        self._observer = None
+        self._last_poll = 0.0
+        self.backend = "polling"
+
+    # -- lifecycle ---------------------------------------------------------
+
+    def start(self, *, include_existing: bool = False) -> None:
+        """Start watching; ``include_existing`` also queues files already present."""
+        for root in self.roots:
+            for path in self._walk(root):
+                signature = self._stat(path)
+                if signature is None:
+                    continue
+                self._known[path] = signature
+                if include_existing:
+                    self.notify(path)
+        if not self._force_polling:
+            self._observer = self._start_observer()
+        self.backend = "polling" if self._observer is None else "watchdog"
+        self._last_poll = time.monotonic()
+
+    def stop(self) -> None:
+        """Stop the event observer; safe to call more than once."""
+        observer, self._observer = self._observer, None
+        if observer is None:
+            return
+        try:
+            observer.stop()
+            observer.join(timeout=2.0)
+        except Exception as exc:
+            _log.debug("watch observer stop failed: %s", exc)
+
+    def __enter__(self) -> "FolderWatcher":
+        return self
+
+    def __exit__(self, *exc_info: object) -> None:
+        self.stop()
+
+    # -- events ------------------------------------------------------------
+
+    def notify(self, path: Path, *, closed: bool = False) -> None:
+        """Record that ``path`` was created/modified (called from observer threads)."""
+        # 与 roots 一致地解析目录部分（符号链接目录），文件本身不跟随链接
+        path = Path(path)
+        path = path.parent.resolve(strict=False) / path.name
+        if path.suffix.lower() not in self._exts or not self._accepts(path):
+            return
+        signature = self._stat(path)
+        if signature is None:
+            return
+        with self._lock:
+            pending = self._pending.get(path)
+            if pending is None or (pending.size, pending.mtime_ns) != signature:
+                self._pending[path] = _Pending(signature[0], signature[1], time.monotonic(), closed)
+            elif closed:
+                pending.closed = True
+
+    def _accepts(self, path: Path) -> bool:
+        for root in self.roots:
+            try:
+                rel_parts = path.relative_to(root).parts
+            except ValueError:
+                continue
+            if not self.recursive and len(rel_parts) > 1:
+                continue
+            if not is_excluded_path(path, root, ignore=self._ignore, exclude_dirs=self._exclude_dirs):
+                return True
+        return False
+
+    # -- readiness -----------------------------------------------------------
+
+    def poll_ready(self) -> list[Path]:
+        """Return files that became stable since the last call (sorted)."""
+        now = time.monotonic()
+        if self._observer is None and now - self._last_poll >= self.poll_interval:
+            self._last_poll = now
+            self._scan_changes()
+
+        ready: list[Path] = []
+        with self._lock:
+            candidates = list(self._pending.items())
+        for path, pending in candidates:
+            signature = self._stat(path)
+            with self._lock:
+                if self._pending.get(path) is not pending:
+                    continue
+                if signature is None:
+                    del self._pending[path]
+                    continue
+                if signature != (pending.size, pending.mtime_ns):
+                    self._pending[path] = _Pending(signature[0], signature[1], now)
+                    continue
+                if pending.closed or now - pending.since >= self.settle_seconds:
+                    del self._pending[path]
+                    self._known[path] = signature
+                    ready.append(path)
+        ready.sort()
+        return ready
+
+    def iter_ready(self, stop_event: threading.Event | None = None) -> Iterator[list[Path]]:
+        """Yield batches of stable files until ``stop_event`` is set."""
+        stop_event = stop_event or threading.Event()
+        while not stop_event.is_set():
+            ready = self.poll_ready()
+            if ready:
+                yield ready
+                continue
+            stop_event.wait(_TICK_SECONDS)
+
+    # -- helpers -------------------------------------------------------------
+
+    def _walk(self, root: Path) -> Iterator[Path]:
+        return iter_inputs(
+            root,
+            recursive=self.recursive,
+            extensions=self._exts,
+            ignore=self._ignore,
+            exclude_dirs=self._exclude_dirs,
+        )
+
+    def _scan_changes(self) -> None:
+        for root in self.roots:
+            for path in self._walk(root):
+                signature = self._stat(path)
+                if signature is not None and self._known.get(path) != signature:
+                    self._known[path] = signature
+                    self.notify(path)
+
+    @staticmethod
+    def _stat(path: Path) -> tuple[int, int] | None:
+        try:
+            stat = os.stat(path)
+        except OSError:
+            return None
+        return int(stat.st_size), int(stat.st_mtime_ns)
+
+    def _start_observer(self):
+        try:
+            from watchdog.events import FileSystemEventHandler
+            from watchdog.observers import Observer
+        except Exception:
+            _log.info("watchdog not installed; watching by polling every %.1fs", self.poll_interval)
+            return None
+
+        watcher = self
+
+        class _Handler(FileSystemEventHandler):
+            def on_created(self, event):  # noqa: D401 - watchdog callback
+                if not event.is_directory:
+                    watcher.notify(Path(event.src_path))
+
+            def on_modified(self, event):
+                if not event.is_directory:
+                    watcher.notify(Path(event.src_path))
+
+            def on_moved(self, event):
+                if not event.is_directory:
+                    watcher.notify(Path(event.dest_path))
+
+            def on_closed(self, event):
+                if not event.is_directory:
+                    watcher.notify(Path(event.src_path), closed=True)
+
+        try:
+            observer = Observer()
+            handler = _Handler()
+            for root in self.roots:
+                observer.schedule(handler, str(root), recursive=self.recursive)
+            observer.daemon = True
+            observer.start()
+        except Exception as exc:
+            _log.warning("file-system events unavailable (%s); falling back to polling", exc)
+            return None
+        return observer
+
+
+__all__ = [
+    "DEFAULT_POLL_INTERVAL",
+    "DEFAULT_SETTLE_SECONDS",
+    "FolderWatcher",
+]
@@ -1,6 +1,7 @@
 from __future__ import annotations
 
 import argparse
+import multiprocessing
 import sys
 import traceback
 from pathlib import Path
@@ -87,4 +88,6 @@ def main() -> None:
 
 
 if __name__ == "__main__":
+    # 打包版（PyInstaller）中鸟体检测子进程需要
+    multiprocessing.freeze_support()
     main()
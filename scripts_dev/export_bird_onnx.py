@@ -0,0 +1,42 @@
+"""Export the bundled YOLO .pt model to ONNX for the torch-free detector backend.
+
+Run once on a machine with ultralytics installed:
+
+    python scripts_dev/export_bird_onnx.py            # models/yolo11n.pt -> models/yolo11n.onnx
+
+The model is exported with a dynamic batch axis so batched bird detection
+(``BirdDetectionBatcher``) runs several images per session call.
+"""
+from __future__ import annotations
+
+import argparse
+import shutil
+from pathlib import Path
+
+
+def _project_root() -> Path:
+    return Path(__file__).resolve().parents[1]
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--model", default="yolo11n.pt", help="Model file name in models/ (default: yolo11n.pt).")
+    parser.add_argument("--imgsz", type=int, default=640, help="Model input size (default: 640).")
+    args = parser.parse_args()
+
+    from ultralytics import YOLO
+
+    models_dir = _project_root() / "models"
+    source = models_dir / args.model
+    if not source.is_file():
+        parser.error(f"model not found: {source}")
+    exported = Path(YOLO(str(source)).export(format="onnx", imgsz=args.imgsz, dynamic=True, simplify=True))
+    target = models_dir / f"{source.stem}.onnx"
+    if exported.resolve() != target.resolve():
+        shutil.move(str(exported), target)
+    print(f"exported: {target}")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
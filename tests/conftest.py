@@ -0,0 +1,44 @@
+import copy
+
+import pytest
+from PIL import Image
+
+
+@pytest.fixture
+def make_options(tmp_path):
+    """Factory for small JPEG ``RenderOptions`` on the built-in template; keyword arguments override fields."""
+    from birdstamp.batch_render import RenderOptions
+    from birdstamp.gui.editor_template import default_template_payload
+
+    def _make(**overrides) -> RenderOptions:
+        fields = {
+            "template_payload": default_template_payload(),
+            "template_name": "default",
+            "out_dir": tmp_path / "out",
+            "out_ext": "jpg",
+            "pil_format": "JPEG",
+            "quality": 85,
+            "max_long_edge": 320,
+            "name_template": "{stem}.{ext}",
+            "skip_existing": False,
+        }
+        fields.update(overrides)
+        return RenderOptions(**fields)
+
+    return _make
+
+
+@pytest.fixture
+def photos(tmp_path, monkeypatch):
+    """Folder of three 320x240 JPEGs for CLI runs, with the default config and no CPU budget override."""
+    from birdstamp import cli
+    from birdstamp.config import DEFAULT_CONFIG
+    from birdstamp.cpu_budget import CPU_BUDGET_ENV_VAR
+
+    monkeypatch.delenv(CPU_BUDGET_ENV_VAR, raising=False)
+    monkeypatch.setattr(cli, "load_config", lambda: copy.deepcopy(DEFAULT_CONFIG))
+    folder = tmp_path / "photos"
+    folder.mkdir()
+    for index in range(3):
+        Image.new("RGB", (320, 240), (index * 60, 90, 40)).save(folder / f"p{index}.jpg")
+    return folder
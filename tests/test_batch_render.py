@@ -0,0 +1,143 @@
+import threading
+
+import pytest
+from PIL import Image
+
+from birdstamp import batch_render
+
+
+def _sources(tmp_path, count: int = 4):
+    sources = []
+    for index in range(count):
+        path = tmp_path / f"p{index}.jpg"
+        Image.new("RGB", (480, 320), (index * 40, 90, 40)).save(path)
+        sources.append(path)
+    return sources
+
+
+@pytest.mark.parametrize("stage", ["_decode_stage", "_render_stage", "_encode_stage"])
+def test_pipeline_reports_a_raising_stage_instead_of_hanging(monkeypatch, tmp_path, make_options, stage) -> None:
+    sources = _sources(tmp_path)
+    original = getattr(batch_render, stage)
+
+    def _flaky(*args, **kwargs):
+        first = args[0]
+        source = first if stage == "_decode_stage" else first.source
+        if source.name == "p1.jpg":
+            raise RuntimeError(f"{stage} exploded")
+        return original(*args, **kwargs)
+
+    monkeypatch.setattr(batch_render, stage, _flaky)
+    settings = batch_render.PipelineSettings(decode_threads=2, render_threads=2, encode_threads=2)
+    results = list(
+        batch_render.iter_pipeline_results(((s, {}) for s in sources), make_options(), settings=settings)
+    )
+
+    assert [r.source.name for r in results] == [s.name for s in sources]
+    assert [r.status for r in results] == ["ok", "failed", "ok", "ok"]
+    assert f"{stage} exploded" in results[1].error
+
+
+def test_process_pool_matches_inline_rendering(tmp_path, make_options) -> None:
+    sources = _sources(tmp_path, 6)
+    inline = list(batch_render.iter_render_results(((s, {}) for s in sources), make_options(out_dir=tmp_path / "inline"), jobs=1))
+    pooled = list(batch_render.iter_render_results(((s, {}) for s in sources), make_options(out_dir=tmp_path / "pooled"), jobs=2))
+
+    def _summary(results):
+        return [(r.source, r.status, r.output.name) for r in results]
+
+    assert _summary(pooled) == _summary(inline)
+    assert [r.source for r in pooled] == sources and {r.status for r in pooled} == {"ok"}
+    assert all(p.output.read_bytes() == i.output.read_bytes() for p, i in zip(pooled, inline))
+
+
+def test_process_pool_keeps_two_tasks_per_worker_in_flight(tmp_path, make_options) -> None:
+    sources = _sources(tmp_path, 8)
+    pulled = []
+
+    def _tasks():
+        for source in sources:
+            pulled.append(source)
+            yield (source, {})
+
+    results = batch_render.iter_render_results(_tasks(), make_options(), jobs=2)
+    in_flight = [len(pulled) - index for index, _result in enumerate(results)]
+
+    # jobs * 2 tasks are submitted before the first result is collected, then one per result
+    assert in_flight == [4, 4, 4, 4, 4, 3, 2, 1]
+
+
+def test_process_pool_reports_a_failed_task_and_keeps_going(tmp_path, make_options) -> None:
+    sources = _sources(tmp_path, 3)
+    # metadata that cannot be sent to a worker process fails that task's future only
+    tasks = [(sources[0], {}), (sources[1], {"lock": threading.Lock()}), (sources[2], {})]
+
+    results = list(batch_render.iter_render_results(iter(tasks), make_options(), jobs=2))
+
+    assert [r.source for r in results] == sources
+    assert [r.status for r in results] == ["ok", "failed", "ok"]
+    assert results[1].error.startswith("render worker failed:")
+
+
+def _record_chunks(monkeypatch, *, fail_on: str | None = None) -> list[list[str]]:
+    chunks: list[list[str]] = []
+
+    def _extract_many(paths, mode="auto"):
+        chunks.append([path.name for path in paths])
+        if fail_on is not None and any(path.name == fail_on for path in paths):
+            raise RuntimeError("exiftool exited")
+        return {path: {"name": path.name} for path in paths}
+
+    monkeypatch.setattr(batch_render, "extract_many_with_xmp_priority", _extract_many)
+    return chunks
+
+
+def test_metadata_is_extracted_in_chunks_and_paired_in_order(monkeypatch, tmp_path) -> None:
+    chunks = _record_chunks(monkeypatch)
+    files = [tmp_path / f"p{index}.jpg" for index in range(7)]
+    reported = []
+
+    tasks = list(batch_render.iter_render_tasks(files, chunk_size=3, on_chunk=lambda count, _s: reported.append(count)))
+
+    assert chunks == [["p0.jpg", "p1.jpg", "p2.jpg"], ["p3.jpg", "p4.jpg", "p5.jpg"], ["p6.jpg"]]
+    assert reported == [3, 3, 1]
+    assert tasks == [(f, {"name": f.name}) for f in files]
+
+
+def test_metadata_prefetch_stops_when_the_consumer_does(monkeypatch, tmp_path) -> None:
+    chunks = _record_chunks(monkeypatch)
+    pulled = []
+
+    def _files():
+        for index in range(100):
+            pulled.append(index)
+            yield tmp_path / f"p{index}.jpg"
+
+    tasks = batch_render.iter_render_tasks(_files(), chunk_size=4)
+    assert [next(tasks)[0].name for _ in range(2)] == ["p0.jpg", "p1.jpg"]
+    tasks.close()
+
+    # the chunk being consumed plus the one prefetched, nothing more
+    assert chunks == [["p0.jpg", "p1.jpg", "p2.jpg", "p3.jpg"], ["p4.jpg", "p5.jpg", "p6.jpg", "p7.jpg"]]
+    assert len(pulled) == 8
+    assert not [t for t in threading.enumerate() if t.name.startswith("birdstamp-meta")]
+
+
+def test_failed_metadata_chunk_falls_back_to_per_file_reads(monkeypatch, tmp_path, make_options) -> None:
+    chunks = _record_chunks(monkeypatch, fail_on="p2.jpg")
+    per_file = []
+
+    def _extract_one(path, mode="auto"):
+        per_file.append(path.name)
+        return {}
+
+    monkeypatch.setattr(batch_render, "extract_metadata_with_xmp_priority", _extract_one)
+    sources = _sources(tmp_path, 5)
+
+    tasks = list(batch_render.iter_render_tasks(sources, chunk_size=2))
+    results = list(batch_render.iter_render_results(tasks, make_options()))
+
+    assert len(chunks) == 3
+    assert [meta for _source, meta in tasks] == [{"name": "p0.jpg"}, {"name": "p1.jpg"}, None, None, {"name": "p4.jpg"}]
+    assert per_file == ["p2.jpg", "p3.jpg"]
+    assert [r.status for r in results] == ["ok"] * 5
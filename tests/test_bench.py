@@ -0,0 +1,29 @@
+import pytest
+
+from birdstamp.bench import BenchResult, parse_size, synthetic_image
+
+
+def test_parse_size() -> None:
+    assert parse_size("3000x2000") == (3000, 2000)
+    assert parse_size("640X480") == (640, 480)
+    with pytest.raises(ValueError):
+        parse_size("3000")
+    with pytest.raises(ValueError):
+        parse_size("0x10")
+
+
+def test_synthetic_image_is_deterministic() -> None:
+    first = synthetic_image(320, 200, seed=3)
+    assert first.size == (320, 200)
+    assert first.tobytes() == synthetic_image(320, 200, seed=3).tobytes()
+    assert first.tobytes() != synthetic_image(320, 200, seed=4).tobytes()
+
+
+def test_bench_result_summary() -> None:
+    result = BenchResult(stage="decode", size=(2000, 1000), samples=[0.02, 0.01, 0.03, 0.04])
+    summary = result.summary()
+    assert summary["megapixels"] == 2.0
+    assert summary["iterations"] == 4
+    assert summary["ops_per_sec"] == 40.0
+    assert summary["p50_ms"] == 30.0
+    assert summary["min_ms"] == 10.0
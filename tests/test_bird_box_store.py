@@ -0,0 +1,71 @@
+import os
+import threading
+
+from birdstamp.bird_box_store import BirdBoxStore
+
+
+def _photo(tmp_path, name: str = "a.jpg", payload: bytes = b"raw"):
+    path = tmp_path / name
+    path.write_bytes(payload)
+    return path
+
+
+def test_store_round_trips_boxes_and_no_bird(tmp_path) -> None:
+    store = BirdBoxStore(tmp_path / "boxes.sqlite3")
+    bird, empty = _photo(tmp_path, "bird.jpg"), _photo(tmp_path, "empty.jpg")
+    assert store.get(bird, "m1") == (False, None)
+
+    store.put(bird, "m1", (0.1, 0.2, 0.3, 0.4))
+    store.put(empty, "m1", None)
+
+    assert store.get(bird, "m1") == (True, (0.1, 0.2, 0.3, 0.4))
+    assert store.get(empty, "m1") == (True, None)
+    assert store.get(bird, "m2") == (False, None)  # other model / parameters
+    # a second handle on the same file (e.g. another process) sees the rows
+    assert BirdBoxStore(tmp_path / "boxes.sqlite3").get(bird, "m1") == (True, (0.1, 0.2, 0.3, 0.4))
+
+
+def test_store_misses_and_replaces_changed_files(tmp_path) -> None:
+    store = BirdBoxStore(tmp_path / "boxes.sqlite3")
+    photo = _photo(tmp_path)
+    store.put(photo, "m1", (0.1, 0.1, 0.2, 0.2))
+    stat = photo.stat()
+    os.utime(photo, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000_000))
+
+    assert store.get(photo, "m1") == (False, None)
+    store.put(photo, "m1", (0.5, 0.5, 0.6, 0.6))
+    assert len(store) == 1
+
+
+def test_store_evicts_least_recently_used(tmp_path) -> None:
+    store = BirdBoxStore(tmp_path / "boxes.sqlite3", max_entries=3)
+    photos = [_photo(tmp_path, f"{index}.jpg") for index in range(5)]
+    for photo in photos:
+        store.put(photo, "m1", None)
+
+    assert store.prune() == 2
+    assert [store.get(photo, "m1")[0] for photo in photos] == [False, False, True, True, True]
+
+
+def test_store_is_safe_across_threads(tmp_path) -> None:
+    store = BirdBoxStore(tmp_path / "boxes.sqlite3")
+    photos = [_photo(tmp_path, f"{index}.jpg") for index in range(40)]
+    errors: list[BaseException] = []
+
+    def _worker(offset: int) -> None:
+        try:
+            for index, photo in enumerate(photos):
+                store.put(photo, "m1", (index / 100, 0.0, 1.0, 1.0))
+                assert store.get(photos[(index + offset) % len(photos)], "m1")[0] in (True, False)
+        except BaseException as exc:
+            errors.append(exc)
+
+    threads = [threading.Thread(target=_worker, args=(offset,)) for offset in range(6)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert not errors
+    assert len(store) == len(photos)
+    assert store.get(photos[7], "m1") == (True, (0.07, 0.0, 1.0, 1.0))
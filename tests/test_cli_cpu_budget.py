@@ -0,0 +1,69 @@
+import logging
+
+import pytest
+from typer.testing import CliRunner
+
+from birdstamp import batch_render, cli, serve
+
+
+def _render(folder, *args: str):
+    return CliRunner().invoke(
+        cli.app,
+        ["render", str(folder), "--out", str(folder.parent / "out"), "--no-manifest", "--no-bird-cache", *args],
+    )
+
+
+def test_budget_sizes_the_worker_pool(photos, monkeypatch) -> None:
+    pools: list[int] = []
+    real_pool = batch_render.ProcessPoolExecutor
+
+    def _recording_pool(*args, **kwargs):
+        pools.append(kwargs["max_workers"])
+        return real_pool(*args, **kwargs)
+
+    monkeypatch.setattr(batch_render, "ProcessPoolExecutor", _recording_pool)
+    result = _render(photos, "--cpu-budget", "3")
+
+    assert result.exit_code == 0, result.output
+    assert "success=3" in result.output
+    assert pools == [2]  # 3 cores: 1 for the detector, 2 render processes
+
+
+def test_budget_sizes_the_pipeline_stages(photos, monkeypatch) -> None:
+    seen = []
+    real_pipeline = batch_render.iter_pipeline_results
+
+    def _recording_pipeline(tasks, options, *, settings):
+        seen.append(settings)
+        return real_pipeline(tasks, options, settings=settings)
+
+    monkeypatch.setattr(batch_render, "iter_pipeline_results", _recording_pipeline)
+    result = _render(photos, "--pipeline", "--cpu-budget", "8")
+
+    assert result.exit_code == 0, result.output
+    settings = seen[0]
+    assert (settings.decode_threads, settings.render_threads, settings.encode_threads) == (1, 4, 1)
+
+
+def test_explicit_jobs_over_budget_are_kept_with_a_warning(photos, monkeypatch, caplog) -> None:
+    monkeypatch.setattr(batch_render, "iter_render_results", lambda tasks, options, **kw: iter(()))
+    with caplog.at_level(logging.WARNING, logger="birdstamp"):
+        result = _render(photos, "--cpu-budget", "2", "--jobs", "4")
+
+    assert result.exit_code == 0, result.output
+    assert "exceed the CPU budget of 2 cores" in caplog.text
+
+
+def test_serve_workers_follow_the_budget(photos, monkeypatch) -> None:
+    started: list[int] = []
+
+    def _no_server(service, **_kwargs):
+        started.append(service.workers)
+        raise OSError("not in tests")
+
+    monkeypatch.setattr(serve.RenderService, "warm_up", lambda self: None)
+    monkeypatch.setattr(serve, "create_server", _no_server)
+    result = CliRunner().invoke(cli.app, ["serve", "--port", "0", "--cpu-budget", "1"])
+
+    assert result.exit_code == 1
+    assert started == [1]
@@ -0,0 +1,43 @@
+import json
+
+from typer.testing import CliRunner
+
+from birdstamp import cli
+from birdstamp.gui.editor_template import default_template_payload
+
+
+def _template_file(folder, name: str):
+    folder.mkdir(parents=True, exist_ok=True)
+    path = folder / name
+    path.write_text(json.dumps(default_template_payload(name="default")), encoding="utf-8")
+    return path
+
+
+def _render(folder, *templates):
+    args = ["render", str(folder), "--out", str(folder.parent / "out"), "--no-manifest", "--no-bird-cache"]
+    for template in templates:
+        args += ["--template", str(template)]
+    return CliRunner().invoke(cli.app, args)
+
+
+def test_templates_sharing_a_name_get_distinct_variants(photos, tmp_path) -> None:
+    copy = _template_file(tmp_path / "templates", "copy_of_default.json")
+
+    result = _render(photos, _template_file(tmp_path / "a", "mine.json"), copy)
+
+    assert result.exit_code == 0, result.output
+    assert "success=6" in result.output
+    outputs = sorted(path.name for path in (tmp_path / "out").iterdir() if path.suffix == ".jpg")
+    assert len(outputs) == 6
+    assert "p0__banner__mine.jpg" in outputs and "p0__banner__copy_of_default.jpg" in outputs
+
+
+def test_templates_sharing_a_name_and_stem_are_numbered(photos, tmp_path) -> None:
+    first = _template_file(tmp_path / "a", "default.json")
+    second = _template_file(tmp_path / "b", "default.json")
+
+    result = _render(photos, first, second)
+
+    assert result.exit_code == 0, result.output
+    outputs = sorted(path.name for path in (tmp_path / "out").glob("p0*.jpg"))
+    assert outputs == ["p0__banner__default-2.jpg", "p0__banner__default.jpg"]
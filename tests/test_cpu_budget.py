@@ -0,0 +1,29 @@
+from birdstamp.cpu_budget import CPU_BUDGET_ENV_VAR, plan_cpu_budget, resolve_cpu_budget
+
+
+def test_plan_splits_budget_between_render_and_detector() -> None:
+    budget = plan_cpu_budget(8)
+    assert (budget.total, budget.render_workers, budget.detector_threads, budget.encoder_threads) == (8, 6, 2, 8)
+    assert plan_cpu_budget(32).detector_threads == 4  # capped
+    assert plan_cpu_budget(1).render_workers == 1 and plan_cpu_budget(1).detector_threads == 1
+    assert plan_cpu_budget(8, detect=False).render_workers == 8
+    assert plan_cpu_budget(8, detect=False).detector_threads == 0
+
+
+def test_plan_with_pinned_render_workers_gives_detector_the_rest() -> None:
+    budget = plan_cpu_budget(8, render_workers=7)
+    assert (budget.render_workers, budget.detector_threads) == (7, 1)
+    assert plan_cpu_budget(8, render_workers=2).detector_threads == 4
+    assert plan_cpu_budget(8, render_workers=12).detector_threads == 1
+    # inline detection: each worker's share of the budget
+    assert plan_cpu_budget(8, render_workers=4).inline_detector_threads == 2
+    assert plan_cpu_budget(8, render_workers=1).inline_detector_threads == 8
+
+
+def test_budget_comes_from_environment_when_not_given(monkeypatch) -> None:
+    monkeypatch.setenv(CPU_BUDGET_ENV_VAR, "6")
+    assert resolve_cpu_budget() == 6
+    assert resolve_cpu_budget(0) == 6
+    assert resolve_cpu_budget(3) == 3
+    monkeypatch.setenv(CPU_BUDGET_ENV_VAR, "many")
+    assert resolve_cpu_budget() >= 1
@@ -0,0 +1,401 @@
+import threading
+
+import pytest
+from PIL import Image
+
+from birdstamp.gui import editor_core
+from birdstamp.gui.editor_core import BirdDetectionBatcher, LazyBirdBox, compute_crop_plan
+
+
+def test_image_center_mode_never_detects(monkeypatch) -> None:
+    def _fail(_image):
+        raise AssertionError("bird detection must not run in image mode")
+
+    monkeypatch.setattr(editor_core, "detect_primary_bird_box", _fail)
+    crop_box, outer_pad = compute_crop_plan(
+        Image.new("RGB", (1200, 800)), {}, ratio=1.0, center_mode=editor_core.CENTER_MODE_IMAGE
+    )
+    assert crop_box is not None
+    assert outer_pad == (0, 0, 0, 0)
+
+
+def test_bird_center_mode_detects_once_through_provider() -> None:
+    calls = []
+
+    def _provider(image):
+        calls.append(image.size)
+        return (0.70, 0.40, 0.90, 0.60)
+
+    shared = LazyBirdBox(detector=_provider)
+    image = Image.new("RGB", (1200, 800))
+    for _ in range(3):
+        crop_box, _outer_pad = compute_crop_plan(
+            image, {}, ratio=1.0, center_mode=editor_core.CENTER_MODE_BIRD, bird_box_provider=shared
+        )
+        assert crop_box is not None and crop_box[0] > 0.5
+    assert calls == [(1200, 800)]
+    assert shared.resolved
+
+
+class _FakeTensor:
+    def __init__(self, values) -> None:
+        self._values = values
+
+    def cpu(self):
+        return self
+
+    def numpy(self):
+        return self._values
+
+
+class _RedBlobModel:
+    """Stands in for YOLO: reports the bounding box of pure-red pixels as a bird."""
+
+    names = {0: "bird"}
+
+    def __init__(self) -> None:
+        self.inputs: list[tuple[int, int]] = []
+        self.batches: list[int] = []
+
+    def predict(self, *, source, **kwargs):
+        if isinstance(source, list):
+            self.batches.append(len(source))
+            return [self._predict_one(item) for item in source]
+        self.batches.append(1)
+        return [self._predict_one(source)]
+
+    def _predict_one(self, source):
+        import numpy as np
+
+        self.inputs.append(source.size)
+        pixels = np.asarray(source.convert("RGB")).astype(int)
+        mask = (pixels[..., 0] > 128) & (pixels[..., 1] < 100) & (pixels[..., 2] < 100)
+        ys, xs = np.nonzero(mask)
+        result = type("Result", (), {})()
+        if xs.size == 0:
+            result.boxes = type("Boxes", (), {"xyxy": _FakeTensor(np.zeros((0, 4)))})()
+            return result
+        xyxy = np.array([[xs.min(), ys.min(), xs.max() + 1, ys.max() + 1]], dtype=float)
+        result.boxes = type(
+            "Boxes", (), {"xyxy": _FakeTensor(xyxy), "cls": _FakeTensor(np.array([0])), "conf": _FakeTensor(np.array([0.9]))}
+        )()
+        return result
+
+
+def test_small_bird_is_refined_on_a_crop(monkeypatch) -> None:
+    pytest.importorskip("numpy")
+    model = _RedBlobModel()
+    monkeypatch.setattr(editor_core, "_load_bird_detector", lambda: (model, {0}))
+    image = Image.new("RGB", (4000, 3000), (40, 90, 40))
+    image.paste((220, 20, 20), (3001, 2003, 3047, 2041))
+
+    box = editor_core._detect_primary_bird_box(image)
+
+    assert model.inputs[0] == (640, 480)
+    assert len(model.inputs) == 2 and max(model.inputs[1]) <= 640
+    expected = (3001 / 4000, 2003 / 3000, 3047 / 4000, 2041 / 3000)
+    assert all(abs(a - b) < 2.0 / 4000 for a, b in zip(box, expected))
+
+
+def test_large_bird_skips_refine_pass(monkeypatch) -> None:
+    pytest.importorskip("numpy")
+    model = _RedBlobModel()
+    monkeypatch.setattr(editor_core, "_load_bird_detector", lambda: (model, {0}))
+    image = Image.new("RGB", (2000, 1500), (40, 90, 40))
+    image.paste((220, 20, 20), (600, 400, 1400, 1100))
+
+    box = editor_core._detect_primary_bird_box(image)
+
+    assert len(model.inputs) == 1
+    assert abs(box[0] - 0.3) < 0.01 and abs(box[2] - 0.7) < 0.01
+
+
+def test_batched_detection_matches_single_image_detection(monkeypatch) -> None:
+    pytest.importorskip("numpy")
+    images = []
+    for index, (size, blob) in enumerate([
+        ((4000, 3000), (3001, 2003, 3047, 2041)),  # small: refined
+        ((2000, 1500), (600, 400, 1400, 1100)),  # large: coarse only
+        ((1200, 800), None),  # no bird
+        ((3000, 4000), (100, 150, 140, 190)),  # small: refined
+    ]):
+        image = Image.new("RGB", size, (40, 90, 40 + index))
+        if blob is not None:
+            image.paste((220, 20, 20), blob)
+        images.append(image)
+    single_model = _RedBlobModel()
+    monkeypatch.setattr(editor_core, "_load_bird_detector", lambda: (single_model, {0}))
+    expected = [editor_core._detect_primary_bird_box(image) for image in images]
+
+    batch_model = _RedBlobModel()
+    monkeypatch.setattr(editor_core, "_load_bird_detector", lambda: (batch_model, {0}))
+    boxes = editor_core.detect_primary_bird_boxes(images)
+
+    assert boxes == expected
+    assert expected[2] is None and None not in (expected[0], expected[1], expected[3])
+    # one coarse call over all four images, one refine call over the two small birds
+    assert batch_model.batches == [4, 2]
+
+
+def test_batcher_groups_concurrent_requests_and_routes_results() -> None:
+    calls: list[int] = []
+    release = threading.Event()
+
+    def _detector(images):
+        calls.append(len(images))
+        release.wait(5)
+        return [(image.width / 1000.0, 0.0, 1.0, 1.0) for image in images]
+
+    results: dict[int, tuple] = {}
+    with BirdDetectionBatcher(batch_size=4, max_wait=0.2, detector=_detector) as batcher:
+        def _worker(width: int) -> None:
+            results[width] = batcher(Image.new("RGB", (width, 10)))
+
+        threads = [threading.Thread(target=_worker, args=(100 + index,)) for index in range(10)]
+        for thread in threads:
+            thread.start()
+        release.set()
+        for thread in threads:
+            thread.join(5)
+
+    assert sorted(results) == list(range(100, 110))
+    assert all(box[0] == width / 1000.0 for width, box in results.items())
+    assert sum(calls) == 10 and max(calls) <= 4 and len(calls) < 10
+    assert batcher.images == 10
+
+
+def test_batcher_failure_reaches_every_caller_in_the_batch() -> None:
+    def _detector(_images):
+        raise RuntimeError("model exploded")
+
+    with BirdDetectionBatcher(batch_size=2, max_wait=0.0, detector=_detector) as batcher:
+        future = batcher.submit(Image.new("RGB", (8, 8)))
+        with pytest.raises(RuntimeError):
+            future.result(5)
+        # only a detector that could not run counts as "no bird"; other errors are not swallowed
+        with pytest.raises(RuntimeError, match="model exploded"):
+            LazyBirdBox(Image.new("RGB", (8, 8)), batcher).get()
+
+
+def test_lazy_bird_box_treats_only_detection_errors_as_no_bird() -> None:
+    def _unavailable(_image):
+        raise editor_core.BirdDetectionError("model unavailable")
+
+    assert LazyBirdBox(Image.new("RGB", (8, 8)), _unavailable).get() is None
+
+    def _broken(_image):
+        raise TypeError("bad detector")
+
+    with pytest.raises(TypeError):
+        LazyBirdBox(Image.new("RGB", (8, 8)), _broken).get()
+
+
+def test_stored_provider_detects_each_photo_once(monkeypatch, tmp_path) -> None:
+    from birdstamp.bird_box_store import BirdBoxStore
+
+    store = BirdBoxStore(tmp_path / "boxes.sqlite3")
+    photo = tmp_path / "a.jpg"
+    photo.write_bytes(b"raw")
+    calls = []
+
+    def _detector(image):
+        calls.append(image.size)
+        return (0.2, 0.2, 0.4, 0.4)
+
+    image = Image.new("RGB", (60, 40))
+    assert editor_core.stored_bird_box_provider(photo, store, _detector)(image) == (0.2, 0.2, 0.4, 0.4)
+    assert editor_core.stored_bird_box_provider(photo, store, _detector)(image) == (0.2, 0.2, 0.4, 0.4)
+    assert len(calls) == 1
+
+    # a detector that could not run is not remembered as "no bird"; a real "no bird" is
+    other = tmp_path / "b.jpg"
+    other.write_bytes(b"raw")
+
+    def _unavailable(_image):
+        raise editor_core.BirdDetectionError("model missing")
+
+    assert editor_core.stored_bird_box_provider(other, store, _unavailable)(image) is None
+    assert store.get(other, editor_core.bird_detector_cache_key()) == (False, None)
+    assert editor_core.stored_bird_box_provider(other, store, lambda _image: None)(image) is None
+    assert store.get(other, editor_core.bird_detector_cache_key()) == (True, None)
+
+
+def test_stored_provider_keeps_a_failure_out_while_another_thread_succeeds(tmp_path, monkeypatch) -> None:
+    pytest.importorskip("numpy")
+    from birdstamp.bird_box_store import BirdBoxStore
+
+    class _FlakyModel(_RedBlobModel):
+        def predict(self, *, source, **kwargs):
+            if source.size == (64, 48):
+                failed.set()
+                raise RuntimeError("CUDA out of memory")
+            return super().predict(source=source, **kwargs)
+
+    failed = threading.Event()
+    succeeded = threading.Event()
+    monkeypatch.setattr(editor_core, "_load_bird_detector", lambda: (_FlakyModel(), {0}))
+    monkeypatch.setattr(editor_core, "_preferred_bird_detect_device", lambda: "cpu")
+    store = BirdBoxStore(tmp_path / "boxes.sqlite3")
+    bad, good = tmp_path / "bad.jpg", tmp_path / "good.jpg"
+    bad.write_bytes(b"raw")
+    good.write_bytes(b"raw")
+    good_image = Image.new("RGB", (200, 100), (40, 90, 40))
+    good_image.paste((220, 20, 20), (50, 25, 150, 75))
+
+    def _detect_then_wait(image):
+        try:
+            return editor_core._detect_primary_bird_box(image)
+        finally:
+            succeeded.wait(5)  # the other thread's success clears the shared error message meanwhile
+
+    results = []
+
+    def _render_bad() -> None:
+        results.append(editor_core.stored_bird_box_provider(bad, store, _detect_then_wait)(Image.new("RGB", (64, 48))))
+
+    thread = threading.Thread(target=_render_bad)
+    thread.start()
+    assert failed.wait(5)
+    assert editor_core.stored_bird_box_provider(good, store)(good_image) is not None
+    assert editor_core.get_bird_detector_error_message() == ""
+    succeeded.set()
+    thread.join(5)
+
+    key = editor_core.bird_detector_cache_key()
+    assert results == [None]
+    assert store.get(bad, key) == (False, None)
+    assert store.get(good, key)[0]
+
+
+class _FakeOnnxSession:
+    """Fixed YOLO-style output (1, 4 + classes, anchors) in 640x640 letterbox coordinates."""
+
+    def __init__(self, prediction, *, batch_axis="batch") -> None:
+        self.prediction = prediction
+        self.batch_axis = batch_axis
+        self.batches: list[tuple] = []
+
+    def get_inputs(self):
+        return [type("Input", (), {"name": "images", "shape": [self.batch_axis, 3, 640, 640]})()]
+
+    def get_modelmeta(self):
+        return type("Meta", (), {"custom_metadata_map": {"names": "{0: 'person', 1: 'bird'}", "imgsz": "[640, 640]"}})()
+
+    def run(self, _outputs, feed):
+        import numpy as np
+
+        batch = feed["images"]
+        self.batches.append(batch.shape)
+        return [np.repeat(self.prediction[None], batch.shape[0], axis=0)]
+
+
+def test_onnx_model_letterboxes_filters_and_maps_boxes_back(monkeypatch) -> None:
+    np = pytest.importorskip("numpy")
+    from birdstamp.gui.editor_onnx_detector import OnnxBirdModel
+
+    # anchors as (cx, cy, w, h, person, bird); a 1280x960 source is letterboxed at 0.5 with 80px top/bottom padding
+    anchors = np.array([
+        [320.0, 320.0, 100.0, 60.0, 0.05, 0.90],  # bird
+        [322.0, 321.0, 100.0, 60.0, 0.05, 0.80],  # same bird, suppressed by NMS
+        [100.0, 200.0, 40.0, 80.0, 0.95, 0.10],  # person
+        [500.0, 500.0, 30.0, 30.0, 0.05, 0.10],  # below confidence
+    ], dtype=np.float32)
+    session = _FakeOnnxSession(anchors.T)
+    model = OnnxBirdModel(session)
+    assert model.names == {0: "person", 1: "bird"} and model.batchable
+
+    results = model.predict(source=[Image.new("RGB", (1280, 960)), Image.new("RGB", (640, 480))], conf=0.25)
+
+    assert session.batches == [(2, 3, 640, 640)]
+    first = results[0].boxes
+    assert sorted(first.cls.tolist()) == [0.0, 1.0]
+    bird = first.xyxy[first.cls.tolist().index(1.0)]
+    assert np.allclose(bird, [(270 - 0) / 0.5, (290 - 80) / 0.5, (370 - 0) / 0.5, (350 - 80) / 0.5])
+    monkeypatch.setattr(editor_core, "_load_bird_detector", lambda: (model, {1}))
+    box = editor_core._detect_primary_bird_box(Image.new("RGB", (640, 480)))
+    assert box is not None and abs(box[0] - 270 / 640) < 1e-4 and abs(box[1] - 210 / 480) < 1e-4
+
+
+def test_onnx_backend_selection_without_torch(monkeypatch) -> None:
+    monkeypatch.setattr(editor_core, "_BIRD_DETECTOR_BACKEND", None)
+    monkeypatch.setenv(editor_core.BIRD_DETECTOR_ENV_VAR, "onnx")
+    assert editor_core.get_bird_detector_backend() == "onnx"
+    with pytest.raises(ValueError):
+        editor_core.set_bird_detector_backend("tensorrt")
+
+    monkeypatch.setattr(editor_core, "_onnx_runtime_available", lambda: False)
+    monkeypatch.setattr(editor_core, "_load_ultralytics_bird_detector", lambda: pytest.fail("onnx must not fall back"))
+    editor_core._load_bird_detector.cache_clear()
+    try:
+        assert editor_core._load_bird_detector() is None
+        assert "onnxruntime" in editor_core.get_bird_detector_error_message()
+    finally:
+        editor_core._load_bird_detector.cache_clear()
+
+
+def test_detection_passes_only_detector_sized_images_to_predict(monkeypatch) -> None:
+    pytest.importorskip("numpy")
+    model = _RedBlobModel()
+    monkeypatch.setattr(editor_core, "_load_bird_detector", lambda: (model, {0}))
+    image = Image.new("RGB", (6000, 4000), (40, 90, 40))
+    image.paste((220, 20, 20), (4500, 3000, 4560, 3050))
+    shipped: list[list[tuple[int, int]]] = []
+
+    def _predict(sources):
+        shipped.append([source.size for source in sources])
+        return editor_core._predict_in_process(sources)
+
+    box = editor_core._detect_primary_bird_boxes([image], _predict)[0]
+
+    assert box == editor_core._detect_primary_bird_box(image)
+    assert len(shipped) == 2 and all(max(size) <= 640 for sizes in shipped for size in sizes)
+
+
+def test_detector_process_failure_reports_and_restarts(monkeypatch) -> None:
+    from concurrent.futures import Future
+
+    class _BrokenPool:
+        shutdowns = 0
+
+        def submit(self, *_args):
+            future = Future()
+            future.set_exception(RuntimeError("worker died"))
+            return future
+
+        def shutdown(self, **_kwargs):
+            _BrokenPool.shutdowns += 1
+
+    detector = editor_core.BirdDetectorProcess(threads=1)
+    detector._executor = _BrokenPool()
+
+    with pytest.raises(editor_core.BirdDetectionError):
+        detector.predict([Image.new("RGB", (8, 8)), Image.new("RGB", (8, 8))])
+    assert "worker died" in editor_core.get_bird_detector_error_message()
+    assert detector._executor is None and _BrokenPool.shutdowns == 1
+
+
+def test_detector_process_set_threads_reaches_running_worker() -> None:
+    class _RecordingPool:
+        def __init__(self):
+            self.calls = []
+
+        def submit(self, fn, *args):
+            self.calls.append((fn, args))
+
+    detector = editor_core.BirdDetectorProcess(threads=2)
+    detector.set_threads(3)  # not started yet: used when the worker spawns
+    assert detector.threads == 3
+
+    pool = detector._executor = _RecordingPool()
+    detector.set_threads(3)
+    detector.set_threads(1)
+    assert pool.calls == [(editor_core.set_bird_detector_threads, (1,))]
+
+
+def test_detector_process_round_trip() -> None:
+    with editor_core.BirdDetectorProcess(threads=1) as detector:
+        try:
+            boxes = detector.detect_many([Image.new("RGB", (1600, 1200), (128, 128, 128))] * 2)
+        except editor_core.BirdDetectionError:
+            boxes = None  # no detection model installed here: reported as a failure, not "no bird"
+        assert boxes in (None, [None, None])
@@ -0,0 +1,67 @@
+from pathlib import Path
+
+from birdstamp.discover import discover_inputs, iter_inputs
+
+
+def _touch(path: Path) -> Path:
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_bytes(b"")
+    return path
+
+
+def test_iter_inputs_matches_sorted_rglob_order(tmp_path: Path) -> None:
+    for rel in [
+        "b.jpg",
+        "a/z.jpg",
+        "a.jpg",
+        "a b/c.png",
+        "a/sub/x.JPG",
+        "a-1.jpg",
+        "notes.txt",
+        "Z/upper.jpg",
+    ]:
+        _touch(tmp_path / rel)
+
+    expected = sorted(
+        p for p in tmp_path.rglob("*") if p.is_file() and p.suffix.lower() in {".jpg", ".png"}
+    )
+    assert list(iter_inputs(tmp_path, recursive=True)) == expected
+    assert discover_inputs(tmp_path, recursive=False) == sorted(
+        p for p in tmp_path.iterdir() if p.suffix.lower() == ".jpg"
+    )
+
+
+def test_iter_inputs_prunes_output_preview_and_ignored(tmp_path: Path) -> None:
+    keep = _touch(tmp_path / "day1" / "bird_001.jpg")
+    _touch(tmp_path / "output" / "bird_001__banner.jpg")
+    _touch(tmp_path / "day1" / ".preview" / "bird_001.jpg")
+    _touch(tmp_path / "day1" / "bird_002_tmp.jpg")
+    _touch(tmp_path / "rejects" / "bird_003.jpg")
+
+    found = discover_inputs(
+        tmp_path,
+        recursive=True,
+        ignore=["*_tmp*", "rejects"],
+        exclude_dirs=[tmp_path / "output"],
+    )
+    assert found == [keep]
+
+
+def test_iter_inputs_single_file(tmp_path: Path) -> None:
+    image = _touch(tmp_path / "x.png")
+    text = _touch(tmp_path / "x.txt")
+    assert list(iter_inputs(image)) == [image]
+    assert list(iter_inputs(text)) == []
+    assert list(iter_inputs(tmp_path / "missing")) == []
+
+
+def test_iter_inputs_does_not_follow_directory_links_like_rglob(tmp_path: Path) -> None:
+    outside = tmp_path / "outside"
+    _touch(outside / "x.jpg")
+    root = tmp_path / "photos"
+    keep = _touch(root / "a.jpg")
+    (root / "linked_dir").symlink_to(outside, target_is_directory=True)
+    (root / "linked.jpg").symlink_to(outside / "x.jpg")
+
+    expected = sorted(p for p in root.rglob("*") if p.is_file() and p.suffix.lower() == ".jpg")
+    assert list(iter_inputs(root, recursive=True)) == expected == [keep, root / "linked.jpg"]
@@ -0,0 +1,92 @@
+import json
+from pathlib import Path
+
+import pytest
+from PIL import Image
+from typer.testing import CliRunner
+
+from birdstamp import batch_render, cli
+from birdstamp.gui.editor_template import default_template_payload
+
+
+def _unratioed() -> dict:
+    return {**default_template_payload(), "ratio": None}
+
+
+def _rotated_jpeg(tmp_path):
+    path = tmp_path / "portrait.jpg"
+    exif = Image.Exif()
+    exif[0x0112] = 6   # stored landscape, displayed rotated 90° CW
+    Image.new("RGB", (480, 320), (20, 90, 40)).save(path, exif=exif)
+    return path
+
+
+def _raw_with_thumbnail(tmp_path):
+    # NEF/DNG/ARW/CR2 are TIFF containers; Pillow opens the embedded thumbnail.
+    path = tmp_path / "shot.nef"
+    Image.new("RGB", (160, 120), (20, 90, 40)).save(path, format="TIFF")
+    return path
+
+
+def test_jpeg_size_follows_exif_orientation(tmp_path) -> None:
+    assert batch_render.source_image_size(_rotated_jpeg(tmp_path)) == (320, 480)
+
+
+@pytest.mark.parametrize("orientation", [6, "6", "Rotate 90 CW", 8, "Rotate 270 CW"])
+def test_raw_size_comes_from_metadata_not_the_thumbnail(tmp_path, orientation) -> None:
+    raw_meta = {"Composite:ImageSize": "6000x4000", "IFD0:Orientation": orientation}
+
+    assert batch_render.source_image_size(_raw_with_thumbnail(tmp_path), raw_meta) == (4000, 6000)
+
+
+def test_raw_without_size_metadata_is_an_error(tmp_path) -> None:
+    with pytest.raises(ValueError):
+        batch_render.source_image_size(_raw_with_thumbnail(tmp_path), {"IFD0:Orientation": 1})
+
+
+def test_planned_output_size_applies_ratio_crop_and_long_edge(make_options) -> None:
+    assert batch_render.planned_output_size((4000, 6000), make_options(template_payload=_unratioed())) == (213, 320)
+    assert batch_render.planned_output_size((4000, 6000), make_options(template_payload={**default_template_payload(), "ratio": 1.0})) == (320, 320)
+
+
+def test_layout_plans_report_portrait_raws_and_errors(tmp_path, make_options) -> None:
+    raw = _raw_with_thumbnail(tmp_path)
+    missing = tmp_path / "missing.nef"
+    missing.write_bytes(b"")
+    tasks = [
+        (_rotated_jpeg(tmp_path), {}),
+        (raw, {"EXIF:ExifImageWidth": 6000, "EXIF:ExifImageHeight": 4000, "EXIF:Orientation": 8}),
+        (missing, {}),
+    ]
+
+    plans = list(batch_render.iter_layout_plans(tasks, make_options(template_payload=_unratioed())))
+
+    assert [plan["size"] for plan in plans[:2]] == [[213, 320], [213, 320]]
+    assert plans[1]["output"] == str(tmp_path / "out" / "shot.jpg")
+    assert plans[1]["layout"]["canvas_size"] == [213, 320]
+    assert plans[2]["source"] == str(missing) and "error" in plans[2]
+    assert not (tmp_path / "out").exists()
+
+
+def test_render_dry_run_prints_plans_without_writing(photos) -> None:
+    out_dir = photos.parent / "out"
+    result = CliRunner().invoke(
+        cli.app, ["render", str(photos), "--out", str(out_dir), "--max-long-edge", "320", "--dry-run"]
+    )
+
+    assert result.exit_code == 0, result.output
+    plans = [json.loads(line) for line in result.output.splitlines() if line.startswith("{")]
+    assert sorted(Path(plan["output"]).name for plan in plans) == ["p0__banner.jpg", "p1__banner.jpg", "p2__banner.jpg"]
+    assert all(plan["size"] == [320, 180] for plan in plans)   # built-in default crops to 16:9
+    assert not out_dir.exists()
+
+
+def test_render_dry_run_rejects_report(photos) -> None:
+    report = photos.parent / "run.jsonl"
+    result = CliRunner().invoke(
+        cli.app, ["render", str(photos), "--out", str(photos.parent / "out"), "--dry-run", "--report", str(report)]
+    )
+
+    assert result.exit_code == 2
+    assert "--report" in result.output
+    assert not report.exists()
@@ -0,0 +1,51 @@
+import random
+
+from birdstamp.render.layout_index import find_text_slot, find_text_slot_reference
+
+
+def _random_layout(rng: random.Random) -> dict:
+    canvas_width = rng.randint(40, 1600)
+    canvas_height = rng.randint(30, 1200)
+    text_width = rng.randint(4, max(5, canvas_width // rng.choice((1, 2, 4, 8))))
+    text_height = rng.randint(4, max(5, canvas_height // rng.choice((2, 4, 8, 16))))
+    occupied = []
+    for _ in range(rng.randint(0, 14)):
+        left = rng.randint(-20, canvas_width)
+        top = rng.randint(-20, canvas_height)
+        occupied.append((left, top, left + rng.randint(1, canvas_width // 2 + 1), top + rng.randint(1, canvas_height // 3 + 1)))
+    return {
+        "base_x": rng.randint(-50, canvas_width + 50),
+        "base_y": rng.randint(-50, canvas_height + 50),
+        "text_width": text_width,
+        "text_height": text_height,
+        "canvas_width": canvas_width,
+        "canvas_height": canvas_height,
+        "align_h": rng.choice(("left", "center", "right")),
+        "align_v": rng.choice(("top", "center", "bottom")),
+        "occupied": occupied,
+        "gap": rng.randint(0, 12),
+    }
+
+
+def test_find_text_slot_matches_reference_on_random_layouts() -> None:
+    rng = random.Random(2024)
+    outcomes = set()
+    for _ in range(1500):
+        layout = _random_layout(rng)
+        result = find_text_slot(**layout)
+        assert result == find_text_slot_reference(**layout), layout
+        outcomes.add(result[3])
+    # both the "free slot" and the "least overlap" branches are exercised
+    assert outcomes == {True, False}
+
+
+def test_find_text_slot_crowded_canvas_prefers_fewest_overlaps() -> None:
+    occupied = [(0, 0, 200, 100), (0, 100, 100, 200)]
+    layout = dict(
+        base_x=0, base_y=0, text_width=150, text_height=150,
+        canvas_width=200, canvas_height=200, align_h="left", align_v="top",
+        occupied=occupied, gap=4,
+    )
+    x, y, rect, free = find_text_slot(**layout)
+    assert not free
+    assert (x, y, rect, free) == find_text_slot_reference(**layout)
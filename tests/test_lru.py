@@ -0,0 +1,31 @@
+from birdstamp.render.lru import ByteLRUCache
+
+
+def test_byte_lru_evicts_least_recently_used_by_size() -> None:
+    cache: ByteLRUCache[str] = ByteLRUCache(max_bytes=100)
+    cache.put("a", "A", 40)
+    cache.put("b", "B", 40)
+    assert cache.get("a") == "A"  # "b" is now the oldest
+    cache.put("c", "C", 40)
+
+    assert cache.get("b") is None
+    assert cache.get("a") == "A"
+    assert cache.get("c") == "C"
+    assert cache.current_bytes == 80
+
+
+def test_byte_lru_skips_oversized_values_and_builds_once() -> None:
+    cache: ByteLRUCache[bytes] = ByteLRUCache(max_bytes=10)
+    assert cache.put("big", b"x" * 50, 50) == b"x" * 50
+    assert len(cache) == 0
+
+    calls = []
+
+    def factory() -> bytes:
+        calls.append(1)
+        return b"abc"
+
+    assert cache.get_or_create("k", factory, len) == b"abc"
+    assert cache.get_or_create("k", factory, len) == b"abc"
+    assert len(calls) == 1
+    assert cache.stats()["hits"] == 1
@@ -0,0 +1,125 @@
+import dataclasses
+import os
+from pathlib import Path
+
+from PIL import Image
+
+from birdstamp import batch_render
+from birdstamp.gui.editor_template import default_template_payload
+from birdstamp.manifest import MANIFEST_FILENAME, RenderManifest, build_record, hash_payload
+
+
+def _record(source: Path, *, template: str = "t1", quality: int = 92, meta: dict | None = None) -> dict:
+    return build_record(
+        source,
+        template_hash=hash_payload({"name": template}),
+        options_hash=hash_payload({"quality": quality}),
+        raw_metadata=meta or {"Model": "ILCE-1"},
+    )
+
+
+def test_hash_payload_ignores_key_order() -> None:
+    assert hash_payload({"a": 1, "b": [1, 2]}) == hash_payload({"b": [1, 2], "a": 1})
+    assert hash_payload({"a": 1}) != hash_payload({"a": 2})
+
+
+def test_manifest_round_trip_and_staleness(tmp_path: Path) -> None:
+    source = tmp_path / "bird.jpg"
+    source.write_bytes(b"raw")
+    out_dir = tmp_path / "output"
+    out_dir.mkdir()
+    (out_dir / "bird__banner.jpg").write_bytes(b"jpg")
+
+    manifest = RenderManifest.load(out_dir)
+    assert manifest.entries == {}
+    record = _record(source)
+    manifest.update("bird__banner.jpg", record)
+    manifest.save()
+    assert (out_dir / MANIFEST_FILENAME).is_file()
+    assert not list(out_dir.glob("*.tmp"))
+
+    reloaded = RenderManifest.load(out_dir)
+    assert reloaded.is_up_to_date("bird__banner.jpg", _record(source))
+    assert not reloaded.is_up_to_date("bird__banner.jpg", _record(source, template="t2"))
+    assert not reloaded.is_up_to_date("bird__banner.jpg", _record(source, quality=80))
+    assert not reloaded.is_up_to_date("bird__banner.jpg", _record(source, meta={"Model": "Z9"}))
+
+    stat = source.stat()
+    os.utime(source, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000))
+    assert not reloaded.is_up_to_date("bird__banner.jpg", _record(source))
+
+    (out_dir / "bird__banner.jpg").unlink()
+    assert not reloaded.is_up_to_date("bird__banner.jpg", record)
+
+
+def test_manifest_ignores_corrupt_file(tmp_path: Path) -> None:
+    (tmp_path / MANIFEST_FILENAME).write_text("{not json", encoding="utf-8")
+    manifest = RenderManifest.load(tmp_path)
+    assert manifest.entries == {}
+    assert manifest.key_for(tmp_path / "sub" / "a.jpg") == "sub/a.jpg"
+
+
+def test_record_ignores_volatile_file_system_tags(tmp_path: Path) -> None:
+    source = tmp_path / "bird.jpg"
+    source.write_bytes(b"raw")
+    out_dir = tmp_path / "output"
+    out_dir.mkdir()
+    (out_dir / "bird__banner.jpg").write_bytes(b"jpg")
+    meta = {
+        "SourceFile": str(source),
+        "EXIF:Model": "ILCE-1",
+        "File:FileAccessDate": "2024:05:01 10:00:00+08:00",
+        "File:FileInodeChangeDate": "2024:05:01 09:00:00+08:00",
+    }
+    manifest = RenderManifest(out_dir)
+    manifest.update("bird__banner.jpg", _record(source, meta=meta))
+
+    reread = dict(meta, **{"File:FileAccessDate": "2024:05:02 11:30:00+08:00"})
+    assert manifest.is_up_to_date("bird__banner.jpg", _record(source, meta=reread))
+    assert not manifest.is_up_to_date("bird__banner.jpg", _record(source, meta=dict(meta, **{"EXIF:Model": "Z9"})))
+
+
+def _render_all(sources: list[Path], variants: list, manifest: RenderManifest) -> dict[str, str]:
+    """Render like ``birdstamp render``: attach a fresh snapshot, fold records back in, save."""
+    batch_render.attach_manifest(variants, manifest)
+    statuses = {}
+    for source in sources:
+        for result in batch_render.render_source(source, {}, variants):
+            assert result.status != "failed", result.error
+            manifest.update(manifest.key_for(result.output), result.record)
+            statuses[result.output.name] = result.status
+    manifest.save()
+    return statuses
+
+
+def test_render_skips_only_outputs_whose_inputs_are_unchanged(tmp_path: Path, make_options) -> None:
+    sources = []
+    for name in ("a", "b"):
+        sources.append(tmp_path / f"{name}.jpg")
+        Image.new("RGB", (320, 240), (40, 90, 40)).save(sources[-1])
+    out_dir = tmp_path / "output"
+
+    def _variant(variant: str, **changes):
+        fields = {"max_long_edge": 160, **changes}
+        return make_options(
+            out_dir=out_dir, name_template="{stem}_{variant}.{ext}", skip_existing=True, variant=variant, **fields
+        )
+
+    wide, small = _variant("wide"), _variant("small", max_long_edge=80)
+
+    first = _render_all(sources, [wide, small], RenderManifest.load(out_dir))
+    assert set(first.values()) == {"ok"} and len(first) == 4
+    assert _render_all(sources, [wide, small], RenderManifest.load(out_dir)) == dict.fromkeys(first, "skipped")
+
+    edited = dict(default_template_payload(), banner_color="#ff0000")
+    edited_small = _variant("small", max_long_edge=80, template_payload=edited)
+    statuses = _render_all(sources, [wide, edited_small], RenderManifest.load(out_dir))
+    assert statuses == {"a_wide.jpg": "skipped", "b_wide.jpg": "skipped", "a_small.jpg": "ok", "b_small.jpg": "ok"}
+
+    statuses = _render_all(sources, [dataclasses.replace(wide, quality=60)], RenderManifest.load(out_dir))
+    assert statuses == {"a_wide.jpg": "ok", "b_wide.jpg": "ok"}
+
+    stat = sources[1].stat()
+    os.utime(sources[1], ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000))
+    statuses = _render_all(sources, [dataclasses.replace(wide, quality=60)], RenderManifest.load(out_dir))
+    assert statuses == {"a_wide.jpg": "skipped", "b_wide.jpg": "ok"}
@@ -21,3 +21,20 @@ def test_build_output_name_with_tokens() -> None:
     assert "20260216_1230" in name
     assert "Sony_ILCE-1M2" in name
 
+
+
+def test_build_output_name_variant_token() -> None:
+    metadata = NormalizedMetadata(source=Path("bird_001.jpg"), stem="bird_001")
+    name = build_output_name(
+        "{stem}__{variant}.{ext}",
+        Path("bird_001.jpg"),
+        metadata,
+        extension="jpg",
+        template_name="default",
+        variant="竖版(9_16) 1080px",
+    )
+    assert name == "bird_001__竖版(9_16)_1080px.jpg"
+
+    # Without a variant the token falls back to the template name.
+    name = build_output_name("{stem}__{variant}.{ext}", Path("bird_001.jpg"), metadata, extension="png", template_name="default")
+    assert name == "bird_001__default.png"
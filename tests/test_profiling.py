@@ -0,0 +1,47 @@
+import json
+import time
+from pathlib import Path
+
+from birdstamp import profiling
+
+
+def test_stage_timer_spans_are_exclusive() -> None:
+    timer = profiling.StageTimer()
+    with profiling.activate(timer):
+        with profiling.span("outer"):
+            time.sleep(0.02)
+            with profiling.span("inner"):
+                time.sleep(0.03)
+            profiling.record("measured", 0.01)
+    assert profiling.active_timer() is None
+    assert timer.spans["inner"] >= 0.03
+    # outer: ~0.02s slept minus the 0.01s recorded inside it
+    assert 0.005 <= timer.spans["outer"] < 0.03
+    assert timer.spans["measured"] == 0.01
+
+    # No active timer: spans are no-ops.
+    with profiling.span("ignored"):
+        pass
+    assert "ignored" not in timer.spans
+
+
+def test_run_report_writes_file_lines_and_summary(tmp_path: Path) -> None:
+    report = profiling.RunReport(tmp_path / "run.jsonl")
+    report.add_stage(profiling.STAGE_DISCOVER, 0.5)
+    for elapsed in (0.1, 0.2, 0.3):
+        report.write_result(
+            {"status": "ok", "elapsed": elapsed, "megapixels": 2.0, "timings": {"decode": elapsed / 2}}
+        )
+    report.write_result({"status": "failed", "elapsed": 0.05, "timings": {}})
+    summary = report.close({"jobs": 2})
+    assert report.close() == {}
+
+    lines = [json.loads(line) for line in (tmp_path / "run.jsonl").read_text(encoding="utf-8").splitlines()]
+    assert [line["type"] for line in lines] == ["file"] * 4 + ["summary"]
+    assert lines[-1] == json.loads(json.dumps(summary))
+    assert summary["status"] == {"ok": 3, "failed": 1}
+    assert summary["megapixels"] == 6.0
+    assert summary["elapsed"]["p50"] == 0.2
+    assert summary["stages"]["decode"]["count"] == 3
+    assert summary["run_stages"]["discover"]["total"] == 0.5
+    assert summary["jobs"] == 2
@@ -0,0 +1,128 @@
+import http.client
+import io
+import json
+import os
+import socket
+import threading
+
+import pytest
+from PIL import Image
+
+from birdstamp import batch_render
+from birdstamp.gui.editor_template import default_template_payload
+from birdstamp.serve import RenderRequest, RenderService, TemplateCache, create_server
+
+
+@pytest.fixture
+def served(tmp_path, make_options):
+    service = RenderService(make_options(out_dir=tmp_path), TemplateCache(lambda _name: None), workers=1, max_queue=0)
+    server = create_server(service, port=0)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    try:
+        yield service, server.server_address[1]
+    finally:
+        server.shutdown()
+        server.server_close()
+        service.close()
+
+
+def _photo(tmp_path):
+    path = tmp_path / "bird.jpg"
+    Image.new("RGB", (640, 480), (90, 120, 60)).save(path)
+    return path
+
+
+def _post(port: int, path: str, body: bytes, content_type: str) -> http.client.HTTPResponse:
+    conn = http.client.HTTPConnection("127.0.0.1", port, timeout=30)
+    conn.request("POST", path, body=body, headers={"Content-Type": content_type})
+    return conn.getresponse()
+
+
+def test_json_request_renders_a_path(served, tmp_path) -> None:
+    _service, port = served
+    response = _post(port, "/render", json.dumps({"path": str(_photo(tmp_path))}).encode(), "application/json")
+    assert response.status == 200
+    assert response.getheader("Content-Type") == "image/jpeg"
+    assert max(Image.open(io.BytesIO(response.read())).size) == 320
+
+
+def test_raw_bytes_request_renders_the_upload(served, tmp_path) -> None:
+    service, port = served
+    response = _post(port, "/render?format=png", _photo(tmp_path).read_bytes(), "image/jpeg")
+    assert response.status == 200
+    assert response.getheader("Content-Type") == "image/png"
+    assert Image.open(io.BytesIO(response.read())).format == "PNG"
+    assert not list(service._upload_dir.iterdir())  # staged upload removed
+
+
+def test_bad_request_and_health_and_metrics(served) -> None:
+    _service, port = served
+    response = _post(port, "/render", b"{}", "application/json")
+    assert response.status == 400
+    assert "path" in json.loads(response.read())["error"]
+
+    conn = http.client.HTTPConnection("127.0.0.1", port, timeout=30)
+    conn.request("GET", "/health")
+    assert json.loads(conn.getresponse().read()) == {"status": "ok", "workers": 1}
+    conn.request("GET", "/metrics")
+    metrics = json.loads(conn.getresponse().read())
+    assert metrics["requests"] == 0  # rejected as malformed before reaching the render pool
+    assert "latency_p95_ms" in metrics
+
+
+def test_unknown_template_is_rejected(served, tmp_path) -> None:
+    service, port = served
+    photo = str(_photo(tmp_path))
+    for name in ("defualt", "nope"):
+        response = _post(port, "/render", json.dumps({"path": photo, "template": name}).encode(), "application/json")
+        assert response.status == 400
+        assert name in json.loads(response.read())["error"]
+
+    assert _post(port, "/render", json.dumps({"path": photo}).encode(), "application/json").status == 200
+    assert list(service.templates._entries) == ["builtin"]  # bogus names leave nothing behind
+
+
+def test_busy_service_rejects_before_reading_the_upload(served, tmp_path) -> None:
+    service, port = served
+    with service.admit():  # the only slot (1 worker, no queue)
+        response = _post(port, "/render", _photo(tmp_path).read_bytes(), "image/jpeg")
+        assert response.status == 503
+        assert response.getheader("Connection") == "close"
+    assert service.metrics.snapshot()["rejected"] == 1
+
+
+def test_options_are_built_once_per_template_version(tmp_path, monkeypatch, make_options) -> None:
+    template = tmp_path / "mine.json"
+    template.write_text(json.dumps(default_template_payload(name="mine")))
+    service = RenderService(make_options(out_dir=tmp_path), TemplateCache(lambda _name: template), workers=1)
+    compiled = []
+    real_compile = batch_render.compile_template
+    monkeypatch.setattr(batch_render, "compile_template", lambda *a, **kw: compiled.append(1) or real_compile(*a, **kw))
+    request = RenderRequest(source=tmp_path / "bird.jpg", template="mine")
+    try:
+        first = service.options_for(request)
+        assert service.options_for(request) is first
+        assert service.options_for(RenderRequest(source=tmp_path / "other.jpg", template="mine")) is first
+        assert len(compiled) == 1
+
+        assert service.options_for(RenderRequest(source=request.source, template="mine", quality=50)).quality == 50
+        stat = template.stat()
+        os.utime(template, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000))
+        assert service.options_for(request) is not first  # edited template file is picked up
+        assert len(compiled) == 3
+    finally:
+        service.close()
+
+
+@pytest.mark.skipif(not hasattr(socket, "AF_UNIX"), reason="Unix domain sockets only")
+def test_socket_path_must_not_replace_a_regular_file(tmp_path, make_options) -> None:
+    occupied = tmp_path / "not-a-socket"
+    occupied.write_text("keep me")
+    service = RenderService(make_options(out_dir=tmp_path), TemplateCache(lambda _name: None))
+    try:
+        with pytest.raises(FileExistsError):
+            create_server(service, socket_path=occupied)
+    finally:
+        service.close()
+    assert occupied.read_text() == "keep me"
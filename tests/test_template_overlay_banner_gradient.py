@@ -1,8 +1,17 @@
+import json
+
 from PIL import Image
 
 from birdstamp.gui.editor_template import (
+    CompiledTemplate,
+    _fit_font_size,
+    _iter_font_sizes_for_layout,
     _resolve_template_field_text,
+    compile_template,
     default_template_payload,
+    layout_template_overlay,
+    load_compiled_template,
+    rasterize_template_overlay,
     render_template_overlay,
 )
 from birdstamp.gui.template_context import PhotoInfo, build_template_context_provider
@@ -49,3 +58,123 @@ def test_template_field_text_falls_back_to_provider_caption_when_empty() -> None
     provider = build_template_context_provider("exif", "EXIF:Model", display_label="机身型号")
 
     assert _resolve_template_field_text(provider, photo) == "机身型号"
+
+
+def test_compiled_template_is_reused_and_renders_like_payload() -> None:
+    payload = default_template_payload(name="default")
+    compiled = compile_template(payload)
+    assert isinstance(compiled, CompiledTemplate)
+    assert compile_template(payload) is compiled
+    assert compile_template(compiled) is compiled
+    assert compile_template(dict(payload, banner_color="#336699")) is not compiled
+    assert len(compiled.fields) == len(payload["fields"])
+
+    image = Image.new("RGB", (1200, 800), color="#406080")
+    kwargs = dict(raw_metadata={}, metadata_context={"bird": "红胁蓝尾鸲", "stem": "sample"})
+    from_payload = render_template_overlay(image, template_payload=payload, **kwargs)
+    from_compiled = render_template_overlay(image, template_payload=compiled, **kwargs)
+    assert from_payload.tobytes() == from_compiled.tobytes()
+
+
+def test_load_compiled_template_reloads_changed_file(tmp_path) -> None:
+    path = tmp_path / "tpl.json"
+    payload = default_template_payload(name="tpl")
+    path.write_text(json.dumps(payload, ensure_ascii=False), encoding="utf-8")
+    first = load_compiled_template(path)
+    assert load_compiled_template(path) is first
+
+    path.write_text(json.dumps(dict(payload, ratio=1.5), ensure_ascii=False, indent=1), encoding="utf-8")
+    second = load_compiled_template(path)
+    assert second is not first
+    assert second.ratio == 1.5
+
+
+def test_overlay_only_touches_banner_region_and_returns_rgb() -> None:
+    image = Image.new("RGBA", (800, 1200), color=(10, 200, 30, 128))
+    payload = default_template_payload(name="default")
+    metadata_context = {"bird": "红胁蓝尾鸲", "camera": "SONY · ILCE-1M2", "settings_text": "f/5.6  1/640s"}
+
+    rendered = render_template_overlay(
+        image,
+        raw_metadata={},
+        metadata_context=metadata_context,
+        template_payload=payload,
+    )
+
+    assert rendered.mode == "RGB"
+    assert rendered.size == image.size
+    assert image.getpixel((400, 1190)) == (10, 200, 30, 128)
+    assert rendered.getpixel((400, 10)) == (10, 200, 30)
+    assert rendered.getpixel((400, 1190)) != (10, 200, 30)
+
+
+def test_gradient_scrim_strip_is_built_once_per_size() -> None:
+    from birdstamp.gui import editor_template
+
+    editor_template._gradient_strip_cache.clear()
+    for _ in range(3):
+        image = Image.new("RGBA", (300, 200), (255, 255, 255, 255))
+        editor_template._draw_vertical_gradient_scrim(
+            image,
+            rect=(0, 100, 300, 200),
+            top_color="#000000",
+            top_opacity_pct=0.0,
+            bottom_color="#000000",
+            bottom_opacity_pct=100.0,
+        )
+    stats = editor_template._gradient_strip_cache.stats()
+    assert (stats["entries"], stats["misses"], stats["hits"]) == (1, 1, 2)
+    assert image.getpixel((150, 99)) == (255, 255, 255, 255)
+    assert image.getpixel((150, 199)) == (0, 0, 0, 255)
+
+
+def test_text_sprites_are_reused_across_renders() -> None:
+    from birdstamp.gui import editor_template
+
+    payload = default_template_payload(name="default")
+    payload["fields"] = [dict(field, style="bold_italic") for field in payload["fields"]]
+    metadata_context = {"bird": "红胁蓝尾鸲", "camera": "SONY · ILCE-1M2"}
+    kw = dict(raw_metadata={}, metadata_context=metadata_context, template_payload=payload)
+
+    editor_template._text_sprite_cache.clear()
+    first = render_template_overlay(Image.new("RGB", (1200, 800), "#336699"), **kw)
+    built = editor_template._text_sprite_cache.stats()["misses"]
+    second = render_template_overlay(Image.new("RGB", (1200, 800), "#336699"), **kw)
+    stats = editor_template._text_sprite_cache.stats()
+
+    assert built > 0
+    assert stats["misses"] == built
+    assert stats["hits"] >= built
+    assert first.tobytes() == second.tobytes()
+
+
+def test_layout_is_serializable_cached_and_rasterizes_like_render() -> None:
+    payload = default_template_payload(name="default")
+    metadata_context = {"bird": "红胁蓝尾鸲", "camera": "SONY · ILCE-1M2"}
+    kw = dict(raw_metadata={}, metadata_context=metadata_context, template_payload=payload)
+
+    layout = layout_template_overlay((1600, 900), **kw)
+    assert layout_template_overlay((1600, 900), **kw) is layout
+    data = json.loads(json.dumps(layout.to_dict(), ensure_ascii=False))
+    assert data["canvas_size"] == [1600, 900]
+    assert data["texts"] and all(text["font_size"] >= 8 for text in data["texts"])
+
+    image = Image.new("RGB", (1600, 900), "#446688")
+    rasterized = rasterize_template_overlay(image, layout, template_payload=payload)
+    assert rasterized.tobytes() == render_template_overlay(image, **kw).tobytes()
+
+
+def test_font_size_fitting_walks_sizes_like_the_linear_search() -> None:
+    sizes = _iter_font_sizes_for_layout(40)
+    tried: list[int] = []
+
+    def _place(size: int) -> tuple[int, bool]:
+        tried.append(size)
+        return (size, size == sizes[1])   # a free slot exists only at one size (not monotonic)
+
+    assert _fit_font_size(sizes, _place) == (sizes[1], True)
+    assert tried == sizes[:2]
+
+    tried.clear()
+    assert _fit_font_size(sizes, lambda size: (tried.append(size), size, False)[1:]) == (8, False)
+    assert tried == sizes
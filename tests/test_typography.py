@@ -0,0 +1,73 @@
+from pathlib import Path
+
+from birdstamp.render import typography
+from birdstamp.render.typography import clear_font_cache, load_font
+
+
+def test_load_font_reuses_loaded_fonts() -> None:
+    clear_font_cache()
+    first = load_font(None, 24)
+    assert load_font(None, 24) is first
+
+
+def test_load_font_missing_path_falls_back() -> None:
+    clear_font_cache()
+    missing = Path("/nonexistent/birdstamp-font.ttf")
+    font = load_font(missing, 18)
+    assert font is load_font(None, 18)
+    assert typography._existing_font_candidates(str(missing)) == typography._existing_font_candidates(None)
+
+
+def _naive_ellipsize(draw, text, font, max_width):
+    if typography.text_size(draw, text, font)[0] <= max_width:
+        return text
+    for cut in range(len(text), -1, -1):
+        candidate = text[:cut].rstrip() + "..."
+        if typography.text_size(draw, candidate, font)[0] <= max_width:
+            return candidate
+    return "..."
+
+
+def test_wrap_and_ellipsize_match_exact_measurement() -> None:
+    import random
+
+    from PIL import Image, ImageDraw
+
+    draw = ImageDraw.Draw(Image.new("RGB", (10, 10)))
+    font = load_font(None, 22)
+    rng = random.Random(7)
+    alphabet = "AVWaTofi .,-翠鸟红胁蓝尾鸲普通Kingfisher"
+    for _ in range(60):
+        text = "".join(rng.choice(alphabet) for _ in range(rng.randint(1, 80)))
+        max_width = rng.randint(20, 400)
+        assert typography.ellipsize(draw, text, font, max_width) == _naive_ellipsize(draw, text, font, max_width)
+        for line in typography.wrap_text(draw, text, font, max_width, max_lines=4)[:-1]:
+            assert typography.text_size(draw, line, font)[0] <= max_width or len(line) == 1
+
+
+def test_shared_measurer_is_safe_across_threads(monkeypatch) -> None:
+    import threading
+
+    from PIL import Image, ImageDraw
+
+    monkeypatch.setattr(typography, "_MEASURED_STRINGS_PER_FONT", 8)  # constant eviction
+    measurer = typography.TextMeasurer(load_font(None, 18))
+    errors: list[BaseException] = []
+
+    def _worker(offset: int) -> None:
+        draw = ImageDraw.Draw(Image.new("RGB", (10, 10)))
+        try:
+            for index in range(400):
+                text = f"bird {(index + offset) % 24}"
+                assert measurer.width(draw, text) == typography.text_size(draw, text, measurer.font)[0]
+        except BaseException as exc:
+            errors.append(exc)
+
+    threads = [threading.Thread(target=_worker, args=(offset,)) for offset in range(6)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert not errors
+    assert len(measurer._widths) <= 8
@@ -2,6 +2,7 @@ from pathlib import Path
 
 from PIL import Image
 
+from birdstamp.cpu_budget import plan_cpu_budget
 from birdstamp.gui.editor_core import draw_focus_box_overlay
 from birdstamp.video_export import (
     _count_contiguous_rendered_frames,
@@ -48,10 +49,20 @@ def test_build_ffmpeg_command_h265_mp4_contains_expected_flags(tmp_path) -> None
     assert str((tmp_path / "clip.mp4").resolve()) == command[-1]
 
 
+def test_build_ffmpeg_command_passes_encoder_threads(tmp_path) -> None:
+    options = VideoExportOptions(output_path=tmp_path / "clip.mp4", encoder_threads=6)
+    command = build_ffmpeg_command(Path("/tmp/ffmpeg"), tmp_path / "frames", options)
+    assert command[command.index("-threads") + 1] == "6"
+    default_options = VideoExportOptions(output_path=tmp_path / "clip.mp4")
+    assert "-threads" not in build_ffmpeg_command(Path("/tmp/ffmpeg"), tmp_path / "frames", default_options)
+
+
 def test_resolve_video_render_workers_honors_auto_and_manual_limits() -> None:
     assert resolve_video_render_workers(0, 0) == 1
     assert resolve_video_render_workers(3, 2) == 2
     assert resolve_video_render_workers(1, 5) == 1
+    assert resolve_video_render_workers(0, 50, plan_cpu_budget(8)) == 6
+    assert resolve_video_render_workers(0, 50, plan_cpu_budget(4)) == 3
 
 
 def test_normalize_frame_size_letterboxes_to_target_canvas() -> None:
@@ -81,3 +92,47 @@ def test_draw_focus_box_overlay_uses_expected_border_colors() -> None:
     draw_focus_box_overlay(image, (0.2, 0.2, 0.8, 0.8))
     assert image.getpixel((20, 20)) == (0, 0, 0)
     assert image.getpixel((21, 21)) == (46, 255, 85)
+
+
+def test_bird_box_waiters_are_released_when_detection_is_interrupted(monkeypatch, tmp_path) -> None:
+    import threading
+
+    from birdstamp import video_export
+
+    class _Interrupted(BaseException):
+        pass
+
+    photo = tmp_path / "bird.jpg"
+    Image.new("RGB", (64, 48)).save(photo)
+    detecting = threading.Event()
+    release = threading.Event()
+
+    def _detector(_image):
+        detecting.set()
+        release.wait(5)
+        raise _Interrupted()
+
+    monkeypatch.setattr(video_export, "_shared_bird_box_store", lambda: None)
+    monkeypatch.setattr(video_export, "_bird_detection_batcher", lambda: _detector)
+    cache: dict = {}
+    lock = threading.Lock()
+    outcomes: dict[str, BaseException] = {}
+
+    def _resolve(name: str) -> None:
+        try:
+            video_export._resolve_bird_box_for_image(photo, Image.new("RGB", (64, 48)), cache, lock)
+        except BaseException as exc:
+            outcomes[name] = exc
+
+    owner = threading.Thread(target=_resolve, args=("owner",))
+    owner.start()
+    assert detecting.wait(5)
+    waiter = threading.Thread(target=_resolve, args=("waiter",))
+    waiter.start()
+    release.set()
+    owner.join(5)
+    waiter.join(5)
+
+    assert not waiter.is_alive()
+    assert isinstance(outcomes["owner"], _Interrupted) and isinstance(outcomes["waiter"], _Interrupted)
+    assert cache == {}  # placeholder dropped, the next frame detects again
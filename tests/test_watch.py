@@ -0,0 +1,121 @@
+import copy
+import os
+import time
+from pathlib import Path
+
+from PIL import Image
+from typer.testing import CliRunner
+
+from birdstamp import cli, watch
+from birdstamp.config import DEFAULT_CONFIG
+from birdstamp.manifest import RenderManifest
+from birdstamp.watch import FolderWatcher
+
+
+def _bump_mtime(path: Path) -> None:
+    stat = path.stat()
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000))
+
+
+def test_polling_watcher_reports_new_files_once_stable(tmp_path: Path) -> None:
+    (tmp_path / "old.jpg").write_bytes(b"old")
+    watcher = FolderWatcher(
+        [tmp_path],
+        settle_seconds=0.2,
+        poll_interval=0.1,
+        force_polling=True,
+        exclude_dirs=[tmp_path / "output"],
+    )
+    watcher.start()
+    assert watcher.backend == "polling"
+
+    new_file = tmp_path / "day1" / "new.jpg"
+    new_file.parent.mkdir()
+    new_file.write_bytes(b"part")
+    (tmp_path / "output").mkdir()
+    (tmp_path / "output" / "new__banner.jpg").write_bytes(b"out")
+    (tmp_path / "notes.txt").write_bytes(b"txt")
+
+    time.sleep(0.15)
+    assert watcher.poll_ready() == []
+
+    # Still being copied: size/mtime change restarts the settle timer.
+    new_file.write_bytes(b"partial-more")
+    _bump_mtime(new_file)
+    time.sleep(0.15)
+    assert watcher.poll_ready() == []
+
+    time.sleep(0.25)
+    assert watcher.poll_ready() == [new_file]
+    time.sleep(0.15)
+    assert watcher.poll_ready() == []
+    watcher.stop()
+    watcher.stop()
+
+
+def test_watcher_existing_files_and_closed_events(tmp_path: Path) -> None:
+    existing = tmp_path / "a.png"
+    existing.write_bytes(b"png")
+    watcher = FolderWatcher([tmp_path], settle_seconds=60, force_polling=True, ignore=["*_tmp*"])
+    watcher.start(include_existing=True)
+    assert watcher.poll_ready() == []
+
+    watcher.notify(existing, closed=True)
+    skipped = tmp_path / "b_tmp.jpg"
+    skipped.write_bytes(b"jpg")
+    watcher.notify(skipped, closed=True)
+    assert watcher.poll_ready() == [existing]
+
+
+def test_watcher_resolves_event_paths_like_its_roots(tmp_path: Path) -> None:
+    real = tmp_path / "real"
+    real.mkdir()
+    link = tmp_path / "link"
+    link.symlink_to(real, target_is_directory=True)
+    watcher = FolderWatcher([link], settle_seconds=60, force_polling=True)
+    watcher.start()
+
+    photo = link / "bird.jpg"
+    photo.write_bytes(b"jpg")
+    watcher.notify(photo, closed=True)
+    assert watcher.poll_ready() == [real / "bird.jpg"]
+
+
+class _OneBatchWatcher:
+    """Reports every photo in the watched folders once, then stops like Ctrl+C."""
+
+    backend = "test"
+
+    def __init__(self, folders, **_kwargs) -> None:
+        self.roots = [Path(folder).resolve() for folder in folders]
+
+    def start(self, include_existing: bool = False) -> None:
+        pass
+
+    def stop(self) -> None:
+        pass
+
+    def iter_ready(self):
+        yield [path for root in self.roots for path in sorted(root.glob("*.jpg"))]
+        raise KeyboardInterrupt
+
+
+def test_watch_folders_sharing_an_output_dir_share_one_manifest(tmp_path: Path, monkeypatch) -> None:
+    cfg = copy.deepcopy(DEFAULT_CONFIG)
+    cfg["bird_box_cache"] = False
+    monkeypatch.setattr(cli, "load_config", lambda: copy.deepcopy(cfg))
+    monkeypatch.setattr(watch, "FolderWatcher", _OneBatchWatcher)
+    folders = []
+    for name in ("a", "b"):
+        folder = tmp_path / name
+        folder.mkdir()
+        Image.new("RGB", (320, 240), (90, 120, 60)).save(folder / f"{name}0.jpg")
+        folders.append(str(folder))
+    out = tmp_path / "out"
+
+    result = CliRunner().invoke(cli.app, ["watch", *folders, "--out", str(out), "--manifest"])
+
+    assert result.exit_code == 0, result.output
+    outputs = sorted(path.name for path in out.glob("*.jpg"))
+    assert [name[:2] for name in outputs] == ["a0", "b0"]
+    assert sorted(RenderManifest.load(out).entries) == outputs